@@ -0,0 +1,181 @@
+"""Direct HTTP client for TCGplayer's internal sales, listings and product APIs.
+
+Used by the scraper's fast path: session cookies are harvested once from a warm
+Chrome session and replayed over keep-alive connections, so a product can be
+fetched in a few small JSON requests instead of a full page load.
+"""
+
+import base64
+import gzip
+import http.client
+import json
+import ssl
+import threading
+import time
+import zlib
+from urllib.parse import urlsplit
+
+SITE_BASE = 'https://www.tcgplayer.com'
+SALES_API_BASE = 'https://mpapi.tcgplayer.com'
+SEARCH_API_BASE = 'https://mp-search-api.tcgplayer.com'
+
+
+class ApiError(Exception):
+    """Raised when an API call fails or returns a non-2xx status."""
+
+    def __init__(self, message, status=None, url=None):
+        super().__init__(message)
+        self.status = status
+        self.url = url
+
+
+class ApiClient:
+    """Keep-alive HTTP client carrying a browser session's cookies and user agent.
+
+    One connection is kept per (thread, host), so the client can be shared by
+    parallel workers. Base URLs can be pointed at a local stand-in server.
+    """
+
+    def __init__(self, cookies=None, user_agent=None, proxy=None, timeout=15,
+                 site_base=SITE_BASE, sales_base=SALES_API_BASE, search_base=SEARCH_API_BASE):
+        self.cookies = dict(cookies or {})
+        self.user_agent = user_agent
+        self.proxy = proxy
+        self.timeout = timeout
+        self.site_base = site_base.rstrip('/')
+        self.sales_base = sales_base.rstrip('/')
+        self.search_base = search_base.rstrip('/')
+        self._local = threading.local()
+        self._all_conns = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_driver(cls, driver, proxy=None, **kwargs):
+        """Build a client from a live Chrome session, visiting the site first if needed."""
+        site_base = kwargs.get('site_base', SITE_BASE)
+        if not (driver.current_url or '').startswith(site_base):
+            driver.get(site_base + '/')
+        cookies = {c['name']: c['value'] for c in driver.get_cookies()}
+        user_agent = driver.execute_script('return navigator.userAgent')
+        return cls(cookies=cookies, user_agent=user_agent, proxy=proxy, **kwargs)
+
+    @property
+    def last_status(self):
+        """HTTP status of this thread's most recent request, or None if it never got a response."""
+        return getattr(self._local, 'last_status', None)
+
+    def _headers(self, body=None):
+        headers = {
+            'Accept': 'application/json',
+            'Accept-Encoding': 'gzip, deflate',
+            'Connection': 'keep-alive',
+            'Origin': self.site_base,
+            'Referer': self.site_base + '/',
+        }
+        if self.user_agent:
+            headers['User-Agent'] = self.user_agent
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{k}={v}' for k, v in self.cookies.items())
+        if body is not None:
+            headers['Content-Type'] = 'application/json'
+        return headers
+
+    def _connection(self, scheme, netloc):
+        conns = getattr(self._local, 'conns', None)
+        if conns is None:
+            conns = self._local.conns = {}
+        key = (scheme, netloc)
+        conn = conns.get(key)
+        if conn is None:
+            conn = self._open_connection(scheme, netloc)
+            conns[key] = conn
+            with self._lock:
+                self._all_conns.append(conn)
+        return conn
+
+    def _open_connection(self, scheme, netloc):
+        if scheme == 'http':
+            return http.client.HTTPConnection(netloc, timeout=self.timeout)
+        ctx = ssl.create_default_context()
+        if self.proxy:
+            conn = http.client.HTTPSConnection(self.proxy['host'], int(self.proxy['port']),
+                                               timeout=self.timeout, context=ctx)
+            tunnel_headers = {}
+            if self.proxy.get('user') and self.proxy.get('pass'):
+                creds = f"{self.proxy['user']}:{self.proxy['pass']}".encode()
+                tunnel_headers['Proxy-Authorization'] = 'Basic ' + base64.b64encode(creds).decode()
+            host, _, port = netloc.partition(':')
+            conn.set_tunnel(host, int(port or 443), headers=tunnel_headers)
+            return conn
+        return http.client.HTTPSConnection(netloc, timeout=self.timeout, context=ctx)
+
+    def _drop_connection(self, scheme, netloc):
+        conns = getattr(self._local, 'conns', {})
+        conn = conns.pop((scheme, netloc), None)
+        if conn is not None:
+            conn.close()
+
+    def request_json(self, method, url, body=None):
+        """Send a request and return the decoded JSON body. Raises ApiError on failure."""
+        self._local.last_status = None
+        parts = urlsplit(url)
+        path = parts.path + (f'?{parts.query}' if parts.query else '')
+        payload = json.dumps(body).encode() if body is not None else None
+
+        # A keep-alive connection may have been closed by the server since its
+        # last use — retry once on a fresh connection before giving up.
+        for attempt in range(2):
+            conn = self._connection(parts.scheme, parts.netloc)
+            try:
+                conn.request(method, path, body=payload, headers=self._headers(body))
+                resp = conn.getresponse()
+                raw = resp.read()
+            except (http.client.HTTPException, OSError) as e:
+                self._drop_connection(parts.scheme, parts.netloc)
+                if attempt == 0:
+                    continue
+                raise ApiError(f'{method} {url} failed: {e}', url=url) from e
+            break
+
+        self._local.last_status = resp.status
+        if resp.getheader('Connection', '').lower() == 'close':
+            self._drop_connection(parts.scheme, parts.netloc)
+        if not 200 <= resp.status < 300:
+            raise ApiError(f'{method} {url} returned HTTP {resp.status}', status=resp.status, url=url)
+
+        encoding = (resp.getheader('Content-Encoding') or '').lower()
+        if encoding == 'gzip':
+            raw = gzip.decompress(raw)
+        elif encoding == 'deflate':
+            raw = zlib.decompress(raw)
+        try:
+            return json.loads(raw) if raw else None
+        except ValueError as e:
+            raise ApiError(f'{method} {url} returned invalid JSON', status=resp.status, url=url) from e
+
+    def get_latest_sales(self, product_id, count):
+        """POST to the latestsales endpoint (the same call the product page makes)."""
+        url = f'{self.sales_base}/v2/product/{product_id}/latestsales'
+        body = {"conditions": [], "languages": [], "variants": [], "listingType": "All",
+                "offset": 0, "limit": count, "time": int(time.time() * 1000)}
+        return self.request_json('POST', url, body)
+
+    def get_listings(self, product_id, size):
+        """POST to the listing search API — GET only returns aggregations."""
+        url = f'{self.search_base}/v1/product/{product_id}/listings'
+        body = {"from": 0, "size": size, "sort": [{"field": "price", "order": "asc"}]}
+        return self.request_json('POST', url, body)
+
+    def get_product_details(self, product_id):
+        """GET the product details endpoint that backs the page's price guide."""
+        return self.request_json('GET', f'{self.search_base}/v1/product/{product_id}/details')
+
+    def close(self):
+        """Close every connection opened by any thread."""
+        with self._lock:
+            conns, self._all_conns = self._all_conns, []
+        for conn in conns:
+            try:
+                conn.close()
+            except Exception:
+                pass
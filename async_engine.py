@@ -0,0 +1,453 @@
+"""asyncio scrape engine driving many tabs per Chrome over the DevTools protocol.
+
+Instead of one blocking Selenium driver per worker thread, one Chrome is started
+per proxy (or a single one for a direct connection) and driven over its
+browser-level DevTools websocket. Each Chrome runs several tabs at once; tabs
+are limited per proxy by async_tabs_per_proxy and across all browsers by
+async_global_concurrency, so a single process can keep 20+ product pages in
+flight without a Chrome per page.
+
+The price-guide fragments are collected in the page with price_guide.EXTRACT_JS,
+as on the Selenium path, and parsed off the event loop, and results are stored through update_data/log_scrape.
+"""
+
+import asyncio
+import base64
+import json
+import math
+import random
+
+import cdp_capture
+import metrics
+import price_guide
+import rate_limiter
+import replay
+import scraperpdf
+import timings
+
+PRICE_GUIDE_SELECTOR = 'section.product-details__price-guide'
+PAGE_LOAD_TIMEOUT = 30     # seconds to wait for the price guide to appear
+COMMAND_TIMEOUT = 30       # seconds to wait for any single DevTools command
+
+_PRICE_GUIDE_JS = ("(() => { const el = document.querySelector(%s); "
+                   "return !!(el && el.offsetParent !== null); })()" % json.dumps(PRICE_GUIDE_SELECTOR))
+
+_FETCH_SALES_JS = """fetch(%s, {
+    credentials: 'include',
+    headers: {'Accept': 'application/json', 'X-Requested-With': 'XMLHttpRequest'}
+}).then(r => r.ok ? r.json() : null).catch(() => null)"""
+
+_FETCH_LISTINGS_JS = """fetch(%s, {
+    method: 'POST',
+    credentials: 'include',
+    headers: {'Content-Type': 'application/json', 'Accept': 'application/json'},
+    body: JSON.stringify(%s)
+}).then(r => r.ok ? r.json() : null).catch(() => null)"""
+
+
+async def _call(conn, method, params=None, session_id=None, timeout=COMMAND_TIMEOUT):
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(conn.send(method, params, session_id)), timeout)
+    except asyncio.TimeoutError:
+        raise cdp_capture.CDPError(f'{method} timed out')
+
+
+class _Tab:
+    """One tab attached to its browser's DevTools connection as a flattened session.
+
+    Network events for the tab are delivered on the event loop by _Browser, so
+    no locking is needed here.
+    """
+
+    def __init__(self, browser, target_id, session_id):
+        self.browser = browser
+        self.target_id = target_id
+        self.session_id = session_id
+        self.last_failure = None
+        self.begin_page(None)
+
+    def begin_page(self, product_id):
+        self.product_id = product_id
+        self.matched = set()
+        self.sales = None
+        self.sales_ready = asyncio.Event()
+        self.bytes = 0
+        self.blocked = {}
+        self.last_activity = asyncio.get_running_loop().time()
+
+    def on_event(self, method, params):
+        if not method.startswith('Network.'):
+            return
+        self.last_activity = asyncio.get_running_loop().time()
+        request_id = params.get('requestId')
+        if method == 'Network.responseReceived':
+            url = params.get('response', {}).get('url', '')
+            if self.product_id and self.sales is None and scraperpdf._is_sales_url(url, self.product_id):
+                self.matched.add(request_id)
+        elif method == 'Network.loadingFinished':
+            self.bytes += int(params.get('encodedDataLength') or 0)
+            if request_id in self.matched:
+                self.matched.discard(request_id)
+                asyncio.ensure_future(self._fetch_sales_body(request_id, self.sales_ready))
+        elif method == 'Network.loadingFailed':
+            self.matched.discard(request_id)
+            if params.get('blockedReason'):
+                rtype = params.get('type') or 'Other'
+                self.blocked[rtype] = self.blocked.get(rtype, 0) + 1
+
+    async def _fetch_sales_body(self, request_id, ready):
+        try:
+            result = await self.call('Network.getResponseBody', {'requestId': request_id})
+            body = result.get('body', '')
+            if result.get('base64Encoded'):
+                body = base64.b64decode(body).decode('utf-8', errors='replace')
+            data = json.loads(body) if body and len(body) <= cdp_capture.MAX_BODY_BYTES else None
+        except Exception:
+            data = None
+        # The event belongs to the page it was created for; a newer page has a new one
+        if data is not None and ready is self.sales_ready:
+            self.sales = data
+            ready.set()
+
+    async def call(self, method, params=None, timeout=COMMAND_TIMEOUT):
+        return await _call(self.browser.conn, method, params, self.session_id, timeout)
+
+    async def evaluate(self, expression, await_promise=False):
+        result = await self.call('Runtime.evaluate', {'expression': expression, 'returnByValue': True,
+                                                      'awaitPromise': await_promise})
+        if result.get('exceptionDetails'):
+            return None
+        return result.get('result', {}).get('value')
+
+    async def wait_ready(self, idle_window, max_wait):
+        """Wait for the sales response, network idle, or max_wait. Returns seconds waited."""
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        while not self.sales_ready.is_set():
+            now = loop.time()
+            if now - start >= max_wait:
+                break
+            if now - self.last_activity >= idle_window and not self.matched:
+                break
+            try:
+                await asyncio.wait_for(self.sales_ready.wait(), min(idle_window, max_wait) / 5)
+            except asyncio.TimeoutError:
+                pass
+        return loop.time() - start
+
+    async def scrape(self, product_id, url, idle_window):
+        """Load one product page in this tab. Returns (product_name, data) or (None, None)."""
+        loop = asyncio.get_running_loop()
+        self.last_failure = None
+        timer = timings.StageTimer()
+        try:
+            self.begin_page(product_id)
+            with timer.stage('page_load'):
+                nav = await self.call('Page.navigate', {'url': url})
+            if nav.get('errorText'):
+                raise cdp_capture.CDPError(nav['errorText'])
+
+            deadline = loop.time() + PAGE_LOAD_TIMEOUT
+            with timer.stage('wait_price_guide'):
+                while not await self.evaluate(_PRICE_GUIDE_JS):
+                    if loop.time() > deadline:
+                        raise asyncio.TimeoutError('price guide did not appear')
+                    await asyncio.sleep(scraperpdf.READY_POLL_INTERVAL)
+
+            with timer.stage('readiness'):
+                ready_wait = await self.wait_ready(idle_window, scraperpdf.READY_MAX_WAIT)
+            with timer.stage('extract'):
+                fragments = await self.evaluate(price_guide.EXTRACT_JS)
+            if not fragments:
+                raise cdp_capture.CDPError('page fragment extraction failed')
+            with timer.stage('parse'):
+                product_name, fields = await asyncio.to_thread(price_guide.parse_fragments, fragments)
+
+            sales_data = self.sales
+            recent_sales = scraperpdf.parse_recent_sales_response(sales_data) if sales_data else []
+            sales_source = 'capture' if recent_sales else None
+            if not recent_sales:
+                with timer.stage('sales_js'):
+                    for endpoint in scraperpdf.sales_endpoints(product_id):
+                        sales_data = await self.evaluate(_FETCH_SALES_JS % json.dumps(endpoint), await_promise=True)
+                        if sales_data:
+                            recent_sales = scraperpdf.parse_recent_sales_response(sales_data)
+                            sales_source = 'js'
+                            break
+
+            body = {"from": 0, "size": scraperpdf.LISTING_COUNT * 4, "sort": [{"field": "price", "order": "asc"}]}
+            listings_url = scraperpdf.listings_api_url(product_id)
+            with timer.stage('listings_js'):
+                listings_data = await self.evaluate(_FETCH_LISTINGS_JS % (json.dumps(listings_url), json.dumps(body)),
+                                                    await_promise=True)
+            top_listings = []
+            if listings_data:
+                top_listings = scraperpdf.parse_listings_response(
+                    listings_data, product_id=product_id, market_price=scraperpdf.price_value(fields['Market Price']))
+
+            if scraperpdf.RECORD_DIR:
+                html = await self.evaluate('document.documentElement.outerHTML')
+                await asyncio.to_thread(replay.save_recording, scraperpdf.RECORD_DIR, product_id, html=html,
+                                        sales=sales_data, listings=listings_data)
+            scraperpdf.network_stats.add_page(self.bytes, self.blocked)
+            print(f"  → {product_name}: Market={fields['Market Price']}, {len(recent_sales)} sale records, "
+                  f"{len(top_listings)} listings captured")
+            return product_name, scraperpdf.build_product_record(
+                fields, recent_sales, top_listings,
+                meta={"ready_wait": round(ready_wait, 3),
+                      "ready_saved": round(scraperpdf.FIXED_SETTLE_SECONDS - ready_wait, 3),
+                      "sales_source": sales_source, "timings": timer.timings})
+        except Exception as e:
+            self.last_failure = await self._classify_failure(e)
+            print(f"  ✗ Scrape error for {url}: {e} [{self.last_failure}]")
+            return None, None
+
+    async def _classify_failure(self, error):
+        """Same classification as scraperpdf._classify_page_failure, read from the tab."""
+        try:
+            text = (await self.evaluate("document.title + ' ' + (document.body ? "
+                                        "document.body.innerText.slice(0, 20000) : '')") or '').lower()
+        except Exception:
+            text = ''
+        if any(marker in text for marker in scraperpdf.BLOCK_MARKERS):
+            return 'blocked'
+        if isinstance(error, asyncio.TimeoutError):
+            return 'timeout'
+        return 'error'
+
+
+class _Browser:
+    """A leased Chrome driven over its browser-level DevTools websocket."""
+
+    def __init__(self, driver, proxy, loop):
+        self.driver = driver
+        self.proxy = proxy
+        self.tabs = {}   # session id -> _Tab
+        self.scraped = 0
+        self.rotating = False   # set once the session is due for rotation; its tabs then stop taking work
+        self._loop = loop
+        self.conn = cdp_capture.CDPConnection(cdp_capture.browser_ws_url(driver))
+        self.conn.add_listener(self._on_event)
+
+    def _on_event(self, method, params, session_id):
+        # Called on the connection's reader thread — hand the event to the loop
+        if session_id and session_id in self.tabs:
+            try:
+                self._loop.call_soon_threadsafe(self._dispatch, method, params, session_id)
+            except RuntimeError:
+                pass  # loop already closed
+
+    def _dispatch(self, method, params, session_id):
+        tab = self.tabs.get(session_id)
+        if tab is not None:
+            tab.on_event(method, params)
+
+    async def open_tab(self, blocked_patterns=None):
+        target = await _call(self.conn, 'Target.createTarget', {'url': 'about:blank'})
+        attached = await _call(self.conn, 'Target.attachToTarget',
+                               {'targetId': target['targetId'], 'flatten': True})
+        tab = _Tab(self, target['targetId'], attached['sessionId'])
+        self.tabs[tab.session_id] = tab
+        await tab.call('Network.enable', {'maxTotalBufferSize': cdp_capture.MAX_TOTAL_BUFFER_BYTES,
+                                          'maxResourceBufferSize': cdp_capture.MAX_BODY_BYTES})
+        if blocked_patterns:
+            await tab.call('Network.setBlockedURLs', {'urls': list(blocked_patterns)})
+        return tab
+
+    async def close_tab(self, tab):
+        self.tabs.pop(tab.session_id, None)
+        try:
+            await _call(self.conn, 'Target.closeTarget', {'targetId': tab.target_id}, timeout=5)
+        except Exception:
+            pass
+
+    def close(self):
+        self.conn.close()
+
+
+class _RunState:
+    def __init__(self, total, progress_callback):
+        self.total = total
+        self.done = 0
+        self.succeeded = []
+        self.failed = []
+        self._progress_callback = progress_callback
+
+    def progress(self, message):
+        if self._progress_callback:
+            self._progress_callback(self.done, self.total, message)
+
+    def finish(self, message):
+        self.done += 1
+        self.progress(message)
+
+
+async def _scrape_with_retry(tab, product_id, url, retry_attempts, idle_window, limiter, limit):
+    """limit: the global concurrency semaphore, held only while a page is loading,
+    not during pacing or backoff sleeps."""
+    loop = asyncio.get_running_loop()
+    key = rate_limiter.proxy_label(tab.browser.proxy)
+    for attempt in range(1 + retry_attempts):
+        if limiter is not None:
+            await asyncio.sleep(limiter.reserve(key))
+        async with limit:
+            started = loop.time()
+            name, data = await tab.scrape(product_id, url, idle_window)
+        if data and name and name != "Unknown Product":
+            outcome = rate_limiter.OK
+        elif name == "Unknown Product" or tab.last_failure in ('blocked', 'timeout'):
+            outcome = rate_limiter.THROTTLED
+        else:
+            outcome = rate_limiter.FAILED
+        elapsed = loop.time() - started
+        metrics.fetch_seconds.observe(elapsed, proxy=key)
+        if limiter is not None:
+            limiter.record(key, outcome, elapsed)
+        if outcome == rate_limiter.OK:
+            data['_meta']['attempts'] = attempt + 1
+            return name, data
+        if attempt < retry_attempts:
+            metrics.retries.inc()
+            wait = scraperpdf.RETRY_BACKOFF * (2 ** attempt)
+            print(f"  Retry {attempt + 1}/{retry_attempts} in {wait}s...")
+            await asyncio.sleep(wait)
+    return None, None
+
+
+async def _tab_worker(label, browser, queue, limit, state, settings, limiter, driver_pool=None):
+    delay_range = tuple(settings.get('delay_between_requests', scraperpdf.DELAY_BETWEEN_REQUESTS))
+    retry_attempts = settings.get('retry_attempts', scraperpdf.RETRY_ATTEMPTS)
+    resume = settings.get('resume_enabled', False)
+    rotate_every = settings.get('session_rotate_every', scraperpdf.SESSION_ROTATE_EVERY)
+    idle_window = settings.get('readiness_idle_window', scraperpdf.READY_IDLE_WINDOW)
+    patterns = settings.get('blocked_url_patterns', []) if settings.get('block_resources_enabled') else None
+
+    try:
+        tab = await browser.open_tab(patterns)
+    except Exception as e:
+        # Leave the queue to the other tabs
+        print(f"  → [{label}] Could not open tab: {e}")
+        return
+
+    try:
+        while not browser.rotating:
+            try:
+                entry = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            product_id, url = scraperpdf.normalize_product(entry)
+            if product_id is None:
+                await asyncio.to_thread(scraperpdf.log_scrape, None, "skipped", f"[{label}] Could not parse: {entry}")
+                state.finish(f"Skipped: {entry}")
+                continue
+
+            if resume and scraperpdf._already_scraped_today(product_id):
+                await asyncio.to_thread(scraperpdf.log_scrape, product_id, "skipped", f"[{label}] Already scraped today")
+                state.finish(f"Skipped (already scraped): {product_id}")
+                continue
+
+            state.progress(f"[{label}] Scraping {product_id}...")
+            await asyncio.to_thread(scraperpdf._mark_in_flight, product_id)
+            retries = scraperpdf._retries_left(product_id, retry_attempts)
+            name, data = await _scrape_with_retry(tab, product_id, url, retries, idle_window, limiter, limit)
+
+            if data and name:
+                await asyncio.to_thread(scraperpdf._store_success, product_id, name, data,
+                                        f"[{label}] {name}{scraperpdf._readiness_note(data)}", browser.proxy)
+                state.succeeded.append(entry)
+                state.finish(name)
+            else:
+                metrics.products_failed.inc(reason=scraperpdf._failure_reason(name, tab.last_failure))
+                await asyncio.to_thread(scraperpdf.log_scrape, product_id, "failed",
+                                        f"[{label}] No data returned for {url}",
+                                        rate_limiter.proxy_label(browser.proxy), 1 + retries)
+                state.failed.append(entry)
+                state.finish(f"Failed: {product_id}")
+
+            browser.scraped += 1
+            if scraperpdf._rotation_due(driver_pool, browser.driver, browser.scraped, rotate_every):
+                browser.rotating = True
+
+            if limiter is None and not queue.empty():
+                await asyncio.sleep(random.uniform(*delay_range))
+    finally:
+        await browser.close_tab(tab)
+
+
+async def _start_browser(proxy, settings, driver_pool, loop):
+    ua = scraperpdf._random_ua() if settings.get('ua_rotation_enabled') else None
+    driver = await asyncio.to_thread(scraperpdf._acquire_driver, driver_pool, proxy, ua)
+    try:
+        return _Browser(driver, proxy, loop)
+    except Exception:
+        await asyncio.to_thread(scraperpdf._release_driver, driver_pool, driver)
+        raise
+
+
+async def _browser_slot(index, proxy, settings, driver_pool, loop, queue, limit, state, limiter):
+    """Run async_tabs_per_proxy tabs on one Chrome for this proxy until the queue is empty,
+    replacing the Chrome with a fresh session whenever it is due for rotation."""
+    tabs_per_proxy = max(1, int(settings.get('async_tabs_per_proxy', 4)))
+    while not queue.empty():
+        try:
+            browser = await _start_browser(proxy, settings, driver_pool, loop)
+        except Exception as e:
+            where = f"{proxy['host']}:{proxy['port']}" if proxy else "direct"
+            await asyncio.to_thread(scraperpdf.log_scrape, None, "error",
+                                    f"Failed to start Chrome for async engine ({where}): {e}")
+            return
+        try:
+            await asyncio.gather(*(_tab_worker(f"B{index}T{t}", browser, queue, limit, state, settings, limiter,
+                                               driver_pool)
+                                   for t in range(tabs_per_proxy)))
+        finally:
+            browser.close()
+            await asyncio.to_thread(scraperpdf._release_driver, driver_pool, browser.driver)
+        if not browser.rotating:
+            return  # queue drained, or no tab could be opened
+        if not queue.empty():
+            print(f"\n--- Rotating Chrome session B{index} (after {browser.scraped} products) ---")
+            metrics.driver_restarts.inc()
+
+
+async def _run(products, proxies, settings, progress_callback, driver_pool, limiter):
+    loop = asyncio.get_running_loop()
+    total = len(products)
+    tabs_per_proxy = max(1, int(settings.get('async_tabs_per_proxy', 4)))
+    limit = asyncio.Semaphore(max(1, int(settings.get('async_global_concurrency', 20))))
+
+    browser_proxies = list(proxies) if settings.get('proxies_enabled') and proxies else [None]
+    # Don't boot browsers that would have no tabs to run
+    browser_proxies = browser_proxies[:max(1, math.ceil(total / tabs_per_proxy))]
+
+    queue = asyncio.Queue()
+    for entry in products:
+        queue.put_nowait(entry)
+    state = _RunState(total, progress_callback)
+
+    print(f"Async scrape: {len(browser_proxies)} browser(s) x {tabs_per_proxy} tabs, {total} products")
+    await asyncio.gather(*(_browser_slot(b, proxy, settings, driver_pool, loop, queue, limit, state, limiter)
+                           for b, proxy in enumerate(browser_proxies)))
+
+    # Anything still queued had no working browser or tab to run on
+    while not queue.empty():
+        entry = queue.get_nowait()
+        metrics.products_failed.inc(reason='no_worker')
+        state.failed.append(entry)
+        state.finish(f"Failed: {entry}")
+
+    return len(state.succeeded), state.failed
+
+
+def run_async_scrape(products, proxies, settings, progress_callback=None, driver_pool=None, limiter=None):
+    """Scrape products on concurrent Chrome tabs. Returns (succeeded_count, failed_list).
+
+    Blocks until the run finishes; call it from a worker thread, like run_scrape.
+    limiter: optional AdaptiveRateLimiter; without one, tabs sleep the fixed delay between products.
+    """
+    succeeded, failed = asyncio.run(_run(products, proxies, settings, progress_callback, driver_pool, limiter))
+    print(f"\nDone: {succeeded} succeeded, {len(failed)} failed")
+    if failed:
+        print(f"Failed products: {failed}")
+    return succeeded, failed
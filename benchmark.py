@@ -0,0 +1,94 @@
+"""End-to-end scrape benchmark against the synthetic replay fixtures.
+
+Runs the real scraper (Chrome, readiness waits, sales/listings calls, parse,
+DB writes) against a local ReplayServer serving fixtures/replay, once per
+worker count, and reports per-stage p50/p95 timings and products/minute:
+
+    python benchmark.py --products 50 --workers 1,2,4 [--async] [--fast-path]
+                        [--pipeline] [--json results.json]
+
+The fixtures are five synthetic products in the replay format (generated pages
+of about 22 KB with made-up sellers and sales), not captures of live TCGplayer
+pages; larger runs reuse them under extra product IDs. Each run writes to a
+throwaway database, so the numbers are comparable before and after a change,
+but they don't say how fast a live scrape is: real pages are heavier and slower
+to load, and the site's response times and rate limits aren't modelled.
+"""
+
+import argparse
+import json
+import os
+import platform
+import tempfile
+from datetime import datetime
+
+import replay
+import scraperpdf
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'replay')
+SYNTHETIC_ID_BASE = 9000000
+
+
+def benchmark_products(record_dir, count):
+    """The fixture product IDs, padded with extra IDs up to count."""
+    fixture_ids = replay.recorded_products(record_dir)
+    extra = max(0, count - len(fixture_ids))
+    return (fixture_ids + [str(SYNTHETIC_ID_BASE + i) for i in range(extra)])[:count]
+
+
+def run_once(record_dir, products, workers, use_async=False, fast_path=False, pipeline=False):
+    """One replayed scrape. Returns a result dict with throughput and per-stage stats."""
+    with tempfile.TemporaryDirectory() as tmp:
+        succeeded, failed, elapsed = replay.run_offline(
+            record_dir, workers=workers, use_async=use_async, fast_path=fast_path,
+            db_path=os.path.join(tmp, 'benchmark.db'), products=products,
+            settings_overrides={'parse_pipeline_enabled': pipeline})
+    return {
+        'workers': workers,
+        'products': len(products),
+        'succeeded': succeeded,
+        'failed': len(failed),
+        'elapsed_s': round(elapsed, 3),
+        'products_per_min': round(succeeded / elapsed * 60, 1) if elapsed else 0.0,
+        'stages': scraperpdf.stage_timings.stats(),
+        'table': scraperpdf.stage_timings.table(),
+    }
+
+
+def print_summary(results):
+    for r in results:
+        print(f"\n=== {r['workers']} worker(s): {r['succeeded']}/{r['products']} in {r['elapsed_s']:.1f}s, "
+              f"{r['products_per_min']:.1f} products/min ===")
+        print(r['table'])
+    print(f"\n{'workers':>7} {'ok':>5} {'failed':>6} {'seconds':>8} {'products/min':>13}")
+    for r in results:
+        print(f"{r['workers']:>7} {r['succeeded']:>5} {r['failed']:>6} {r['elapsed_s']:>8.1f} "
+              f"{r['products_per_min']:>13.1f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the scraper end to end against the synthetic replay fixtures')
+    parser.add_argument('--fixtures', default=FIXTURES_DIR, help='Recording directory (default: fixtures/replay)')
+    parser.add_argument('--products', type=int, default=25, help='Products per run (default: 25)')
+    parser.add_argument('--workers', default='1', help='Comma-separated worker counts to compare (default: 1)')
+    parser.add_argument('--async', dest='use_async', action='store_true', help='Use the async tab engine')
+    parser.add_argument('--fast-path', action='store_true', help='Use the HTTP fast path')
+    parser.add_argument('--pipeline', action='store_true', help='Parse in the process-pool pipeline')
+    parser.add_argument('--json', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    products = benchmark_products(args.fixtures, args.products)
+    results = [run_once(args.fixtures, products, int(w), args.use_async, args.fast_path, args.pipeline)
+               for w in args.workers.split(',') if w.strip()]
+    print_summary(results)
+
+    if args.json:
+        report = {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'options': {'async': args.use_async, 'fast_path': args.fast_path, 'pipeline': args.pipeline},
+            'runs': [{k: v for k, v in r.items() if k != 'table'} for r in results],
+        }
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.json}")
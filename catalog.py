@@ -6,6 +6,7 @@ import ssl
 import time
 import urllib.request
 
+import db
 import scraperpdf
 
 DB_FILE = scraperpdf.DB_FILE
@@ -49,7 +50,7 @@ def _ssl_ctx():
 
 
 def init_catalog_db():
-    conn = sqlite3.connect(_db_path())
+    conn = db.connect(_db_path())
     conn.execute('''CREATE TABLE IF NOT EXISTS product_catalog (
         product_id TEXT PRIMARY KEY,
         name TEXT NOT NULL,
@@ -63,33 +64,27 @@ def init_catalog_db():
     except sqlite3.OperationalError:
         pass  # Column already exists
     conn.commit()
-    conn.close()
 
 
 def catalog_count():
-    conn = sqlite3.connect(_db_path())
-    count = conn.execute('SELECT COUNT(*) FROM product_catalog').fetchone()[0]
-    conn.close()
-    return count
+    return db.connect(_db_path()).execute('SELECT COUNT(*) FROM product_catalog').fetchone()[0]
 
 
 def load_catalog_from_csv(csv_path=None):
     path = csv_path or _csv_path()
     if not os.path.isfile(path):
         return 0
-    conn = sqlite3.connect(_db_path())
     with open(path, 'r', newline='') as f:
         reader = csv.DictReader(f)
         rows = []
         for row in reader:
             product_type = row.get('productType', 'sealed')
             rows.append((str(row['productId']), row['name'], row['groupName'], row['url'], product_type))
-    conn.executemany(
-        'INSERT OR REPLACE INTO product_catalog (product_id, name, group_name, url, product_type) VALUES (?, ?, ?, ?, ?)',
-        rows
-    )
-    conn.commit()
-    conn.close()
+    with db.transaction(_db_path()) as conn:
+        conn.executemany(
+            'INSERT OR REPLACE INTO product_catalog (product_id, name, group_name, url, product_type) VALUES (?, ?, ?, ?, ?)',
+            rows
+        )
     return len(rows)
 
 
@@ -125,14 +120,11 @@ def refresh_catalog(progress_callback=None):
         time.sleep(0.25)
 
     # Upsert into DB
-    conn = sqlite3.connect(_db_path())
-    for p in all_products:
-        conn.execute(
+    with db.transaction(_db_path()) as conn:
+        conn.executemany(
             'INSERT OR REPLACE INTO product_catalog (product_id, name, group_name, url, product_type) VALUES (?, ?, ?, ?, ?)',
-            (p['productId'], p['name'], p['groupName'], p['url'], p['productType'])
+            [(p['productId'], p['name'], p['groupName'], p['url'], p['productType']) for p in all_products]
         )
-    conn.commit()
-    conn.close()
 
     # Update CSV cache
     csv_path = _csv_path()
@@ -144,17 +136,8 @@ def refresh_catalog(progress_callback=None):
     return len(all_products)
 
 
-def search_catalog(query, limit=50, sealed_only=False):
-    """Search catalog by name, group, or product ID.
-    Supports multi-term search -- every word must match somewhere in name, group_name, or product_id.
-    Returns results with is_tracked flag."""
-    tracked = get_tracked_ids()
-    conn = sqlite3.connect(_db_path())
-    conn.row_factory = sqlite3.Row
-    terms = query.strip().split()
-    if not terms:
-        conn.close()
-        return []
+def _search_query(terms, limit, sealed_only):
+    """(sql, params) of a catalog search for terms."""
     # Each term must appear in name OR group_name OR product_id
     where_clauses = []
     params = []
@@ -168,8 +151,34 @@ def search_catalog(query, limit=50, sealed_only=False):
         sql += " AND product_type = 'sealed'"
     sql += ' ORDER BY name LIMIT ?'
     params.append(limit)
-    rows = conn.execute(sql, params).fetchall()
-    conn.close()
+    return sql, params
+
+
+def _tracked_query(tracked):
+    """(sql, params) selecting the catalog rows of the tracked product IDs."""
+    placeholders = ','.join('?' for _ in tracked)
+    return (f'SELECT product_id, name, group_name, url FROM product_catalog WHERE product_id IN ({placeholders})',
+            list(tracked))
+
+
+def example_queries():
+    """(name, sql, params) of the catalog's queries with sample parameters, for query plan checks."""
+    return [
+        ('catalog_count', 'SELECT COUNT(*) FROM product_catalog', ()),
+        ('search_catalog', *_search_query(['booster', 'box'], 50, True)),
+        ('get_tracked_products', *_tracked_query(['1', '2'])),
+    ]
+
+
+def search_catalog(query, limit=50, sealed_only=False):
+    """Search catalog by name, group, or product ID.
+    Supports multi-term search -- every word must match somewhere in name, group_name, or product_id.
+    Returns results with is_tracked flag."""
+    tracked = get_tracked_ids()
+    terms = query.strip().split()
+    if not terms:
+        return []
+    rows = db.connect(_db_path()).execute(*_search_query(terms, limit, sealed_only)).fetchall()
     return [{
         'product_id': r['product_id'],
         'name': r['name'],
@@ -196,14 +205,7 @@ def get_tracked_products():
     tracked = get_tracked_ids()
     if not tracked:
         return []
-    conn = sqlite3.connect(_db_path())
-    conn.row_factory = sqlite3.Row
-    placeholders = ','.join('?' for _ in tracked)
-    rows = conn.execute(
-        f'SELECT product_id, name, group_name, url FROM product_catalog WHERE product_id IN ({placeholders})',
-        list(tracked)
-    ).fetchall()
-    conn.close()
+    rows = db.connect(_db_path()).execute(*_tracked_query(tracked)).fetchall()
 
     catalog_map = {r['product_id']: dict(r) for r in rows}
     result = []
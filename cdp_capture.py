@@ -0,0 +1,261 @@
+"""Streaming Chrome DevTools Protocol capture for product page loads.
+
+Instead of buffering every network event in Chrome's performance log and
+decoding the whole buffer after each page, a NetworkCapture opens its own
+DevTools websocket to the page and listens for Network events as they happen.
+Responses are matched against per-page URL predicates as they arrive; only
+matching response bodies are fetched and kept, each capped in size, and all
+state is discarded when the next page begins.
+
+websocket-client is installed with Selenium. If it is missing, available()
+returns False and the scraper keeps using the performance log.
+"""
+
+import base64
+import concurrent.futures
+import itertools
+import json
+import threading
+import time
+import urllib.request
+
+try:
+    import websocket
+except ImportError:  # pragma: no cover - selenium depends on websocket-client
+    websocket = None
+
+MAX_BODY_BYTES = 2_000_000
+MAX_TOTAL_BUFFER_BYTES = 10_000_000
+
+
+def available():
+    """Whether streaming capture can be used in this environment."""
+    return websocket is not None
+
+
+class CDPError(Exception):
+    """Raised when a DevTools command returns an error or the connection drops."""
+
+
+def _debugger_address(driver):
+    return driver.capabilities['goog:chromeOptions']['debuggerAddress']
+
+
+def page_ws_url(driver):
+    """Return the DevTools websocket URL of the driver's current tab."""
+    with urllib.request.urlopen(f'http://{_debugger_address(driver)}/json', timeout=10) as r:
+        targets = json.loads(r.read())
+    # ChromeDriver window handles are DevTools target ids
+    handle = driver.current_window_handle
+    for target in targets:
+        if target.get('id') == handle and target.get('webSocketDebuggerUrl'):
+            return target['webSocketDebuggerUrl']
+    pages = [t for t in targets if t.get('type') == 'page' and t.get('webSocketDebuggerUrl')]
+    if not pages:
+        raise CDPError('No debuggable page target found')
+    return pages[0]['webSocketDebuggerUrl']
+
+
+def browser_ws_url(driver):
+    """Return the browser-level DevTools websocket URL for the driver's Chrome."""
+    with urllib.request.urlopen(f'http://{_debugger_address(driver)}/json/version', timeout=10) as r:
+        return json.loads(r.read())['webSocketDebuggerUrl']
+
+
+class CDPConnection:
+    """A DevTools websocket with a background reader thread.
+
+    send() returns a concurrent.futures.Future so callers on any thread (or an
+    asyncio loop, via asyncio.wrap_future) can wait for the result. Events are
+    passed to listeners on the reader thread, which must not block on call().
+    """
+
+    def __init__(self, ws_url, timeout=10):
+        if websocket is None:
+            raise CDPError('websocket-client is not installed')
+        # Chrome rejects DevTools websockets that send an unexpected Origin header
+        self._ws = websocket.create_connection(ws_url, timeout=timeout, suppress_origin=True,
+                                               enable_multithread=True)
+        self._ws.settimeout(None)
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self._reader = threading.Thread(target=self._read_loop, daemon=True)
+        self._reader.start()
+
+    def add_listener(self, fn):
+        """Register fn(method, params, session_id) for every event."""
+        self._listeners.append(fn)
+
+    def send(self, method, params=None, session_id=None):
+        future = concurrent.futures.Future()
+        msg = {'id': next(self._ids), 'method': method, 'params': params or {}}
+        if session_id:
+            msg['sessionId'] = session_id
+        with self._lock:
+            if self._closed:
+                future.set_exception(CDPError('Connection closed'))
+                return future
+            self._pending[msg['id']] = future
+        try:
+            self._ws.send(json.dumps(msg))
+        except Exception as e:
+            with self._lock:
+                self._pending.pop(msg['id'], None)
+            future.set_exception(CDPError(f'{method} failed: {e}'))
+        return future
+
+    def call(self, method, params=None, session_id=None, timeout=30):
+        """Send a command and block for its result."""
+        try:
+            return self.send(method, params, session_id).result(timeout)
+        except concurrent.futures.TimeoutError:
+            raise CDPError(f'{method} timed out')
+
+    def _read_loop(self):
+        while True:
+            try:
+                raw = self._ws.recv()
+            except Exception:
+                break
+            if not raw:
+                break
+            try:
+                msg = json.loads(raw)
+            except ValueError:
+                continue
+            if 'id' in msg:
+                with self._lock:
+                    future = self._pending.pop(msg['id'], None)
+                if future is None:
+                    continue
+                if 'error' in msg:
+                    future.set_exception(CDPError(msg['error'].get('message', 'CDP error')))
+                else:
+                    future.set_result(msg.get('result', {}))
+                continue
+            for fn in self._listeners:
+                try:
+                    fn(msg.get('method', ''), msg.get('params', {}), msg.get('sessionId'))
+                except Exception as e:
+                    print(f"  → CDP listener error: {e}")
+        self._fail_pending()
+
+    def _fail_pending(self):
+        with self._lock:
+            self._closed = True
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(CDPError('Connection closed'))
+
+    def close(self):
+        try:
+            self._ws.close()
+        except Exception:
+            pass
+        self._fail_pending()
+
+
+class NetworkCapture:
+    """Per-page network listener keeping only the response bodies it was asked to watch."""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._cond = threading.Condition()
+        self._generation = 0
+        self.begin_page({})
+        conn.add_listener(self._on_event)
+        conn.call('Network.enable', {'maxTotalBufferSize': MAX_TOTAL_BUFFER_BYTES,
+                                     'maxResourceBufferSize': MAX_BODY_BYTES})
+
+    @classmethod
+    def attach(cls, driver):
+        """Open a DevTools connection to the driver's tab and start listening."""
+        return cls(CDPConnection(page_ws_url(driver)))
+
+    def begin_page(self, watch):
+        """Reset state for a new page load.
+
+        watch: {key: predicate(url) -> bool}; the first response matching each
+        key has its JSON body captured.
+        """
+        with self._cond:
+            self._generation += 1
+            self._watch = dict(watch)
+            self._matched = {}     # requestId -> key, only for watched responses in flight
+            self._bodies = {}
+            self._bytes = 0
+            self._blocked = {}
+            self._last_activity = time.monotonic()
+
+    def _on_event(self, method, params, session_id):
+        if not method.startswith('Network.'):
+            return
+        with self._cond:
+            self._last_activity = time.monotonic()
+            request_id = params.get('requestId')
+            if method == 'Network.responseReceived':
+                url = params.get('response', {}).get('url', '')
+                for key, match in self._watch.items():
+                    if key not in self._bodies and key not in self._matched.values() and match(url):
+                        self._matched[request_id] = key
+                        break
+            elif method == 'Network.loadingFinished':
+                self._bytes += int(params.get('encodedDataLength') or 0)
+                key = self._matched.pop(request_id, None)
+                if key is not None:
+                    self._fetch_body(key, request_id, self._generation)
+            elif method == 'Network.loadingFailed':
+                self._matched.pop(request_id, None)
+                if params.get('blockedReason'):
+                    rtype = params.get('type') or 'Other'
+                    self._blocked[rtype] = self._blocked.get(rtype, 0) + 1
+
+    def _fetch_body(self, key, request_id, generation):
+        future = self._conn.send('Network.getResponseBody', {'requestId': request_id})
+        future.add_done_callback(lambda f: self._store_body(key, f, generation))
+
+    def _store_body(self, key, future, generation):
+        try:
+            result = future.result()
+            body = result.get('body', '')
+            if result.get('base64Encoded'):
+                body = base64.b64decode(body).decode('utf-8', errors='replace')
+            data = json.loads(body) if body and len(body) <= MAX_BODY_BYTES else None
+        except Exception:
+            data = None
+        with self._cond:
+            if generation != self._generation or data is None:
+                return
+            self._bodies[key] = data
+            self._cond.notify_all()
+
+    def wait_ready(self, key, idle_window, max_wait):
+        """Block until `key` has a captured body, the network is idle, or max_wait passes.
+        Returns the seconds waited."""
+        start = time.monotonic()
+        with self._cond:
+            while key not in self._bodies:
+                now = time.monotonic()
+                if now - start >= max_wait:
+                    break
+                if now - self._last_activity >= idle_window and key not in self._matched.values():
+                    break
+                self._cond.wait(min(idle_window, max_wait) / 5)
+        return time.monotonic() - start
+
+    def body(self, key):
+        """Return the captured JSON body for `key` on the current page, or None."""
+        with self._cond:
+            return self._bodies.get(key)
+
+    def page_stats(self):
+        """Return (bytes_transferred, blocked_by_type) for the current page."""
+        with self._cond:
+            return self._bytes, dict(self._blocked)
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,66 @@
+"""Shared SQLite connections.
+
+Each thread keeps one open connection per database file instead of every
+helper connecting and closing on each call. Connections are set up for a
+scrape writing while the web UI reads:
+
+- journal_mode=WAL: readers don't block the writer and the writer doesn't block readers
+- busy_timeout: wait for a lock instead of failing with "database is locked"
+- synchronous=NORMAL: safe under WAL, and commits no longer fsync every time
+- a larger statement cache, so the per-product INSERTs and SELECTs are prepared once per thread
+
+Rows come back as sqlite3.Row, which indexes and unpacks like a tuple as well as by column name.
+"""
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+BUSY_TIMEOUT_MS = 10000
+STATEMENT_CACHE_SIZE = 256
+
+_local = threading.local()
+
+
+def _open(path):
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, cached_statements=STATEMENT_CACHE_SIZE)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+def connect(path):
+    """This thread's connection to the database at path, opened on first use. Don't close it."""
+    # A forked child (e.g. a parse worker process) must not reuse its parent's connections
+    if getattr(_local, 'pid', None) != os.getpid():
+        _local.pid = os.getpid()
+        _local.conns = {}
+    path = os.path.abspath(path)
+    conn = _local.conns.get(path)
+    if conn is None:
+        conn = _local.conns[path] = _open(path)
+    return conn
+
+
+@contextmanager
+def transaction(path):
+    """Yield this thread's connection; commit on success, roll back if the block raises."""
+    conn = connect(path)
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    else:
+        conn.commit()
+
+
+def close():
+    """Close this thread's connections, e.g. before a long-lived thread goes idle."""
+    conns = getattr(_local, 'conns', None) or {}
+    for conn in conns.values():
+        conn.close()
+    conns.clear()
@@ -0,0 +1,247 @@
+"""Long-lived pool of Chrome drivers shared across scrape runs.
+
+The web process owns one pool. Scrape runs lease drivers from it instead of
+booting Chrome themselves, and return them when done. Each driver carries an
+age and request counter so it is retired on the same schedule as the old
+per-run session rotation, and idle spares are kept warm per proxy so the next
+run starts without paying Chrome's boot time.
+"""
+
+import threading
+import time
+
+
+def _proxy_key(proxy):
+    if not proxy:
+        return None
+    return (proxy.get('host'), str(proxy.get('port')), proxy.get('user'))
+
+
+class DriverPool:
+    def __init__(self, create_fn, cleanup_fn, max_requests=50, max_age=1800,
+                 spares=1, health_interval=60, user_agent_fn=None, max_drivers=None):
+        """
+        create_fn: callable(proxy=..., user_agent=...) returning a new driver
+        cleanup_fn: callable(driver) that quits a driver and removes its temp files
+        max_requests / max_age: retire a driver after this many products / seconds
+        spares: idle drivers to keep warm for each proxy that has been used
+        max_drivers: no spares are warmed while this many drivers are leased or idle
+        (a run sets it to its worker count plus spares); None for no cap
+        """
+        self._create_fn = create_fn
+        self._cleanup_fn = cleanup_fn
+        self.max_requests = max_requests
+        self.max_age = max_age
+        self.spares = spares
+        self.health_interval = health_interval
+        self.user_agent_fn = user_agent_fn
+        self.max_drivers = max_drivers
+
+        self._lock = threading.Lock()
+        self._idle = {}        # proxy key -> list of idle drivers
+        self._proxies = {}     # proxy key -> proxy dict, for replenishing spares
+        self._leased = set()
+        self._warming = set()  # proxy keys with a replenish thread running
+        self._creating = 0     # spares being started right now
+        self._checking = 0     # idle drivers taken out for a health check
+        self._stats = {"created": 0, "retired": 0, "unhealthy": 0, "leases": 0, "warm_hits": 0}
+        self._closed = False
+
+        self._stop = threading.Event()
+        self._maintainer = threading.Thread(target=self._maintain_loop, daemon=True)
+        self._maintainer.start()
+
+    def configure(self, max_requests, max_age, spares, user_agent_fn=None, max_drivers=None):
+        """Update rotation limits, UA choice and the driver cap from the current settings at the start of a run."""
+        with self._lock:
+            self.max_requests = max_requests
+            self.max_age = max_age
+            self.spares = spares
+            self.user_agent_fn = user_agent_fn
+            self.max_drivers = max_drivers
+
+    # --- Driver lifecycle ---
+
+    def _create(self, proxy):
+        ua = self.user_agent_fn() if self.user_agent_fn else None
+        driver = self._create_fn(proxy=proxy, user_agent=ua)
+        driver._pool_key = _proxy_key(proxy)
+        driver._pool_created = time.time()
+        driver._pool_requests = 0
+        with self._lock:
+            self._stats["created"] += 1
+        return driver
+
+    def _retire(self, driver):
+        with self._lock:
+            self._stats["retired"] += 1
+        try:
+            self._cleanup_fn(driver)
+        except Exception as e:
+            print(f"  → Error closing pooled driver: {e}")
+
+    def _is_expired(self, driver):
+        if self.max_requests and driver._pool_requests >= self.max_requests:
+            return True
+        return bool(self.max_age) and time.time() - driver._pool_created >= self.max_age
+
+    @staticmethod
+    def _is_healthy(driver):
+        try:
+            return driver.execute_script('return 1') == 1
+        except Exception:
+            return False
+
+    # --- Lease / return ---
+
+    def lease(self, proxy=None):
+        """Return a healthy driver for this proxy, reusing a warm one when possible."""
+        key = _proxy_key(proxy)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Driver pool is shut down")
+            self._proxies[key] = proxy
+            self._stats["leases"] += 1
+
+        while True:
+            with self._lock:
+                idle = self._idle.get(key) or []
+                driver = idle.pop() if idle else None
+            if driver is None:
+                driver = self._create(proxy)
+                break
+            if self._is_expired(driver):
+                self._retire(driver)
+                continue
+            if not self._is_healthy(driver):
+                with self._lock:
+                    self._stats["unhealthy"] += 1
+                self._retire(driver)
+                continue
+            with self._lock:
+                self._stats["warm_hits"] += 1
+            break
+
+        with self._lock:
+            self._leased.add(driver)
+        self._replenish_async(key)
+        return driver
+
+    def release(self, driver, retire=False):
+        """Return a leased driver. It is retired if asked to, expired, or unhealthy."""
+        with self._lock:
+            self._leased.discard(driver)
+            closed = self._closed
+        if retire or closed or self._is_expired(driver) or not self._is_healthy(driver):
+            self._retire(driver)
+            if not closed:
+                self._replenish_async(driver._pool_key)
+            return
+        try:
+            # Drop the previous product's page so an idle driver holds no state
+            driver.get('about:blank')
+        except Exception:
+            self._retire(driver)
+            return
+        with self._lock:
+            self._idle.setdefault(driver._pool_key, []).append(driver)
+
+    def record_request(self, driver):
+        """Count one product scraped on this driver. Returns True if it is now due for rotation."""
+        driver._pool_requests += 1
+        return self._is_expired(driver)
+
+    # --- Spares ---
+
+    def warm(self, proxies):
+        """Start warming spares for the given proxies (None for a direct connection)."""
+        for proxy in proxies:
+            key = _proxy_key(proxy)
+            with self._lock:
+                self._proxies[key] = proxy
+            self._replenish_async(key)
+
+    def _replenish_async(self, key):
+        with self._lock:
+            if self._closed or key in self._warming or self.spares <= 0:
+                return
+            self._warming.add(key)
+        threading.Thread(target=self._replenish, args=(key,), daemon=True).start()
+
+    def _live_count(self):
+        """Drivers leased, idle, being health-checked or being started as spares. Call with the lock held."""
+        return len(self._leased) + sum(len(v) for v in self._idle.values()) + self._checking + self._creating
+
+    def _replenish(self, key):
+        try:
+            while True:
+                with self._lock:
+                    if self._closed or len(self._idle.get(key) or []) >= self.spares:
+                        return
+                    if self.max_drivers and self._live_count() >= self.max_drivers:
+                        return
+                    proxy = self._proxies.get(key)
+                    self._creating += 1
+                try:
+                    driver = self._create(proxy)
+                except Exception as e:
+                    print(f"  → Could not warm spare Chrome driver: {e}")
+                    return
+                finally:
+                    with self._lock:
+                        self._creating -= 1
+                with self._lock:
+                    if not self._closed:
+                        self._idle.setdefault(key, []).append(driver)
+                        continue
+                self._retire(driver)
+                return
+        finally:
+            with self._lock:
+                self._warming.discard(key)
+
+    def _maintain_loop(self):
+        while not self._stop.wait(self.health_interval):
+            with self._lock:
+                keys = list(self._idle)
+            for key in keys:
+                # Take the idle drivers out while checking them, so a lease can't get one mid-check
+                with self._lock:
+                    drivers, self._idle[key] = self._idle.get(key, []), []
+                    self._checking += len(drivers)
+                healthy = []
+                for driver in drivers:
+                    if self._is_expired(driver) or not self._is_healthy(driver):
+                        self._retire(driver)
+                    else:
+                        healthy.append(driver)
+                with self._lock:
+                    self._checking -= len(drivers)
+                    if self._closed:
+                        retire = healthy
+                    else:
+                        retire = []
+                        self._idle.setdefault(key, []).extend(healthy)
+                for driver in retire:
+                    self._retire(driver)
+                self._replenish_async(key)
+
+    # --- Introspection / shutdown ---
+
+    def stats(self):
+        """Return pool counters plus current idle/leased driver counts."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["idle"] = sum(len(v) for v in self._idle.values())
+            stats["leased"] = len(self._leased)
+        return stats
+
+    def shutdown(self):
+        """Quit every idle driver. Leased drivers are quit when released."""
+        self._stop.set()
+        with self._lock:
+            self._closed = True
+            idle = [d for drivers in self._idle.values() for d in drivers]
+            self._idle.clear()
+        for driver in idle:
+            self._retire(driver)
@@ -0,0 +1,110 @@
+"""Resolve the chromedriver binary once per process.
+
+ChromeDriverManager().install() probes the installed Chrome version and checks
+its download cache every time it is called. The resolved path is kept in memory
+for the life of the process and persisted per Chrome version in the settings
+directory, so later runs skip the probe entirely. A stale entry is dropped and
+re-resolved only when Chrome rejects the driver with a version mismatch.
+"""
+
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service as ChromeService
+
+import settings as app_settings
+
+_lock = threading.Lock()
+_resolved = {}  # chrome binary -> (chrome version, driver path)
+
+_VERSION_RE = re.compile(r'(\d+\.\d+\.\d+\.\d+)')
+
+
+def _default_chrome_binary():
+    for name in ['google-chrome', 'google-chrome-stable', 'chromium-browser', 'chromium', 'chrome']:
+        found = shutil.which(name)
+        if found:
+            return found
+    if sys.platform == 'darwin':
+        return '/Applications/Google Chrome.app/Contents/MacOS/Google Chrome'
+    return None
+
+
+def chrome_version(chrome_binary=None):
+    """Return the installed Chrome version string (e.g. '124.0.6367.91'), or None."""
+    binary = chrome_binary or _default_chrome_binary()
+    if not binary or not os.path.isfile(binary):
+        return None
+
+    if sys.platform == 'win32':
+        # chrome.exe --version opens a browser window on Windows; the installer
+        # keeps a directory named after the version next to the executable.
+        try:
+            versions = [d for d in os.listdir(os.path.dirname(binary)) if _VERSION_RE.fullmatch(d)]
+        except OSError:
+            return None
+        return max(versions, key=lambda v: tuple(int(x) for x in v.split('.'))) if versions else None
+
+    try:
+        out = subprocess.run([binary, '--version'], capture_output=True, text=True, timeout=10).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    m = _VERSION_RE.search(out)
+    return m.group(1) if m else None
+
+
+def resolve_driver_path(chrome_binary=None, force=False):
+    """Return the chromedriver path for this Chrome, resolving at most once per process.
+
+    force: ignore the in-memory and persisted entries and ask ChromeDriverManager again.
+    """
+    with _lock:
+        if not force and chrome_binary in _resolved:
+            return _resolved[chrome_binary][1]
+
+        version = chrome_version(chrome_binary) or 'unknown'
+        cache = app_settings.load_driver_cache()
+        path = None if force else cache.get(version)
+        if not path or not os.path.isfile(path):
+            from webdriver_manager.chrome import ChromeDriverManager
+            path = ChromeDriverManager().install()
+            cache[version] = path
+            app_settings.save_driver_cache(cache)
+
+        _resolved[chrome_binary] = (version, path)
+        return path
+
+
+def invalidate(chrome_binary=None):
+    """Forget the resolved driver for this Chrome, in memory and on disk."""
+    with _lock:
+        entry = _resolved.pop(chrome_binary, None)
+        version = entry[0] if entry else (chrome_version(chrome_binary) or 'unknown')
+        cache = app_settings.load_driver_cache()
+        if cache.pop(version, None) is not None:
+            app_settings.save_driver_cache(cache)
+
+
+def is_version_mismatch(error):
+    """Whether a driver start-up error means chromedriver doesn't match the installed Chrome."""
+    msg = str(error).lower()
+    return ('only supports chrome version' in msg or
+            ('session not created' in msg and 'version' in msg))
+
+
+def new_chrome_driver(options, chrome_binary=None):
+    """Start Chrome with the cached driver path, re-resolving once on a version mismatch."""
+    try:
+        return webdriver.Chrome(service=ChromeService(resolve_driver_path(chrome_binary)), options=options)
+    except Exception as e:
+        if not is_version_mismatch(e):
+            raise
+        print(f"  → chromedriver does not match Chrome, re-resolving: {e}")
+        invalidate(chrome_binary)
+        path = resolve_driver_path(chrome_binary, force=True)
+        return webdriver.Chrome(service=ChromeService(path), options=options)
@@ -9,11 +9,11 @@ import time
 from urllib.parse import quote_plus
 
 from selenium import webdriver
-from selenium.webdriver.chrome.service import Service as ChromeService
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+
+import driver_resolver
 
 # ---------------------------------------------------------------
 # EDIT THIS LIST — paste your product names here
@@ -74,7 +74,7 @@ if __name__ == '__main__':
     options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
                          "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36")
 
-    driver = webdriver.Chrome(service=ChromeService(ChromeDriverManager().install()), options=options)
+    driver = driver_resolver.new_chrome_driver(options)
     wait = WebDriverWait(driver, 20)
 
     results = []  # [(name, url)]
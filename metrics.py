@@ -0,0 +1,165 @@
+"""In-process counters, gauges and histograms rendered in the Prometheus text format.
+
+The scraper and web app update the module-level metrics below as they run; the
+web app serves render() at /metrics so throughput drops can be alerted on
+without scraping our own pages. Values live in memory and reset on restart,
+which Prometheus handles for counters.
+"""
+
+import bisect
+import threading
+
+# Upper bounds in seconds, from DB writes (ms) up to slow page loads and PDF runs
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_registry = []
+_registry_lock = threading.Lock()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _label_text(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Shared registration and label handling. Counter, Gauge and Histogram each render
+    their own _samples()."""
+    type_name = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.type_name}']
+        lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    type_name = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        if not items and not self.label_names:
+            items = [((), 0)]
+        return [f'{self.name}{_label_text(self.label_names, key)} {_number(v)}' for key, v in items]
+
+
+class Gauge(_Metric):
+    """A value that goes up and down. set_function() reads it at render time instead."""
+
+    type_name = 'gauge'
+
+    def __init__(self, name, help_text, labels=()):
+        super().__init__(name, help_text, labels)
+        self._fn = None
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, fn):
+        self._fn = fn
+
+    def _samples(self):
+        if self._fn is not None:
+            return [f'{self.name} {_number(self._fn())}']
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f'{self.name}{_label_text(self.label_names, key)} {_number(v)}' for key, v in items]
+
+
+class Histogram(_Metric):
+    type_name = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, seconds, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, (None, 0.0))
+            if counts is None:
+                counts = [0] * (len(self.buckets) + 1)
+            counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            self._values[key] = (counts, total + seconds)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        if not items and not self.label_names:
+            items = [((), ([0] * (len(self.buckets) + 1), 0.0))]
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = _label_text(self.label_names, key, [('le', _number(bound))])
+                lines.append(f'{self.name}_bucket{le} {cumulative}')
+            labels = _label_text(self.label_names, key)
+            lines.append(f'{self.name}_sum{labels} {_number(total)}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+def render():
+    """All registered metrics in the Prometheus text exposition format."""
+    with _registry_lock:
+        metrics = list(_registry)
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# --- Scraper ---
+products_scraped = Counter('tcg_products_scraped_total', 'Products scraped and stored')
+products_failed = Counter('tcg_products_failed_total', 'Products that failed after all attempts', ['reason'])
+retries = Counter('tcg_scrape_retries_total', 'Product attempts that failed and were retried')
+fetch_seconds = Histogram('tcg_fetch_seconds', 'Time to fetch one product page or fast-path call', ['proxy'])
+driver_restarts = Counter('tcg_driver_restarts_total', 'Chrome sessions replaced by rotation')
+driver_create_seconds = Histogram('tcg_driver_create_seconds', 'Time to start a Chrome driver')
+db_write_seconds = Histogram('tcg_db_write_seconds', 'Time to store one product in the database')
+db_batch_seconds = Histogram('tcg_db_batch_seconds', 'Time to commit one batch of queued results')
+db_rows_dropped = Counter('tcg_db_rows_dropped_total', 'Queued rows the result writer could not store', ['kind'])
+pdf_seconds = Histogram('tcg_pdf_generation_seconds', 'Time to generate the PDF report')
+scrape_runs = Counter('tcg_scrape_runs_total', 'Scrape runs started')
+
+# --- Web app ---
+catalog_refresh_seconds = Histogram('tcg_catalog_refresh_seconds', 'Time to refresh the product catalog')
+http_request_seconds = Histogram('tcg_http_request_seconds', 'Flask request latency', ['route', 'method', 'status'])
+scrape_running = Gauge('tcg_scrape_running', 'Whether a scrape is running in the web app')
+scrape_progress = Gauge('tcg_scrape_progress_products', 'Products processed in the current scrape')
@@ -0,0 +1,74 @@
+"""Process-pool parse stage with a single writer thread.
+
+Browser threads only fetch: they hand each page's raw HTML and API JSON to
+submit(), parsing runs in a pool of worker processes (so BeautifulSoup and JSON
+normalization use every core instead of contending for the GIL with the threads
+driving Chrome), and every parsed result is passed to its callback on one writer
+thread, which owns all database writes for the run.
+"""
+
+import concurrent.futures
+import multiprocessing
+import os
+import queue
+import threading
+
+
+class ParsePipeline:
+    def __init__(self, parse_fn, processes=None, max_in_flight=None):
+        """
+        parse_fn: picklable top-level function(raw) -> result, run in the worker processes.
+            They are spawned rather than forked: the scraper's process runs many threads
+            (Flask, APScheduler, drivers, writers), and a lock one of them holds at fork
+            time would stay locked in the child.
+        processes: number of parser processes (default: one per CPU core)
+        max_in_flight: submit() blocks once this many pages are waiting to be parsed or written
+        """
+        self.processes = processes or os.cpu_count() or 1
+        self._parse_fn = parse_fn
+        self._pool = concurrent.futures.ProcessPoolExecutor(max_workers=self.processes,
+                                                            mp_context=multiprocessing.get_context('spawn'))
+        self._slots = threading.BoundedSemaphore(max_in_flight or self.processes * 4)
+        self._results = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def submit(self, raw, on_done):
+        """Queue raw page data for parsing. on_done(result, error) runs later on the writer thread."""
+        self._slots.acquire()
+        try:
+            future = self._pool.submit(self._parse_fn, raw)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda f: self._results.put((f, on_done)))
+
+    def submit_parsed(self, result, on_done):
+        """Hand an already-parsed result (e.g. from the HTTP fast path) straight to the writer."""
+        self._slots.acquire()
+        future = concurrent.futures.Future()
+        future.set_result(result)
+        self._results.put((future, on_done))
+
+    def _write_loop(self):
+        while True:
+            item = self._results.get()
+            if item is None:
+                return
+            future, on_done = item
+            try:
+                result, error = future.result(), None
+            except Exception as e:
+                result, error = None, e
+            try:
+                on_done(result, error)
+            except Exception as e:
+                print(f"  → Writer error: {e}")
+            finally:
+                self._slots.release()
+
+    def close(self):
+        """Wait for every submitted page to be parsed and written, then stop the workers."""
+        self._pool.shutdown(wait=True)
+        self._results.put(None)
+        self._writer.join()
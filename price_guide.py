@@ -0,0 +1,293 @@
+"""Targeted extraction of a product page's name, price guide and sales-data fields.
+
+Building a BeautifulSoup tree for a whole product page is most of the parse
+cost, yet only a few kilobytes of it are ever read. This module works on just
+the fragments that matter: the product name, the price-guide section and the
+sales-data rows. They are collected either in the browser with querySelector
+(EXTRACT_JS) or by slicing them out of saved HTML (extract_fragments), and
+only those fragments are parsed.
+
+parse_html() is the original full-document parse, kept for comparison. Run
+`python price_guide.py PAGE.html|DIR ...` to benchmark both on saved pages.
+"""
+
+import argparse
+import os
+import re
+import statistics
+import time
+
+from bs4 import BeautifulSoup
+
+# The same parser as parse_html(), so targeted and full parses agree on every machine
+FRAGMENT_PARSER = 'html.parser'
+
+SALES_SECTION_CLASSES = ['sales-data', 'sales-data__section', 'product-sales-data']
+
+_TOTAL_SOLD = re.compile(r'Total Sold', re.I)
+_SOLD_RECENT = re.compile(r'Sold (Yesterday|Today|Last\s*24)', re.I)
+_SOLD_LABEL = re.compile(r'Total Sold|Sold (Yesterday|Today|Last\s*24)', re.I)
+_MAX_ROW_BYTES = 5000
+
+# Returns the same fragments as extract_fragments(), straight from the live DOM
+EXTRACT_JS = r"""(() => {
+    const h1 = document.querySelector('h1.product-details__name') || document.querySelector('h1');
+    const guide = document.querySelector('section.price-guide__points');
+    let section = null;
+    for (const cls of %s) {
+        section = document.querySelector('section.' + cls) || document.querySelector('div.' + cls);
+        if (section) break;
+    }
+    const label = /Total Sold|Sold (Yesterday|Today|Last\s*24)/i;
+    const rows = [];
+    for (const tr of document.querySelectorAll('tr')) {
+        const td = tr.querySelector('td');
+        if (td && label.test(td.textContent)) rows.push(tr.outerHTML);
+    }
+    return {
+        name: h1 ? h1.textContent : null,
+        price_guide: guide ? guide.outerHTML : null,
+        sales_section: section ? section.outerHTML : null,
+        sales_rows: rows,
+    };
+})()""" % SALES_SECTION_CLASSES
+
+
+# --- Shared field readers (work on a full soup or a fragment) ---
+
+def _price_guide_fields(price_guide):
+    market_price = most_recent_sale = listed_median = current_quantity = current_sellers = 'N/A'
+
+    if price_guide:
+        # Market Price — find the first upper header row
+        for title_span in price_guide.find_all('span', class_='price-points__upper__header__title'):
+            if 'Market Price' in title_span.get_text():
+                row = title_span.find_parent('tr')
+                if row:
+                    val = row.find('span', class_='price-points__upper__price')
+                    if val:
+                        market_price = val.text.strip()
+                break
+
+        # Most Recent Sale
+        mrs_label = price_guide.find('span', string=lambda t: t and 'Most Recent Sale' in t.strip())
+        if mrs_label:
+            row = mrs_label.find_parent('tr')
+            if row:
+                val = row.find('span', class_='price-points__upper__price')
+                if val:
+                    most_recent_sale = val.text.strip()
+
+        def get_lower(label_text):
+            el = price_guide.find('span', class_='text', string=lambda t: t and label_text in t.strip())
+            if el:
+                sib = el.find_parent('td')
+                if sib:
+                    sib = sib.find_next_sibling('td')
+                if sib:
+                    val = sib.find('span', class_='price-points__lower__price')
+                    if val:
+                        return val.text.strip()
+            return 'N/A'
+
+        listed_median = get_lower('Listed Median:')
+
+        # Quantity & Sellers (may be on the same row)
+        qty_el = price_guide.find('span', class_='text', string=lambda t: t and 'Current Quantity:' in t.strip())
+        if qty_el:
+            row = qty_el.find_parent('tr')
+            if row:
+                spans = row.find_all('span', class_='price-points__lower__price')
+                current_quantity = spans[0].text.strip() if len(spans) >= 1 else 'N/A'
+                current_sellers = spans[1].text.strip() if len(spans) >= 2 else get_lower('Current Sellers:')
+        else:
+            current_quantity = get_lower('Current Quantity:')
+            current_sellers = get_lower('Current Sellers:')
+
+    return {
+        "Market Price": market_price,
+        "Most Recent Sale": most_recent_sale,
+        "Listed Median": listed_median,
+        "Current Quantity": current_quantity,
+        "Current Sellers": current_sellers,
+    }
+
+
+def _sales_values(rows, first_wins=False):
+    """Read (sold_yesterday, total_sold) from label/value table rows."""
+    sold_yesterday = total_sold = 'N/A'
+    for row in rows:
+        tds = row.find_all('td')
+        if len(tds) < 2:
+            continue
+        label = tds[0].get_text(strip=True)
+        val_el = tds[1].find('span')
+        value = val_el.text.strip() if val_el else tds[1].get_text(strip=True)
+        if _TOTAL_SOLD.search(label) and (not first_wins or total_sold == 'N/A'):
+            total_sold = value
+        elif _SOLD_RECENT.search(label) and (not first_wins or sold_yesterday == 'N/A'):
+            sold_yesterday = value
+    return sold_yesterday, total_sold
+
+
+def _fields(price_fields, sold_yesterday, total_sold):
+    return {**price_fields, "Sold Yesterday": sold_yesterday, "Total Sold": total_sold}
+
+
+# --- Full-document parse ---
+
+def parse_html(html):
+    """Parse the whole page with BeautifulSoup. Returns (product_name, fields)."""
+    soup = BeautifulSoup(html, 'html.parser')
+
+    product_name_el = soup.find('h1', class_='product-details__name') or soup.find('h1')
+    product_name = product_name_el.text.strip() if product_name_el else "Unknown Product"
+
+    price_fields = _price_guide_fields(soup.find('section', class_='price-guide__points'))
+
+    # TCGplayer's page has several structures for the sales-data section; try
+    # the dedicated section first, then every table row in the document.
+    sold_yesterday = total_sold = 'N/A'
+    for section_class in SALES_SECTION_CLASSES:
+        sales_section = soup.find('section', class_=section_class) or soup.find('div', class_=section_class)
+        if sales_section:
+            sold_yesterday, total_sold = _sales_values(sales_section.find_all('tr'))
+            break
+    if total_sold == 'N/A' and sold_yesterday == 'N/A':
+        sold_yesterday, total_sold = _sales_values(soup.find_all('tr'), first_wins=True)
+
+    return product_name, _fields(price_fields, sold_yesterday, total_sold)
+
+
+# --- Targeted parse ---
+
+def _element_html(html, tag, class_name=None):
+    """Return the outer HTML of the first <tag> (with class_name, if given), or None."""
+    if class_name:
+        start_re = re.compile(r'<%s\b[^>]*\bclass\s*=\s*["\'][^"\']*(?<![\w-])%s(?![\w-])'
+                              % (tag, re.escape(class_name)), re.I)
+    else:
+        start_re = re.compile(r'<%s\b' % tag, re.I)
+    m = start_re.search(html)
+    if not m:
+        return None
+    depth = 0
+    for t in re.compile(r'<(/?)%s\b' % tag, re.I).finditer(html, m.start()):
+        depth += -1 if t.group(1) else 1
+        if depth == 0:
+            end = html.find('>', t.end())
+            return html[m.start():end + 1] if end != -1 else None
+    return None
+
+
+def _sold_rows(html):
+    """Outer HTML of the table rows whose text mentions a sold-count label."""
+    rows = []
+    last_start = -1
+    for m in _SOLD_LABEL.finditer(html):
+        start = html.rfind('<tr', 0, m.start())
+        while start != -1 and html[start + 3:start + 4] not in (' ', '>', '\t', '\n', '\r'):
+            start = html.rfind('<tr', 0, start)
+        end = html.find('</tr>', m.end())
+        if start == -1 or end == -1 or start == last_start or end - start > _MAX_ROW_BYTES:
+            continue
+        last_start = start
+        rows.append(html[start:end + 5])
+    return rows
+
+
+def extract_fragments(html):
+    """Slice the fragments EXTRACT_JS would return out of a saved page's HTML."""
+    name_html = _element_html(html, 'h1', 'product-details__name') or _element_html(html, 'h1')
+    sales_section = None
+    for section_class in SALES_SECTION_CLASSES:
+        sales_section = _element_html(html, 'section', section_class) or _element_html(html, 'div', section_class)
+        if sales_section:
+            break
+    return {
+        'name': BeautifulSoup(name_html, FRAGMENT_PARSER).get_text() if name_html else None,
+        'price_guide': _element_html(html, 'section', 'price-guide__points'),
+        'sales_section': sales_section,
+        'sales_rows': _sold_rows(html),
+    }
+
+
+def parse_fragments(fragments):
+    """Parse the fragments from EXTRACT_JS or extract_fragments. Returns (product_name, fields)."""
+    name = fragments.get('name')
+    product_name = name.strip() if name is not None else "Unknown Product"
+
+    price_guide = None
+    if fragments.get('price_guide'):
+        price_guide = BeautifulSoup(fragments['price_guide'], FRAGMENT_PARSER).find('section')
+    price_fields = _price_guide_fields(price_guide)
+
+    sold_yesterday = total_sold = 'N/A'
+    if fragments.get('sales_section'):
+        section = BeautifulSoup(fragments['sales_section'], FRAGMENT_PARSER)
+        sold_yesterday, total_sold = _sales_values(section.find_all('tr'))
+    if total_sold == 'N/A' and sold_yesterday == 'N/A' and fragments.get('sales_rows'):
+        # Rows are wrapped in a table so every parser keeps the <tr>/<td> structure
+        table = BeautifulSoup('<table>' + ''.join(fragments['sales_rows']) + '</table>', FRAGMENT_PARSER)
+        sold_yesterday, total_sold = _sales_values(table.find_all('tr'), first_wins=True)
+
+    return product_name, _fields(price_fields, sold_yesterday, total_sold)
+
+
+def parse_targeted(html):
+    """Parse only the relevant fragments of a saved page. Returns (product_name, fields)."""
+    return parse_fragments(extract_fragments(html))
+
+
+# --- Benchmark ---
+
+def _page_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    if name.endswith(('.html', '.htm')):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def _time_parse(fn, html, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(html)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def benchmark(paths, repeat=5):
+    """Time the full and targeted parse on saved pages and check they agree.
+    Returns (full_times, targeted_times) in seconds per page."""
+    full_times, targeted_times = [], []
+    print(f"{'page':<40} {'KB':>7} {'full ms':>9} {'targeted ms':>12}  match")
+    for path in _page_files(paths):
+        with open(path, encoding='utf-8', errors='replace') as f:
+            html = f.read()
+        full_t, full = _time_parse(parse_html, html, repeat)
+        targeted_t, targeted = _time_parse(parse_targeted, html, repeat)
+        full_times.append(full_t)
+        targeted_times.append(targeted_t)
+        label = os.path.relpath(path)[-40:]
+        print(f"{label:<40} {len(html) / 1024:>7.0f} {full_t * 1000:>9.2f} {targeted_t * 1000:>12.2f}  "
+              f"{'yes' if full == targeted else 'NO'}")
+    if full_times:
+        full_ms = statistics.mean(full_times) * 1000
+        targeted_ms = statistics.mean(targeted_times) * 1000
+        print(f"\n{len(full_times)} pages")
+        print(f"mean per product: full {full_ms:.2f} ms, targeted {targeted_ms:.2f} ms "
+              f"({full_ms / targeted_ms if targeted_ms else 0:.1f}x faster)")
+    return full_times, targeted_times
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark full vs targeted product page parsing')
+    parser.add_argument('paths', nargs='+', help='Saved product page HTML files or directories of them')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per page; the fastest is reported')
+    args = parser.parse_args()
+    benchmark(args.paths, args.repeat)
@@ -0,0 +1,175 @@
+"""Priority scheduling: scrape volatile, fast-selling and valuable products more often.
+
+Each product is scored from its last LOOKBACK_DAYS of price history (how far its
+market price moves a day, how many copies sell a day, and what share of the listed
+quantity that is) and from its market price. A fixed daily budget of page loads
+is shared out in proportion to score, within a minimum and maximum refresh
+interval. Hot products therefore come due several times a day and dormant ones
+about once a week. run_scrape then scrapes only the products that are due, most
+overdue first, up to what is left of today's budget.
+
+price_history keeps one row per product and day, so a second scrape the same day
+replaces that day's row, and its changes are still computed against the day
+before. Extra scrapes of a hot product keep its latest prices fresher; they don't
+add history or move its score.
+"""
+
+import math
+from datetime import datetime, timedelta
+
+import db
+
+LOOKBACK_DAYS = 14
+
+# What each signal adds to a product's activity weight
+VOLATILITY_WEIGHT = 0.5     # per 1% average daily move in market price
+SALES_WEIGHT = 0.5          # per log(1 + average daily sales)
+SELL_THROUGH_WEIGHT = 0.1   # per 1% of the listed quantity sold a day, up to 100%
+
+# A product is due once this much of its interval has passed, so runs on a fixed
+# schedule don't skip a whole period because the last scrape finished a few minutes late
+DUE_FRACTION = 0.9
+
+# Written with every stored snapshot (see scraperpdf._store_snapshot)
+SCHEDULE_TOUCH = '''INSERT INTO product_schedule (product_id, last_scraped_at) VALUES (?, ?)
+    ON CONFLICT(product_id) DO UPDATE SET last_scraped_at = excluded.last_scraped_at'''
+
+_SCHEDULE_UPSERT = '''INSERT INTO product_schedule (product_id, score, interval_hours) VALUES (?, ?, ?)
+    ON CONFLICT(product_id) DO UPDATE SET score = excluded.score, interval_hours = excluded.interval_hours'''
+
+# One row per product with history: latest price and quantity, average absolute daily price
+# move and daily sales over the lookback window (NULL if none), and when it was last scraped
+PRODUCT_STATS_SELECT = '''SELECT l.product_id, p.market_price_num, p.current_quantity_num,
+    AVG(ABS(h.price_change)), AVG(h.daily_sales), COALESCE(s.last_scraped_at, p.date)
+FROM latest_price l
+INNER JOIN price_history p ON p.id = l.history_id
+LEFT JOIN price_history h ON h.product_id = l.product_id AND h.date >= ?
+LEFT JOIN product_schedule s ON s.product_id = l.product_id
+GROUP BY l.product_id'''
+
+# Page loads spent since a time: attempts of the run items finished since then
+PAGE_LOADS_SINCE_SELECT = '''SELECT COALESCE(SUM(attempts), 0) FROM scrape_run_item
+WHERE run_id IN (SELECT id FROM scrape_run WHERE started_at >= ?)
+    AND updated_at >= ? AND state IN ('succeeded', 'failed')'''
+
+
+def create_tables(conn):
+    """Create the product_schedule table if it doesn't exist."""
+    conn.execute('''CREATE TABLE IF NOT EXISTS product_schedule (
+        product_id TEXT PRIMARY KEY,
+        last_scraped_at TEXT,
+        score REAL,
+        interval_hours REAL
+    )''')
+
+
+def product_score(price, quantity, avg_move, avg_sales):
+    """Priority of one product: higher is scraped more often. None without a market price."""
+    if not price or price <= 0:
+        return None
+    move_pct = 100 * (avg_move or 0) / price
+    sales = max(avg_sales or 0, 0)
+    sell_through_pct = min(100 * sales / quantity, 100) if quantity else (100 if sales else 0)
+    activity = (1 + VOLATILITY_WEIGHT * move_pct + SALES_WEIGHT * math.log1p(sales)
+                + SELL_THROUGH_WEIGHT * sell_through_pct)
+    return activity * math.log10(10 + price)
+
+
+def allocate_intervals(scores, budget_per_day, min_hours, max_hours):
+    """Share budget_per_day scrapes among products in proportion to their scores.
+
+    scores: {product_id: score}. Returns {product_id: refresh interval in hours}, each
+    between min_hours and max_hours. Products held at a bound give their share back
+    to the rest, so the rates add up to the budget unless every product is at a bound.
+    """
+    max_rate, min_rate = 24 / min_hours, 24 / max_hours
+    rates = {}
+    free = dict(scores)
+    remaining = budget_per_day
+    while free:
+        total = sum(free.values())
+        share = {pid: remaining * score / total if total else remaining / len(free)
+                 for pid, score in free.items()}
+        bound, rate = [pid for pid, r in share.items() if r > max_rate], max_rate
+        if not bound:
+            bound, rate = [pid for pid, r in share.items() if r < min_rate], min_rate
+        if not bound:
+            rates.update(share)
+            break
+        for pid in bound:
+            rates[pid] = rate
+            remaining -= rate
+            del free[pid]
+    return {pid: 24 / rate for pid, rate in rates.items()}
+
+
+def plan(db_path, product_ids, budget_per_day=0, min_hours=4, max_hours=168, now=None):
+    """Score products and work out when each is next due. Reads only; store_plan() saves the result.
+
+    product_ids: the tracked product IDs. budget_per_day: page loads a day to share
+    out; 0 means one per product, the cost of scraping everything daily.
+    Returns [{product_id, score, interval_hours, last_scraped_at, next_due_at, overdue}],
+    most overdue first. A product with no history is due now.
+    """
+    now = now or datetime.now()
+    product_ids = list(dict.fromkeys(str(pid) for pid in product_ids))
+    tracked = set(product_ids)
+    since = (now - timedelta(days=LOOKBACK_DAYS)).strftime('%Y-%m-%d')
+    stats = {r[0]: r for r in db.connect(db_path).execute(PRODUCT_STATS_SELECT, (since,)) if r[0] in tracked}
+    scores = {pid: product_score(*stats[pid][1:5]) for pid in stats}
+    # A product without a price can't be scored; scrape it as often as the median one
+    known = sorted(s for s in scores.values() if s is not None)
+    median = known[len(known) // 2] if known else 1.0
+    scores = {pid: median if s is None else s for pid, s in scores.items()}
+    budget = budget_per_day or len(product_ids)
+    # New products are scraped right away and take their share from the budget first
+    new_count = len(product_ids) - len(scores)
+    intervals = allocate_intervals(scores, max(budget - new_count, 0), min_hours, max_hours)
+
+    rows = []
+    for pid in product_ids:
+        if pid not in scores:
+            rows.append({'product_id': pid, 'score': None, 'interval_hours': min_hours,
+                         'last_scraped_at': None, 'next_due_at': now.isoformat(), 'overdue': math.inf})
+            continue
+        last = datetime.fromisoformat(stats[pid][5])
+        interval = intervals[pid]
+        rows.append({'product_id': pid, 'score': round(scores[pid], 3), 'interval_hours': round(interval, 2),
+                     'last_scraped_at': last.isoformat(),
+                     'next_due_at': (last + timedelta(hours=interval)).isoformat(timespec='seconds'),
+                     'overdue': (now - last).total_seconds() / 3600 / interval})
+    rows.sort(key=lambda r: -r['overdue'])
+    return rows
+
+
+def store_plan(db_path, rows):
+    """Save the scores and intervals of plan() rows in product_schedule."""
+    with db.transaction(db_path) as conn:
+        conn.executemany(_SCHEDULE_UPSERT, [(r['product_id'], r['score'], r['interval_hours'])
+                                            for r in rows if r['score'] is not None])
+
+
+def page_loads_today(db_path, now=None):
+    """Page loads spent by scrape runs since midnight."""
+    now = now or datetime.now()
+    today = now.strftime('%Y-%m-%d')
+    yesterday = (now - timedelta(days=1)).strftime('%Y-%m-%d')
+    return db.connect(db_path).execute(PAGE_LOADS_SINCE_SELECT, (yesterday, today)).fetchone()[0]
+
+
+def due_products(db_path, entries, budget_per_day=0, min_hours=4, max_hours=168, now=None):
+    """The entries to scrape now. entries: [(entry, product_id)].
+
+    Returns (due entries, most overdue first and no more than today's remaining budget,
+    the plan() rows). Entries without a product ID are passed through so they're logged
+    as unparseable.
+    """
+    rows = plan(db_path, [pid for _, pid in entries if pid], budget_per_day, min_hours, max_hours, now)
+    store_plan(db_path, rows)
+    budget = budget_per_day or len(rows)
+    remaining = max(budget - page_loads_today(db_path, now), 0)
+    due = [r['product_id'] for r in rows if r['overdue'] >= DUE_FRACTION][:remaining]
+    by_id = {}
+    for entry, pid in entries:
+        by_id.setdefault(pid, entry)
+    return [entry for entry, pid in entries if pid is None] + [by_id[pid] for pid in due], rows
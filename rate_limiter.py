@@ -0,0 +1,108 @@
+"""Adaptive request pacing shared by all scrape workers.
+
+Each proxy (and the direct connection) gets its own token bucket, and every
+request also draws from one global bucket. Rates follow AIMD: each quick
+success adds a little to the proxy's and the global rate, and any sign of
+throttling (HTTP 429, a captcha page, a timeout, an "Unknown Product" page)
+halves them and holds that proxy off for one full interval. Runs speed up on
+nights TCGplayer is responsive and slow down as soon as it pushes back.
+"""
+
+import random
+import threading
+import time
+
+OK = 'ok'
+THROTTLED = 'throttled'
+FAILED = 'failed'       # an ordinary failure — neither speeds up nor slows down
+
+JITTER = (0.75, 1.25)   # spread request starts so they don't land on a fixed cadence
+
+
+def proxy_label(proxy):
+    """Stable bucket key for a proxy dict, or 'direct' for no proxy."""
+    if not proxy:
+        return 'direct'
+    return f"{proxy.get('host')}:{proxy.get('port')}"
+
+
+class _Bucket:
+    def __init__(self, rate):
+        self.rate = rate
+        self.next_at = 0.0
+        self.requests = 0
+        self.throttled = 0
+
+
+class AdaptiveRateLimiter:
+    def __init__(self, max_rate=0.5, global_max_rate=3.0, min_rate=1 / 60,
+                 initial_delay=3.0, increase=0.02, decrease=0.5, slow_seconds=20):
+        """
+        max_rate / global_max_rate: ceilings in requests per second, per proxy and overall
+        min_rate: floor for any bucket after repeated backoffs
+        initial_delay: seconds between requests a proxy starts at
+        increase / decrease: additive step and multiplicative factor applied per outcome
+        slow_seconds: successes slower than this don't raise the rate
+        """
+        self._lock = threading.Lock()
+        self.min_rate = min_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.slow_seconds = slow_seconds
+        self.configure(max_rate, global_max_rate, initial_delay)
+
+    def configure(self, max_rate, global_max_rate, initial_delay):
+        """Set limits from the current settings and reset all buckets for a new run."""
+        with self._lock:
+            self.max_rate = max_rate
+            self.global_max_rate = global_max_rate
+            self.initial_rate = min(max_rate, 1 / max(initial_delay, 0.01))
+            self._global = _Bucket(global_max_rate)
+            self._buckets = {}
+
+    def _bucket(self, key):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket(self.initial_rate)
+        return bucket
+
+    def reserve(self, key):
+        """Claim the next request slot for this proxy. Returns the seconds to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._bucket(key)
+            start = max(now, bucket.next_at, self._global.next_at)
+            bucket.next_at = start + random.uniform(*JITTER) / bucket.rate
+            self._global.next_at = start + 1 / self._global.rate
+            bucket.requests += 1
+            return start - now
+
+    def wait(self, key):
+        """Block until this proxy may send its next request."""
+        delay = self.reserve(key)
+        if delay > 0:
+            time.sleep(delay)
+
+    def record(self, key, outcome, elapsed=None):
+        """Adjust rates after a request finished with OK, THROTTLED or FAILED."""
+        with self._lock:
+            bucket = self._bucket(key)
+            if outcome == THROTTLED:
+                bucket.throttled += 1
+                bucket.rate = max(self.min_rate, bucket.rate * self.decrease)
+                self._global.rate = max(self.min_rate, self._global.rate * self.decrease)
+                bucket.next_at = max(bucket.next_at, time.monotonic() + 1 / bucket.rate)
+            elif outcome == OK and (elapsed is None or elapsed < self.slow_seconds):
+                bucket.rate = min(self.max_rate, bucket.rate + self.increase)
+                self._global.rate = min(self.global_max_rate, self._global.rate + self.increase)
+
+    def stats(self):
+        """Current rates (requests per minute) and counters, for the status API."""
+        with self._lock:
+            return {
+                "global_per_min": round(self._global.rate * 60, 2),
+                "proxies": {
+                    key: {"per_min": round(b.rate * 60, 2), "requests": b.requests, "throttled": b.throttled}
+                    for key, b in self._buckets.items()
+                },
+            }
@@ -0,0 +1,274 @@
+"""Record TCGplayer pages and API responses, and replay them offline.
+
+Recording (set record_dir, or `python replay.py record DIR ID ...`) stores one
+directory per product:
+
+    DIR/<product_id>/page.html      rendered page, scripts and external assets removed
+    DIR/<product_id>/sales.json     latestsales response
+    DIR/<product_id>/listings.json  mp-search-api listings response
+    DIR/<product_id>/details.json   product details response (HTTP fast path only)
+
+ReplayServer is a stand-in for www.tcgplayer.com, mpapi and mp-search-api that
+serves those files. Pointing the scraper's base URLs at it runs the whole
+pipeline — sequential, parallel or async, fast path, PDF — without touching the
+live site:
+
+    python replay.py serve DIR [--port 8765]
+    python replay.py run DIR [--workers N] [--async] [--fast-path] [--pdf]
+"""
+
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PAGE_FILE = 'page.html'
+SALES_FILE = 'sales.json'
+LISTINGS_FILE = 'listings.json'
+DETAILS_FILE = 'details.json'
+
+_SCRIPT_RE = re.compile(r'<script\b.*?</script\s*>', re.I | re.S)
+_EXTERNAL_RE = re.compile(r'<(?:link|iframe)\b[^>]*>(?:\s*</iframe>)?', re.I)
+
+# Most specific first: the sales and listings paths also contain /product/<id>
+_ROUTES = [
+    ('sales', re.compile(r'/product/(\d+)/latestsales'), SALES_FILE),
+    ('listings', re.compile(r'/v1/product/(\d+)/listings'), LISTINGS_FILE),
+    ('details', re.compile(r'/v1/product/(\d+)/details'), DETAILS_FILE),
+    ('page', re.compile(r'^/product/(\d+)'), PAGE_FILE),
+]
+
+
+# --- Recording ---
+
+def static_page(html):
+    """Strip scripts and external resources so a recorded page renders as-is offline."""
+    return _EXTERNAL_RE.sub('', _SCRIPT_RE.sub('', html))
+
+
+def save_recording(record_dir, product_id, html=None, sales=None, listings=None, details=None):
+    """Write whichever parts of a product fetch are given into record_dir/<product_id>/."""
+    product_dir = os.path.join(record_dir, str(product_id))
+    os.makedirs(product_dir, exist_ok=True)
+    if html is not None:
+        with open(os.path.join(product_dir, PAGE_FILE), 'w', encoding='utf-8') as f:
+            f.write(static_page(html))
+    for filename, data in ((SALES_FILE, sales), (LISTINGS_FILE, listings), (DETAILS_FILE, details)):
+        if data is not None:
+            with open(os.path.join(product_dir, filename), 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+
+
+def recorded_products(record_dir):
+    """Product IDs with a recorded page or details response, in sorted order."""
+    ids = []
+    for name in os.listdir(record_dir):
+        product_dir = os.path.join(record_dir, name)
+        if name.isdigit() and (os.path.isfile(os.path.join(product_dir, PAGE_FILE)) or
+                               os.path.isfile(os.path.join(product_dir, DETAILS_FILE))):
+            ids.append(name)
+    return sorted(ids, key=int)
+
+
+# --- Replay ---
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _cors_headers(self):
+        origin = self.headers.get('Origin')
+        self.send_header('Access-Control-Allow-Origin', origin or '*')
+        if origin:
+            self.send_header('Access-Control-Allow-Credentials', 'true')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, Accept, X-Requested-With')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+
+    def _send(self, status, body=b'', content_type='text/plain'):
+        self.send_response(status)
+        self._cors_headers()
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _serve(self):
+        # Drain any request body so keep-alive connections stay in sync
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+
+        path = self.path.split('?', 1)[0]
+        if path == '/':
+            self.server.count('home')
+            return self._send(200, b'<html><body>replay</body></html>', 'text/html; charset=utf-8')
+        for kind, pattern, filename in _ROUTES:
+            m = pattern.search(path)
+            if not m:
+                continue
+            file_path = os.path.join(self.server.record_dir, self.server.source_id(m.group(1)), filename)
+            if not os.path.isfile(file_path):
+                break
+            self.server.count(kind)
+            with open(file_path, 'rb') as f:
+                body = f.read()
+            content_type = 'text/html; charset=utf-8' if kind == 'page' else 'application/json'
+            return self._send(200, body, content_type)
+        self.server.count('missing')
+        self._send(404, b'not recorded')
+
+    def do_GET(self):
+        self._serve()
+
+    def do_POST(self):
+        self._serve()
+
+    def do_OPTIONS(self):
+        self._send(204)
+
+
+class ReplayServer(ThreadingHTTPServer):
+    """Local HTTP server replaying a recording directory. Port 0 picks a free port.
+    With cycle=True, product IDs that were not recorded are served from a recorded
+    product (chosen by ID modulo the number of recordings), so any number of
+    products can be scraped from a handful of fixtures."""
+
+    daemon_threads = True
+
+    def __init__(self, record_dir, host='127.0.0.1', port=0, cycle=False):
+        super().__init__((host, port), _ReplayHandler)
+        self.record_dir = record_dir
+        self._recorded = recorded_products(record_dir) if cycle else None
+        self._stats_lock = threading.Lock()
+        self.stats = {}
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def source_id(self, product_id):
+        """The recorded product whose files answer requests for product_id."""
+        if self._recorded and not os.path.isdir(os.path.join(self.record_dir, product_id)):
+            return self._recorded[int(product_id) % len(self._recorded)]
+        return product_id
+
+    def count(self, kind):
+        with self._stats_lock:
+            self.stats[kind] = self.stats.get(kind, 0) + 1
+
+    def start(self):
+        """Serve in a background thread. Returns self."""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def endpoint_overrides(base_url):
+    """Settings that point every scraper request at a replay server."""
+    return {'site_base_url': base_url, 'search_api_base_url': base_url, 'sales_api_base_url': base_url}
+
+
+def run_offline(record_dir, workers=1, use_async=False, fast_path=False, pdf=False, db_path=None,
+                products=None, settings_overrides=None):
+    """Scrape every recorded product against a local ReplayServer at full speed.
+    Results go to a separate database (record_dir/replay.db by default).
+    products: scrape these IDs instead, cycling through the recordings for unrecorded ones.
+    settings_overrides: extra settings applied on top of the replay settings.
+    Returns (succeeded_count, failed_list, elapsed_seconds)."""
+    import scraperpdf
+
+    if not recorded_products(record_dir):
+        print(f"No recordings found in {record_dir}")
+        return 0, [], 0.0
+
+    server = ReplayServer(record_dir, cycle=products is not None).start()
+    if products is None:
+        products = recorded_products(record_dir)
+    # Restored afterwards, so later scrapes in this process go back to the real database
+    saved_paths = scraperpdf.DB_FILE, scraperpdf.DEFAULT_PDF_OUTPUT
+    scraperpdf.DB_FILE = os.path.abspath(db_path or os.path.join(record_dir, 'replay.db'))
+    scraperpdf.DEFAULT_PDF_OUTPUT = os.path.abspath(os.path.join(record_dir, 'replay_report.pdf'))
+    overrides = {
+        **endpoint_overrides(server.url),
+        # Each worker gets a direct connection; the replay server is local
+        'proxies_enabled': True,
+        'parallel_enabled': workers > 1,
+        'parallel_max_workers': workers,
+        'async_engine_enabled': use_async,
+        'http_fast_path_enabled': fast_path,
+        'resume_enabled': False,
+        'adaptive_rate_enabled': False,
+        'delay_between_requests': [0, 0],
+        'record_dir': '',
+        **(settings_overrides or {}),
+    }
+    print(f"Replaying {len(products)} products from {server.url}")
+    started = time.perf_counter()
+    try:
+        succeeded, failed = scraperpdf.run_scrape(generate_pdf=pdf, products=products,
+                                                  proxies=[None] * max(1, workers),
+                                                  settings_overrides=overrides)
+    finally:
+        elapsed = time.perf_counter() - started
+        server.stop()
+        scraperpdf.DB_FILE, scraperpdf.DEFAULT_PDF_OUTPUT = saved_paths
+
+    rate = succeeded / elapsed * 60 if elapsed else 0
+    print(f"Replay: {succeeded}/{len(products)} succeeded in {elapsed:.1f}s ({rate:.1f} products/min)")
+    print(f"Requests served: {server.stats}")
+    return succeeded, failed, elapsed
+
+
+def record_live(record_dir, products):
+    """Scrape products from the live site with recording on."""
+    import scraperpdf
+    os.makedirs(record_dir, exist_ok=True)
+    return scraperpdf.run_scrape(generate_pdf=False, products=products or None,
+                                 settings_overrides={'record_dir': os.path.abspath(record_dir)})
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Record and replay TCGplayer product fetches')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_record = sub.add_parser('record', help='Scrape live and save pages and API responses')
+    p_record.add_argument('dir')
+    p_record.add_argument('products', nargs='*', help='Product IDs or URLs (default: products.txt)')
+
+    p_serve = sub.add_parser('serve', help='Serve a recording directory as a stand-in site')
+    p_serve.add_argument('dir')
+    p_serve.add_argument('--port', type=int, default=8765)
+
+    p_run = sub.add_parser('run', help='Scrape every recorded product against a local replay server')
+    p_run.add_argument('dir')
+    p_run.add_argument('--workers', type=int, default=1, help='Parallel Chrome workers (default: 1)')
+    p_run.add_argument('--async', dest='use_async', action='store_true', help='Use the async tab engine')
+    p_run.add_argument('--fast-path', action='store_true', help='Use the HTTP fast path')
+    p_run.add_argument('--pdf', action='store_true', help='Generate the PDF report')
+    p_run.add_argument('--db', help='Database for replayed results (default: DIR/replay.db)')
+
+    args = parser.parse_args()
+    if args.command == 'record':
+        record_live(args.dir, args.products)
+    elif args.command == 'serve':
+        server = ReplayServer(args.dir, port=args.port)
+        print(f"Replaying {len(recorded_products(args.dir))} products at {server.url}")
+        print(f"Point site_base_url, search_api_base_url and sales_api_base_url at it. Ctrl+C to stop.")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.server_close()
+    else:
+        run_offline(args.dir, workers=args.workers, use_async=args.use_async,
+                    fast_path=args.fast_path, pdf=args.pdf, db_path=args.db)
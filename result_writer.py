@@ -0,0 +1,105 @@
+"""Single writer thread that stores scrape results in batched transactions.
+
+Scrape workers put() rows instead of writing them; one thread drains the
+queue and commits every batch_size rows or every flush_seconds, whichever
+comes first. One transaction (and fsync) per batch replaces one per product
+and log entry, and the writers never contend for SQLite's write lock.
+"""
+
+import queue
+import threading
+import time
+
+import db
+import metrics
+
+_STOP = object()
+
+
+class ResultWriter:
+    def __init__(self, db_path, write_batch, batch_size=50, flush_seconds=1.0):
+        """
+        write_batch: function(conn, items) that writes a list of (kind, args) items;
+        it runs on the writer thread inside one transaction per batch
+        """
+        self.db_path = db_path
+        self.batch_size = max(1, batch_size)
+        self.flush_seconds = flush_seconds
+        self.rows_written = 0
+        self.batches = 0
+        self.dropped = []  # (kind, args) of rows that failed on their own as well
+        self._write_batch = write_batch
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def put(self, kind, *args):
+        """Queue one row for the next batch."""
+        self._queue.put((kind, args))
+
+    def flush(self):
+        """Block until everything put() so far is committed."""
+        self._queue.join()
+
+    def close(self):
+        """Commit whatever is queued and stop the writer thread."""
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _run(self):
+        batch = []
+        deadline = None
+        stopping = False
+        while not stopping:
+            timeout = None if not batch else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                stopping = True
+                self._queue.task_done()
+            elif item is not None:
+                if not batch:
+                    deadline = time.monotonic() + self.flush_seconds
+                batch.append(item)
+                # Take whatever else is already waiting without blocking
+                while len(batch) < self.batch_size:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                        self._queue.task_done()
+                        break
+                    batch.append(item)
+            if batch and (stopping or len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                self._commit(batch)
+                for _ in batch:
+                    self._queue.task_done()
+                batch = []
+        db.close()
+
+    def _commit(self, batch):
+        started = time.perf_counter()
+        try:
+            with db.transaction(self.db_path) as conn:
+                self._write_batch(conn, batch)
+            written = len(batch)
+        except Exception as e:
+            # Fall back to one transaction per row so a bad row doesn't lose the batch
+            print(f"  → Writer: batch of {len(batch)} failed ({e}); writing rows one at a time")
+            written = 0
+            for item in batch:
+                try:
+                    with db.transaction(self.db_path) as conn:
+                        self._write_batch(conn, [item])
+                    written += 1
+                except Exception as row_error:
+                    print(f"  → Writer: dropped {item[0]} row: {row_error}")
+                    self.dropped.append(item)
+                    metrics.db_rows_dropped.inc(kind=item[0])
+        metrics.db_batch_seconds.observe(time.perf_counter() - started)
+        self.rows_written += written
+        self.batches += 1
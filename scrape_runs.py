@@ -0,0 +1,195 @@
+"""Durable checkpoints for scrape runs.
+
+run_scrape records each run in scrape_run, with a snapshot of its product list in
+scrape_run_item (one row per entry), and moves every item through pending →
+in_flight → succeeded / failed / skipped along with the attempts it has used. A
+run whose process was killed stays 'running', and one whose run_scrape raised is
+marked 'interrupted'; either can be resumed, which scrapes only its unfinished
+items and gives each the retry budget it has left.
+"""
+
+import json
+from datetime import datetime
+
+import db
+
+PENDING = 'pending'
+IN_FLIGHT = 'in_flight'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+SKIPPED = 'skipped'
+
+RUNNING = 'running'
+FINISHED = 'finished'
+INTERRUPTED = 'interrupted'
+
+# log_scrape statuses and the item state each one leaves behind. A requeued
+# product is pending again until a worker takes it.
+_LOG_STATES = {'success': SUCCEEDED, 'retry': PENDING, 'failed': FAILED, 'skipped': SKIPPED}
+
+ITEM_UPDATE = '''UPDATE scrape_run_item SET state = ?, attempts = COALESCE(?, attempts), updated_at = ?,
+    message = COALESCE(?, message) WHERE run_id = ? AND product_id = ?'''
+
+_RUN_INSERT = "INSERT INTO scrape_run (started_at, status, total) VALUES (?, 'running', ?)"
+_ITEM_INSERT = '''INSERT INTO scrape_run_item (run_id, position, entry, product_id, state, message)
+    VALUES (?, ?, ?, ?, ?, ?)'''
+_RUN_SELECT = 'SELECT * FROM scrape_run WHERE id = ?'
+_UNFINISHED_RUN_SELECT = '''SELECT * FROM scrape_run WHERE status IN ('running', 'interrupted') AND started_at >= ?
+    ORDER BY id DESC LIMIT 1'''
+_INTERRUPT_RUNNING = "UPDATE scrape_run SET status = 'interrupted' WHERE status = 'running'"
+_REQUEUE_IN_FLIGHT = '''UPDATE scrape_run_item SET state = 'pending', attempts = attempts + 1
+    WHERE run_id = ? AND state = 'in_flight' '''
+_EXHAUSTED_UPDATE = '''UPDATE scrape_run_item SET state = 'failed', updated_at = ?, message = ?
+    WHERE run_id = ? AND state = 'pending' AND attempts >= ?'''
+_PENDING_ITEMS_SELECT = '''SELECT entry, product_id, attempts FROM scrape_run_item
+    WHERE run_id = ? AND state = 'pending' ORDER BY position'''
+_RUN_RESUMED = "UPDATE scrape_run SET status = 'running', finished_at = NULL, resumes = resumes + 1 WHERE id = ?"
+_UNFINISHED_COUNT_SELECT = '''SELECT COUNT(*) FROM scrape_run_item
+    WHERE run_id = ? AND state IN ('pending', 'in_flight')'''
+_RUN_FINISH = 'UPDATE scrape_run SET status = ?, finished_at = ? WHERE id = ?'
+_RUNS_SELECT = 'SELECT * FROM scrape_run ORDER BY id DESC LIMIT ?'
+_RUN_COUNTS_SELECT = '''SELECT run_id, state, COUNT(*) FROM scrape_run_item
+    WHERE run_id BETWEEN ? AND ? GROUP BY run_id, state'''
+_RUN_ITEMS_SELECT = '''SELECT position, entry, product_id, state, attempts, updated_at, message
+    FROM scrape_run_item WHERE run_id = ? ORDER BY position'''
+
+
+def create_tables(conn):
+    """Create the scrape_run and scrape_run_item tables if they don't exist."""
+    conn.execute('''CREATE TABLE IF NOT EXISTS scrape_run (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        started_at TEXT NOT NULL,
+        finished_at TEXT,
+        status TEXT NOT NULL,
+        total INTEGER NOT NULL,
+        resumes INTEGER NOT NULL DEFAULT 0
+    )''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_scrape_run_status ON scrape_run(status, started_at)')
+    # entry is the products.txt entry as JSON, so a resumed run scrapes exactly what it snapshotted
+    conn.execute('''CREATE TABLE IF NOT EXISTS scrape_run_item (
+        run_id INTEGER NOT NULL,
+        position INTEGER NOT NULL,
+        entry TEXT NOT NULL,
+        product_id TEXT,
+        state TEXT NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        updated_at TEXT,
+        message TEXT,
+        PRIMARY KEY (run_id, position)
+    )''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_scrape_run_item_product ON scrape_run_item(run_id, product_id)')
+
+
+class RunCheckpoint:
+    """The item states of one run in progress.
+
+    Attempts logged during a run count from zero in this process; the checkpoint
+    adds the attempts each product used before a resume, so retry budgets and the
+    stored counts carry across restarts.
+    """
+
+    def __init__(self, db_path, run_id, used=None):
+        self.db_path = db_path
+        self.run_id = run_id
+        self._used = used or {}
+
+    def attempts_used(self, product_id):
+        return self._used.get(str(product_id), 0)
+
+    def retries_left(self, product_id, retry_attempts):
+        """Retries this product may still take: the run's budget minus attempts used before a resume."""
+        return max(0, retry_attempts - self.attempts_used(product_id))
+
+    def in_flight(self, product_id):
+        """ITEM_UPDATE parameters for a product a worker just started on."""
+        return (IN_FLIGHT, None, datetime.now().isoformat(), None, self.run_id, str(product_id))
+
+    def item_update(self, product_id, status, attempts=None, message=None):
+        """ITEM_UPDATE parameters for a log_scrape entry, or None when the entry doesn't change an item."""
+        state = _LOG_STATES.get(status)
+        if state is None or not product_id:
+            return None
+        total = self.attempts_used(product_id) + attempts if attempts else None
+        return (state, total, datetime.now().isoformat(), message or None, self.run_id, str(product_id))
+
+    def mark_skipped(self, product_ids, message):
+        """Mark products dropped before the scrape began (e.g. already scraped today)."""
+        now = datetime.now().isoformat()
+        with db.transaction(self.db_path) as conn:
+            conn.executemany(ITEM_UPDATE, [(SKIPPED, None, now, message, self.run_id, str(pid))
+                                           for pid in product_ids])
+
+    def finish(self, status=FINISHED):
+        """Close the run. A run that ends with items still pending or in flight is left
+        interrupted instead, so it can be resumed."""
+        with db.transaction(self.db_path) as conn:
+            if status == FINISHED and conn.execute(_UNFINISHED_COUNT_SELECT, (self.run_id,)).fetchone()[0]:
+                status = INTERRUPTED
+            conn.execute(_RUN_FINISH, (status, datetime.now().isoformat(), self.run_id))
+        return status
+
+
+def start_run(db_path, entries):
+    """Record a new run. entries: [(entry, product_id)] with product_id None for an
+    entry that couldn't be parsed, which is stored as skipped. Any run still marked
+    running was abandoned by a killed process and becomes interrupted."""
+    now = datetime.now().isoformat()
+    with db.transaction(db_path) as conn:
+        conn.execute(_INTERRUPT_RUNNING)
+        run_id = conn.execute(_RUN_INSERT, (now, len(entries))).lastrowid
+        conn.executemany(_ITEM_INSERT, [
+            (run_id, position, json.dumps(entry), product_id, PENDING if product_id else SKIPPED,
+             None if product_id else 'Could not parse')
+            for position, (entry, product_id) in enumerate(entries)])
+    return RunCheckpoint(db_path, run_id)
+
+
+def unfinished_run(db_path, since):
+    """The newest run started at or after since (an ISO date or timestamp) that didn't finish, or None."""
+    return db.connect(db_path).execute(_UNFINISHED_RUN_SELECT, (since,)).fetchone()
+
+
+def resume_run(db_path, run_id, max_attempts):
+    """Reopen a run. Returns (checkpoint, entries still to scrape, items given up on), or None
+    if there is no such run.
+
+    An item that was in flight when the run stopped counts that try as one attempt;
+    items that have used max_attempts are marked failed rather than scraped again.
+    """
+    now = datetime.now().isoformat()
+    with db.transaction(db_path) as conn:
+        if conn.execute(_RUN_SELECT, (run_id,)).fetchone() is None:
+            return None
+        conn.execute(_INTERRUPT_RUNNING)
+        conn.execute(_REQUEUE_IN_FLIGHT, (run_id,))
+        exhausted = conn.execute(_EXHAUSTED_UPDATE, (now, 'Retry budget used up before resume',
+                                                     run_id, max_attempts)).rowcount
+        rows = conn.execute(_PENDING_ITEMS_SELECT, (run_id,)).fetchall()
+        conn.execute(_RUN_RESUMED, (run_id,))
+    used = {pid: attempts for _, pid, attempts in rows if attempts}
+    return RunCheckpoint(db_path, run_id, used), [json.loads(r[0]) for r in rows], exhausted
+
+
+def get_runs(db_path, limit=50):
+    """The latest runs, newest first, each with a count of its items per state."""
+    conn = db.connect(db_path)
+    runs = [dict(r) for r in conn.execute(_RUNS_SELECT, (limit,))]
+    if runs:
+        counts = {}
+        for run_id, state, count in conn.execute(_RUN_COUNTS_SELECT, (runs[-1]['id'], runs[0]['id'])):
+            counts.setdefault(run_id, {})[state] = count
+        for run in runs:
+            run['items'] = {state: counts.get(run['id'], {}).get(state, 0)
+                            for state in (PENDING, IN_FLIGHT, SUCCEEDED, FAILED, SKIPPED)}
+    return runs
+
+
+def get_run(db_path, run_id):
+    """One run with all of its items in product-list order, or None."""
+    conn = db.connect(db_path)
+    run = conn.execute(_RUN_SELECT, (run_id,)).fetchone()
+    if run is None:
+        return None
+    run = dict(run)
+    run['items'] = [{**dict(r), 'entry': json.loads(r['entry'])} for r in conn.execute(_RUN_ITEMS_SELECT, (run_id,))]
+    return run
@@ -14,11 +14,11 @@ from datetime import datetime
 from bs4 import BeautifulSoup
 
 from selenium import webdriver
-from selenium.webdriver.chrome.service import Service as ChromeService
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+
+import driver_resolver
 
 from fpdf import FPDF, XPos, YPos
 
@@ -859,7 +859,7 @@ if __name__ == '__main__':
     # Performance logging captures all XHR/fetch network activity — needed for sales API interception
     options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
 
-    driver = webdriver.Chrome(service=ChromeService(ChromeDriverManager().install()), options=options)
+    driver = driver_resolver.new_chrome_driver(options)
 
     # Enable network tracking via CDP before any navigation
     driver.execute_cdp_cmd('Network.enable', {})
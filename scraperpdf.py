@@ -6,6 +6,7 @@
 
 import argparse
 import concurrent.futures
+import functools
 import json
 import shutil
 import tempfile
@@ -18,22 +19,47 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import os
 import sys
-from datetime import datetime
+from datetime import datetime, timedelta
 from bs4 import BeautifulSoup
 
 from selenium import webdriver
-from selenium.webdriver.chrome.service import Service as ChromeService
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+from selenium.common.exceptions import TimeoutException
 
 from fpdf import FPDF, XPos, YPos
 
+import api_client
+from api_client import ApiClient, ApiError
+from parse_pipeline import ParsePipeline
+from result_writer import ResultWriter
+import cdp_capture
+import db
+import driver_resolver
+import metrics
+import price_guide
+import priority
+import rate_limiter
+import replay
+import scrape_runs
+import timings
+
 PRODUCTS_FILE = 'products.txt'
 DB_FILE = 'tcgplayer.db'
 DEFAULT_PDF_OUTPUT = 'TCGplayer_Combo_Report.pdf'
 
+# Upserts with RETURNING (price_history, sale, latest_price) need SQLite 3.35
+MIN_SQLITE_VERSION = (3, 35, 0)
+
+# Where pages and TCGplayer's APIs are fetched from — see configure_endpoints()
+SITE_BASE = api_client.SITE_BASE
+SEARCH_API_BASE = api_client.SEARCH_API_BASE
+SALES_API_BASE = api_client.SALES_API_BASE
+
+# When set, each fetched page and its API responses are saved here (see replay.py)
+RECORD_DIR = None
+
 _BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 
@@ -41,13 +67,38 @@ def _db_path():
     return os.path.join(_BASE_DIR, DB_FILE)
 
 
-_HISTORY_SELECT = '''SELECT date as Date, market_price as "Market Price", most_recent_sale as "Most Recent Sale",
-    listed_median as "Listed Median", current_quantity as "Current Quantity",
-    current_sellers as "Current Sellers", sold_yesterday as "Sold Yesterday",
-    total_sold as "Total Sold", recent_sales as "Recent Sales", top_listings as "Top Listings",
-    price_change as "Price Change", quantity_change as "Quantity Change",
-    daily_sales as "Daily Sales"
-FROM price_history WHERE product_id = ? ORDER BY id'''
+# Typed copies of the scraped text fields, written alongside them so readers don't
+# re-parse '$1,234.56' strings: (record key, text column, numeric column, SQL type)
+_NUMERIC_COLUMNS = (
+    ('Market Price', 'market_price', 'market_price_num', 'REAL'),
+    ('Most Recent Sale', 'most_recent_sale', 'most_recent_sale_num', 'REAL'),
+    ('Listed Median', 'listed_median', 'listed_median_num', 'REAL'),
+    ('Current Quantity', 'current_quantity', 'current_quantity_num', 'INTEGER'),
+    ('Current Sellers', 'current_sellers', 'current_sellers_num', 'INTEGER'),
+    ('Sold Yesterday', 'sold_yesterday', 'sold_yesterday_num', 'INTEGER'),
+    ('Total Sold', 'total_sold', 'total_sold_num', 'INTEGER'),
+)
+
+# Columns of price_history p; the sales and listings of row p are in the sale and listing tables
+_HISTORY_COLUMNS = '''p.id as history_id, p.date as Date, p.market_price as "Market Price",
+    p.most_recent_sale as "Most Recent Sale", p.listed_median as "Listed Median",
+    p.current_quantity as "Current Quantity", p.current_sellers as "Current Sellers",
+    p.sold_yesterday as "Sold Yesterday", p.total_sold as "Total Sold",
+    p.price_change as "Price Change", p.quantity_change as "Quantity Change",
+    p.daily_sales as "Daily Sales", p.market_price_num, p.most_recent_sale_num, p.listed_median_num,
+    p.current_quantity_num, p.current_sellers_num, p.sold_yesterday_num, p.total_sold_num,
+    p.lowest_ask as "Lowest Ask",
+    (SELECT AVG(s.price) FROM sale s WHERE s.product_id = p.product_id
+        AND s.last_history_id >= p.id AND s.first_history_id <= p.id) as "Avg Recent Sale"'''
+
+_HISTORY_SELECT = f'''SELECT {_HISTORY_COLUMNS}
+FROM price_history p WHERE p.product_id = ? ORDER BY p.id'''
+
+# Same columns as _HISTORY_SELECT, for the newest row of every product
+_LATEST_ROWS_SELECT = f'''SELECT p.product_id, p.product_name, {_HISTORY_COLUMNS}
+FROM latest_price l
+INNER JOIN price_history p ON p.id = l.history_id
+ORDER BY p.product_name'''
 
 # Fallback list used when products.txt does not exist
 PRODUCTS = [
@@ -112,6 +163,18 @@ RETRY_ATTEMPTS = 2                 # number of retries on failure
 RETRY_BACKOFF = 10                 # seconds to wait before first retry (doubles each attempt)
 SESSION_ROTATE_EVERY = 50          # restart Chrome every N products
 
+# Page readiness — after the price guide renders, wait for the latestsales XHR to
+# finish or for the network to go quiet, instead of a fixed sleep
+READY_IDLE_WINDOW = 0.5            # seconds without network events that count as idle
+READY_MAX_WAIT = 2.0               # never wait longer than the old fixed settle sleep
+READY_POLL_INTERVAL = 0.1
+FIXED_SETTLE_SECONDS = 2.0         # the unconditional sleep this replaces
+FIXED_POPUP_SECONDS = 2.5          # sleeps the sales popup used to take before reading the modal
+
+# Page text that means TCGplayer (or its CDN) is throttling or challenging us
+BLOCK_MARKERS = ('captcha', 'are you a robot', 'unusual traffic', 'too many requests',
+                 'access denied', 'request blocked')
+
 DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"
 
 USER_AGENTS = [
@@ -162,44 +225,203 @@ class PDF(FPDF):
         self.cell(0, 10, f'Page {self.page_no()}', align='C')
 
 
+def configure_endpoints(site_base=None, search_base=None, sales_base=None):
+    """Point the scraper at other hosts (e.g. a replay server). Empty values mean the live site."""
+    global SITE_BASE, SEARCH_API_BASE, SALES_API_BASE
+    SITE_BASE = (site_base or api_client.SITE_BASE).rstrip('/')
+    SEARCH_API_BASE = (search_base or api_client.SEARCH_API_BASE).rstrip('/')
+    SALES_API_BASE = (sales_base or api_client.SALES_API_BASE).rstrip('/')
+
+
 def normalize_product(entry):
     """Accept a product ID (int or str) or a full TCGplayer URL.
     Returns (product_id, url) tuple."""
     s = str(entry).strip().rstrip('/')
     if s.isdigit():
-        return s, f'https://www.tcgplayer.com/product/{s}/'
+        return s, f'{SITE_BASE}/product/{s}/'
     m = re.search(r'/product/(\d+)', s)
     if m:
         return m.group(1), entry if isinstance(entry, str) else str(entry)
     return None, entry
 
 
-def get_api_data_from_network_logs(driver, product_id):
+# Rough transfer size of a resource Chrome never downloaded because it was blocked.
+# Only used to estimate bytes saved in the per-run network report.
+BLOCKED_BYTES_ESTIMATE = {
+    'Image': 40_000,
+    'Font': 30_000,
+    'Media': 250_000,
+    'Script': 60_000,
+}
+BLOCKED_BYTES_DEFAULT = 5_000
+
+
+class NetworkStats:
+    """Thread-safe per-run tally of bytes transferred and requests blocked."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.pages = 0
+            self.bytes_transferred = 0
+            self.blocked = {}
+
+    def add_page(self, bytes_transferred, blocked_by_type):
+        with self._lock:
+            self.pages += 1
+            self.bytes_transferred += bytes_transferred
+            for rtype, count in blocked_by_type.items():
+                self.blocked[rtype] = self.blocked.get(rtype, 0) + count
+
+    def summary(self):
+        """Return a one-line report of blocked requests and estimated bytes saved."""
+        with self._lock:
+            blocked_count = sum(self.blocked.values())
+            saved = sum(BLOCKED_BYTES_ESTIMATE.get(t, BLOCKED_BYTES_DEFAULT) * n for t, n in self.blocked.items())
+            by_type = ', '.join(f'{t}: {n}' for t, n in sorted(self.blocked.items(), key=lambda kv: -kv[1]))
+            return (f"{self.pages} pages, {self.bytes_transferred / 1e6:.1f} MB transferred, "
+                    f"{blocked_count} requests blocked (~{saved / 1e6:.1f} MB saved)"
+                    + (f" [{by_type}]" if by_type else ''))
+
+
+# Reset at the start of each run_scrape call and reported when it finishes
+network_stats = NetworkStats()
+stage_timings = timings.RunTimings()
+
+
+def _apply_request_blocking(driver, patterns):
+    """Block matching URLs at the network layer for every page this driver loads."""
+    if not patterns:
+        return
+    try:
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': list(patterns)})
+    except Exception as e:
+        print(f"  → Request blocking unavailable: {e}")
+
+
+def _parse_perf_logs(logs):
+    """Decode raw performance log entries into CDP event dicts, skipping malformed ones."""
+    messages = []
+    for log in logs:
+        try:
+            messages.append(json.loads(log['message'])['message'])
+        except Exception:
+            continue
+    return messages
+
+
+def _is_sales_url(url, product_id):
+    return str(product_id) in url and 'sales' in url.lower()
+
+
+def wait_for_readiness(driver, product_id, idle_window=READY_IDLE_WINDOW, max_wait=READY_MAX_WAIT):
+    """
+    Poll CDP network events until the latestsales response has finished loading,
+    the network has been idle for idle_window seconds, or max_wait elapses.
+    Returns (messages, waited_seconds); messages are the decoded events read so far,
+    to be handed to get_api_data_from_network_logs since reading the log clears it.
+    """
+    messages = []
+    start = last_activity = time.monotonic()
+    sales_request = None
+    while True:
+        try:
+            batch = _parse_perf_logs(driver.get_log('performance'))
+        except Exception as e:
+            print(f"  → Performance log unavailable: {e}")
+            break
+        now = time.monotonic()
+        for message in batch:
+            messages.append(message)
+            method = message.get('method', '')
+            if not method.startswith('Network.'):
+                continue
+            last_activity = now
+            params = message.get('params', {})
+            if method == 'Network.responseReceived' and _is_sales_url(params.get('response', {}).get('url', ''), product_id):
+                sales_request = params.get('requestId')
+            elif method == 'Network.loadingFinished' and sales_request and params.get('requestId') == sales_request:
+                return messages, now - start
+        if now - last_activity >= idle_window or now - start >= max_wait:
+            break
+        time.sleep(READY_POLL_INTERVAL)
+    return messages, time.monotonic() - start
+
+
+def _begin_page_capture(driver, product_id):
+    """Point the driver's streaming capture (if any) at this product's sales response."""
+    capture = getattr(driver, '_capture', None)
+    if capture is not None:
+        capture.begin_page({'sales': lambda url: _is_sales_url(url, product_id)})
+    return capture
+
+
+def _wait_page_ready(driver, product_id, capture, idle_window):
+    """Wait for page readiness via streaming capture, falling back to performance-log polling.
+    Returns (messages, waited_seconds); messages is None unless the performance log was used."""
+    if capture is not None:
+        return None, capture.wait_ready('sales', idle_window, READY_MAX_WAIT)
+    if getattr(driver, '_perf_log_enabled', True):
+        return wait_for_readiness(driver, product_id, idle_window=idle_window)
+    return None, 0.0
+
+
+def get_captured_api_data(driver, product_id, capture=None, messages=None):
+    """
+    Return {'sales': data_or_none, 'listings': None} for the page just loaded, from the
+    streaming capture when attached, otherwise from the performance log.
+    """
+    if capture is None:
+        if not getattr(driver, '_perf_log_enabled', True):
+            return {'sales': None, 'listings': None}
+        return get_api_data_from_network_logs(driver, product_id, messages=messages)
+    sales = capture.body('sales')
+    if sales:
+        print("  → Sales via network capture")
+    network_stats.add_page(*capture.page_stats())
+    return {'sales': sales, 'listings': None}
+
+
+def get_api_data_from_network_logs(driver, product_id, messages=None):
     """
     Read Chrome performance logs ONCE and scan for both sales and listings API responses.
     Returns {'sales': data_or_none, 'listings': data_or_none}.
+    Also tallies bytes transferred and blocked requests for the page into network_stats.
+    messages: events already drained by wait_for_readiness; any newer ones are read too.
     NOTE: get_log('performance') clears the buffer — must only be called once per page load.
     """
     result = {'sales': None, 'listings': None}
     try:
-        logs = driver.get_log('performance')
+        messages = (messages or []) + _parse_perf_logs(driver.get_log('performance'))
     except Exception as e:
         print(f"  → Performance log unavailable: {e}")
-        return result
+        if not messages:
+            return result
 
     # NOTE: The listings endpoint (mp-search-api) only returns actual listing items
     # via POST — GET requests return aggregation metadata only. So we only use
     # the network log for sales here; listings are always fetched via JS POST.
     pid = str(product_id)
-    for log in logs:
-        if result['sales']:
-            break
+    bytes_transferred = 0
+    blocked_by_type = {}
+    for message in messages:
         try:
-            message = json.loads(log['message'])['message']
-            if message.get('method') != 'Network.responseReceived':
+            method = message.get('method')
+            if method == 'Network.loadingFinished':
+                bytes_transferred += int(message['params'].get('encodedDataLength') or 0)
+                continue
+            if method == 'Network.loadingFailed':
+                if message['params'].get('blockedReason'):
+                    rtype = message['params'].get('type') or 'Other'
+                    blocked_by_type[rtype] = blocked_by_type.get(rtype, 0) + 1
+                continue
+            if method != 'Network.responseReceived' or result['sales']:
                 continue
             url = message.get('params', {}).get('response', {}).get('url', '')
-            if pid not in url or 'sales' not in url.lower():
+            if not _is_sales_url(url, pid):
                 continue
 
             req_id = message['params']['requestId']
@@ -214,16 +436,38 @@ def get_api_data_from_network_logs(driver, product_id):
         except Exception:
             continue
 
+    network_stats.add_page(bytes_transferred, blocked_by_type)
     return result
 
 
+LISTINGS_API_PATH = '/v1/product/{product_id}/listings'
+
+# Same-origin sales endpoint patterns to try — TCGplayer has changed these over time
+SALES_ENDPOINTS = [
+    '/api/product/{product_id}/latestsales?rows={rows}&sellerStatus=Live&channel=0&minCondition=7',
+    '/api/product/{product_id}/latestsales?rows={rows}',
+    '/api/v2/product/{product_id}/latestsales?rows={rows}',
+    '/api/catalog/product/{product_id}/latestsales?rows={rows}',
+]
+
+
+def listings_api_url(product_id):
+    """Return the listing search API URL for a product."""
+    return SEARCH_API_BASE + LISTINGS_API_PATH.format(product_id=product_id)
+
+
+def sales_endpoints(product_id):
+    """Return the same-origin sales endpoints to try for a product, in order."""
+    return [e.format(product_id=product_id, rows=RECENT_SALES_COUNT) for e in SALES_ENDPOINTS]
+
+
 def get_listings_via_js(driver, product_id):
     """
     POST to TCGplayer's search API to retrieve active listing records.
     GET requests to this endpoint only return aggregation metadata — POST is required.
     Requests more than needed so the English filter has enough to work with after filtering.
     """
-    url = f'https://mp-search-api.tcgplayer.com/v1/product/{product_id}/listings'
+    url = listings_api_url(product_id)
     body = {"from": 0, "size": LISTING_COUNT * 4, "sort": [{"field": "price", "order": "asc"}]}
     try:
         result = driver.execute_async_script("""
@@ -336,15 +580,7 @@ def get_recent_sales_via_js(driver, product_id):
     Try to call TCGplayer's internal sales API endpoints from the browser context.
     Since we're already on their domain, session cookies are included automatically.
     """
-    # Endpoint patterns to try — TCGplayer has changed these over time
-    endpoints = [
-        f'/api/product/{product_id}/latestsales?rows={RECENT_SALES_COUNT}&sellerStatus=Live&channel=0&minCondition=7',
-        f'/api/product/{product_id}/latestsales?rows={RECENT_SALES_COUNT}',
-        f'/api/v2/product/{product_id}/latestsales?rows={RECENT_SALES_COUNT}',
-        f'/api/catalog/product/{product_id}/latestsales?rows={RECENT_SALES_COUNT}',
-    ]
-
-    for endpoint in endpoints:
+    for endpoint in sales_endpoints(product_id):
         try:
             result = driver.execute_async_script("""
                 const [url, callback] = [arguments[0], arguments[arguments.length - 1]];
@@ -422,15 +658,16 @@ def try_sales_popup(driver, wait):
         return sales
 
     try:
+        # scrollIntoView and click are synchronous; the modal wait below replaces the old settle sleeps
         driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", trigger)
-        time.sleep(0.5)
         driver.execute_script("arguments[0].click();", trigger)
-        time.sleep(2)
 
-        # Wait for a modal/popup to appear
+        # Wait for a modal/popup with at least one sale row to appear
         modal_selectors = "[role='dialog'], .tcg-modal, .sales-popup, .modal, .overlay, [class*='Modal'], [class*='Popup']"
         try:
             wait.until(EC.visibility_of_element_located((By.CSS_SELECTOR, modal_selectors)))
+            modal_rows = ", ".join(f"{sel} tr" for sel in modal_selectors.split(", "))
+            WebDriverWait(driver, READY_MAX_WAIT).until(lambda d: d.find_elements(By.CSS_SELECTOR, modal_rows))
         except Exception:
             pass  # Continue anyway — the content might have changed without a traditional modal
 
@@ -508,168 +745,276 @@ def parse_recent_sales_response(api_response):
     return sales
 
 
-def scrape_product_data(product_id, url, driver):
+def _has_sales(api_response):
+    """Whether a sales API response holds any sale rows. Only checks the shape, so the
+    browser thread doesn't normalize sales; parse_recent_sales_response does that later."""
+    if isinstance(api_response, dict):
+        api_response = next((api_response[k] for k in ('results', 'data', 'sales', 'items') if api_response.get(k)),
+                            None)
+    return isinstance(api_response, list) and bool(api_response)
+
+
+def parse_product_page(html):
     """
-    Scrapes a TCGplayer product page. Tries multiple strategies to get recent sales.
+    Parse the product name and price-guide / sales-data fields from a product page's HTML.
+    Returns (product_name, fields) where fields holds the price-guide columns as displayed.
+    Only the relevant fragments are parsed (see price_guide).
+    """
+    return price_guide.parse_targeted(html)
+
+
+def extract_page_fragments(driver):
+    """Collect the name, price-guide and sales-data fragments from the live page, or None."""
+    try:
+        return driver.execute_script('return ' + price_guide.EXTRACT_JS)
+    except Exception as e:
+        print(f"  → In-page extraction failed, using page source: {e}")
+        return None
+
+
+def price_value(text):
+    """Convert a '$1,234.56' price string to a float, or None if it isn't a price."""
+    try:
+        return float(str(text).replace('$', '').replace(',', ''))
+    except (ValueError, TypeError):
+        return None
+
+
+def build_product_record(fields, recent_sales, top_listings, meta=None):
+    """Assemble the row dict update_data stores for one scraped product.
+    meta: optional timings kept under '_meta' for the scrape log only."""
+    data = {
+        "Date": datetime.now().strftime('%Y-%m-%d'),
+        **fields,
+        "Recent Sales": json.dumps(recent_sales) if recent_sales else '[]',
+        "Top Listings": json.dumps(top_listings) if top_listings else '[]',
+    }
+    if meta:
+        data["_meta"] = meta
+    return data
+
+
+def fetch_product_raw(product_id, url, driver, idle_window=READY_IDLE_WINDOW):
+    """
+    Browser stage of a page scrape: load the page and collect its HTML plus the
+    raw sales and listings API JSON, without parsing the page.
+    Returns a picklable dict for parse_product_raw, or None if the page failed to load.
     """
+    driver._last_failure = None
+    timer = timings.StageTimer()
     try:
-        driver.get(url)
+        capture = _begin_page_capture(driver, product_id)
+        with timer.stage('page_load'):
+            driver.get(url)
         wait = WebDriverWait(driver, 30)
-        wait.until(EC.visibility_of_element_located((By.CSS_SELECTOR, "section.product-details__price-guide")))
-        time.sleep(2)
-
-        html = driver.page_source
-        soup = BeautifulSoup(html, 'html.parser')
-
-        # --- Product name ---
-        product_name_el = soup.find('h1', class_='product-details__name')
-        if not product_name_el:
-            product_name_el = soup.find('h1')
-        product_name = product_name_el.text.strip() if product_name_el else "Unknown Product"
-
-        # --- Price guide section ---
-        price_guide = soup.find('section', class_='price-guide__points')
-        market_price = most_recent_sale = listed_median = current_quantity = current_sellers = 'N/A'
-
-        if price_guide:
-            # Market Price — find the first upper header row
-            for title_span in price_guide.find_all('span', class_='price-points__upper__header__title'):
-                if 'Market Price' in title_span.get_text():
-                    row = title_span.find_parent('tr')
-                    if row:
-                        val = row.find('span', class_='price-points__upper__price')
-                        if val:
-                            market_price = val.text.strip()
-                    break
+        with timer.stage('wait_price_guide'):
+            wait.until(EC.visibility_of_element_located((By.CSS_SELECTOR, "section.product-details__price-guide")))
+        with timer.stage('readiness'):
+            net_messages, ready_wait = _wait_page_ready(driver, product_id, capture, idle_window)
+        with timer.stage('extract'):
+            fragments = extract_page_fragments(driver)
+        raw = {
+            "product_id": product_id,
+            "fragments": fragments,     # from price_guide.EXTRACT_JS
+            "html": None if fragments else driver.page_source,
+            "sales": None,          # latestsales JSON
+            "popup_sales": [],      # rows read from the sales modal when no JSON was available
+            "listings": None,       # listings search JSON
+            "sales_source": None,   # capture, js or popup
+            "ready_wait": ready_wait,
+            "ready_saved": FIXED_SETTLE_SECONDS - ready_wait,
+            "timings": timer.timings,
+        }
 
-            # Most Recent Sale
-            mrs_label = price_guide.find('span', string=lambda t: t and 'Most Recent Sale' in t.strip())
-            if mrs_label:
-                row = mrs_label.find_parent('tr')
-                if row:
-                    val = row.find('span', class_='price-points__upper__price')
-                    if val:
-                        most_recent_sale = val.text.strip()
-
-            def get_lower(label_text):
-                el = price_guide.find('span', class_='text', string=lambda t: t and label_text in t.strip())
-                if el:
-                    sib = el.find_parent('td')
-                    if sib:
-                        sib = sib.find_next_sibling('td')
-                    if sib:
-                        val = sib.find('span', class_='price-points__lower__price')
-                        if val:
-                            return val.text.strip()
-                return 'N/A'
-
-            listed_median = get_lower('Listed Median:')
-
-            # Quantity & Sellers (may be on the same row)
-            qty_el = price_guide.find('span', class_='text', string=lambda t: t and 'Current Quantity:' in t.strip())
-            if qty_el:
-                row = qty_el.find_parent('tr')
-                if row:
-                    spans = row.find_all('span', class_='price-points__lower__price')
-                    current_quantity = spans[0].text.strip() if len(spans) >= 1 else 'N/A'
-                    current_sellers = spans[1].text.strip() if len(spans) >= 2 else get_lower('Current Sellers:')
-            else:
-                current_quantity = get_lower('Current Quantity:')
-                current_sellers = get_lower('Current Sellers:')
-
-        # --- Sales data section (Sold Yesterday, Total Sold) ---
-        # TCGplayer's page has multiple possible structures for this section.
-        # We try every table row in the whole document looking for these labels,
-        # rather than relying on a specific section class.
-        sold_yesterday = 'N/A'
-        total_sold = 'N/A'
-
-        # Try the dedicated sales-data section first
-        for section_class in ['sales-data', 'sales-data__section', 'product-sales-data']:
-            sales_section = soup.find('section', class_=section_class)
-            if not sales_section:
-                sales_section = soup.find('div', class_=section_class)
-            if sales_section:
-                for row in sales_section.find_all('tr'):
-                    tds = row.find_all('td')
-                    if len(tds) < 2:
-                        continue
-                    label = tds[0].get_text(strip=True)
-                    val_el = tds[1].find('span')
-                    value = val_el.text.strip() if val_el else tds[1].get_text(strip=True)
-                    if re.search(r'Total Sold', label, re.I):
-                        total_sold = value
-                    elif re.search(r'Sold (Yesterday|Today|Last\s*24)', label, re.I):
-                        sold_yesterday = value
-                break  # Found a section, stop looking
-
-        # Fallback: scan ALL table rows for these labels
-        if total_sold == 'N/A' and sold_yesterday == 'N/A':
-            for row in soup.find_all('tr'):
-                tds = row.find_all('td')
-                if len(tds) < 2:
-                    continue
-                label = tds[0].get_text(strip=True)
-                val_el = tds[1].find('span')
-                value = val_el.text.strip() if val_el else tds[1].get_text(strip=True)
-                if re.search(r'Total Sold', label, re.I) and total_sold == 'N/A':
-                    total_sold = value
-                if re.search(r'Sold (Yesterday|Today|Last\s*24)', label, re.I) and sold_yesterday == 'N/A':
-                    sold_yesterday = value
-
-        print(f"  → {product_name}: Market={market_price}, MRS={most_recent_sale}, "
-              f"Qty={current_quantity}, TotalSold={total_sold}, SoldYday={sold_yesterday}")
-
-        # --- Recent sales + active listings ---
-        recent_sales = []
-        top_listings = []
-
-        # Sales: network log interception first, JS fetch fallback
+        # Sales: network capture first, JS fetch fallback, then the popup
         if product_id:
-            log_data = get_api_data_from_network_logs(driver, product_id)
-            if log_data['sales']:
-                recent_sales = parse_recent_sales_response(log_data['sales'])
-        if not recent_sales and product_id:
-            api_data = get_recent_sales_via_js(driver, product_id)
-            if api_data:
-                recent_sales = parse_recent_sales_response(api_data)
-        if not recent_sales:
-            recent_sales = try_sales_popup(driver, wait)
+            with timer.stage('sales_capture'):
+                log_data = get_captured_api_data(driver, product_id, capture=capture, messages=net_messages)
+            if _has_sales(log_data['sales']):
+                raw["sales"], raw["sales_source"] = log_data['sales'], 'capture'
+            else:
+                with timer.stage('sales_js'):
+                    api_data = get_recent_sales_via_js(driver, product_id)
+                if _has_sales(api_data):
+                    raw["sales"], raw["sales_source"] = api_data, 'js'
+        if raw["sales"] is None:
+            with timer.stage('sales_popup'):
+                raw["popup_sales"] = try_sales_popup(driver, wait)
+            raw["sales_source"] = 'popup'
+            # Negative when the modal waits took longer than the old fixed sleeps
+            raw["ready_saved"] += FIXED_POPUP_SECONDS - timer.timings['sales_popup']
 
         # Listings: always use JS POST (GET endpoint returns aggregations only)
         if product_id:
-            mp_num = None
-            try:
-                mp_num = float(str(market_price).replace('$', '').replace(',', ''))
-            except (ValueError, TypeError):
-                pass
-            api_data = get_listings_via_js(driver, product_id)
-            if api_data:
-                top_listings = parse_listings_response(api_data, product_id=product_id, market_price=mp_num)
-
-        print(f"  → {len(recent_sales)} sale records, {len(top_listings)} listings captured")
-
-        return product_name, {
-            "Date": datetime.now().strftime('%Y-%m-%d'),
-            "Market Price": market_price,
-            "Most Recent Sale": most_recent_sale,
-            "Listed Median": listed_median,
-            "Current Quantity": current_quantity,
-            "Current Sellers": current_sellers,
-            "Sold Yesterday": sold_yesterday,
-            "Total Sold": total_sold,
-            "Recent Sales": json.dumps(recent_sales) if recent_sales else '[]',
-            "Top Listings": json.dumps(top_listings) if top_listings else '[]',
-        }
+            with timer.stage('listings_js'):
+                raw["listings"] = get_listings_via_js(driver, product_id)
+
+        if RECORD_DIR and product_id:
+            replay.save_recording(RECORD_DIR, product_id, html=raw["html"] or driver.page_source,
+                                  sales=raw["sales"], listings=raw["listings"])
+        return raw
 
     except Exception as e:
-        print(f"  ✗ Scrape error for {url}: {e}")
+        driver._last_failure = _classify_page_failure(driver, e)
+        print(f"  ✗ Scrape error for {url}: {e} [{driver._last_failure}]")
+        return None
+
+
+def parse_product_raw(raw):
+    """
+    Parse stage of a page scrape: turn fetch_product_raw's output into
+    (product_name, data). Needs no browser, so it can run in another process.
+    """
+    product_id = raw["product_id"]
+    parse_start = time.perf_counter()
+    if raw.get("fragments"):
+        product_name, fields = price_guide.parse_fragments(raw["fragments"])
+    else:
+        product_name, fields = parse_product_page(raw["html"])
+    market_price = fields['Market Price']
+
+    print(f"  → {product_name}: Market={market_price}, MRS={fields['Most Recent Sale']}, "
+          f"Qty={fields['Current Quantity']}, TotalSold={fields['Total Sold']}, SoldYday={fields['Sold Yesterday']}")
+
+    if raw["sales"]:
+        recent_sales = parse_recent_sales_response(raw["sales"])
+    else:
+        recent_sales = raw["popup_sales"]
+    top_listings = []
+    if raw["listings"]:
+        top_listings = parse_listings_response(raw["listings"], product_id=product_id,
+                                               market_price=price_value(market_price))
+
+    print(f"  → {len(recent_sales)} sale records, {len(top_listings)} listings captured")
+
+    stage_times = dict(raw.get("timings") or {})
+    stage_times["parse"] = time.perf_counter() - parse_start
+    return product_name, build_product_record(
+        fields, recent_sales, top_listings,
+        meta={"ready_wait": round(raw["ready_wait"], 3), "ready_saved": round(raw["ready_saved"], 3),
+              "sales_source": raw.get("sales_source"), "timings": stage_times})
+
+
+def scrape_product_data(product_id, url, driver, idle_window=READY_IDLE_WINDOW):
+    """
+    Scrapes a TCGplayer product page. Tries multiple strategies to get recent sales.
+    The returned data includes a '_meta' dict with readiness timings for the scrape log.
+    """
+    raw = fetch_product_raw(product_id, url, driver, idle_window=idle_window)
+    if raw is None:
+        return None, None
+    try:
+        return parse_product_raw(raw)
+    except Exception as e:
+        driver._last_failure = 'error'
+        print(f"  ✗ Parse error for {url}: {e}")
+        return None, None
+
+
+def _classify_page_failure(driver, error):
+    """Return 'blocked' for captcha / rate-limit pages, 'timeout' for load timeouts, else 'error'."""
+    try:
+        text = f"{driver.title} {driver.page_source[:20000]}".lower()
+    except Exception:
+        text = ''
+    if any(marker in text for marker in BLOCK_MARKERS):
+        return 'blocked'
+    if isinstance(error, TimeoutException):
+        return 'timeout'
+    return 'error'
+
+
+def _format_money(val):
+    try:
+        return f"${float(val):,.2f}"
+    except (ValueError, TypeError):
+        return 'N/A'
+
+
+def _format_count(val):
+    try:
+        return str(int(float(val)))
+    except (ValueError, TypeError):
+        return 'N/A'
+
+
+def _first_present(item, *keys):
+    """Value of the first key that is set in item, or None. Unlike chaining with `or`,
+    a real 0 (e.g. no listings left) is kept instead of falling through to the next key."""
+    for key in keys:
+        if item.get(key) is not None:
+            return item[key]
+    return None
+
+
+def parse_product_details_response(api_response):
+    """
+    Normalize the product details API response into the same price-guide fields
+    scrape_product_data reads from the page. Returns (product_name, fields).
+    """
+    if not isinstance(api_response, dict):
+        return None, {}
+    item = api_response
+    # Some deployments wrap the record as {'results': [{...}]}
+    if isinstance(item.get('results'), list) and item['results']:
+        item = item['results'][0]
+
+    name = str(_first_present(item, 'productName', 'name') or '').strip()
+    fields = {
+        'Market Price': _format_money(item.get('marketPrice')),
+        'Most Recent Sale': _format_money(_first_present(item, 'mostRecentSale', 'lastSalePrice')),
+        'Listed Median': _format_money(_first_present(item, 'medianPrice', 'listedMedianPrice')),
+        'Current Quantity': _format_count(_first_present(item, 'totalQuantity', 'quantity', 'listings')),
+        'Current Sellers': _format_count(item.get('sellers')),
+        'Sold Yesterday': _format_count(item.get('soldYesterday')),
+        'Total Sold': _format_count(item.get('totalSold')),
+    }
+    return name or None, fields
+
+
+def scrape_product_fast(product_id, api):
+    """
+    Fetch a product over direct HTTP calls instead of loading its page.
+    Returns (product_name, data) like scrape_product_data, or (None, None) if any
+    call fails so the caller can fall back to the full Selenium page load.
+    """
+    started = time.perf_counter()
+    try:
+        details = api.get_product_details(product_id)
+        name, fields = parse_product_details_response(details)
+        if not name or fields['Market Price'] == 'N/A':
+            print("  → Fast path: details response missing name or market price")
+            return None, None
+
+        sales_data = api.get_latest_sales(product_id, RECENT_SALES_COUNT)
+        recent_sales = parse_recent_sales_response(sales_data)
+        if fields['Most Recent Sale'] == 'N/A' and recent_sales:
+            fields['Most Recent Sale'] = _format_money(recent_sales[0]['price'])
+
+        listings_data = api.get_listings(product_id, LISTING_COUNT * 4)
+        top_listings = parse_listings_response(listings_data, product_id=product_id,
+                                               market_price=price_value(fields['Market Price']))
+    except ApiError as e:
+        print(f"  → Fast path failed: {e}")
         return None, None
 
+    if RECORD_DIR:
+        replay.save_recording(RECORD_DIR, product_id, sales=sales_data, listings=listings_data, details=details)
+
+    print(f"  → {name} (fast path): Market={fields['Market Price']}, Qty={fields['Current Quantity']}, "
+          f"{len(recent_sales)} sale records, {len(top_listings)} listings")
+
+    return name, build_product_record(fields, recent_sales, top_listings,
+                                      meta={"sales_source": "fast_path",
+                                            "timings": {"fast_path": time.perf_counter() - started}})
+
 
 def init_db():
     """Create the price_history and scrape_log tables if they don't exist."""
-    conn = sqlite3.connect(_db_path())
+    if sqlite3.sqlite_version_info < MIN_SQLITE_VERSION:
+        raise RuntimeError(f"SQLite {'.'.join(map(str, MIN_SQLITE_VERSION))} or newer is required, but this "
+                           f"Python uses SQLite {sqlite3.sqlite_version}. Use a newer Python build.")
+    conn = db.connect(_db_path())
     conn.execute('''CREATE TABLE IF NOT EXISTS price_history (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         product_id TEXT NOT NULL,
@@ -686,153 +1031,716 @@ def init_db():
         top_listings TEXT,
         price_change REAL DEFAULT 0.0,
         quantity_change REAL DEFAULT 0.0,
-        daily_sales REAL DEFAULT 0.0
+        daily_sales REAL DEFAULT 0.0,
+        market_price_num REAL,
+        most_recent_sale_num REAL,
+        listed_median_num REAL,
+        current_quantity_num INTEGER,
+        current_sellers_num INTEGER,
+        sold_yesterday_num INTEGER,
+        total_sold_num INTEGER,
+        lowest_ask REAL
     )''')
     conn.execute('CREATE INDEX IF NOT EXISTS idx_product_id ON price_history(product_id)')
+    # Recent sales seen on a product page. A sale listed again in later snapshots is
+    # stored once; first/last_history_id are the price_history rows it appeared in.
+    conn.execute('''CREATE TABLE IF NOT EXISTS sale (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        product_id TEXT NOT NULL,
+        sold_at TEXT NOT NULL,
+        sale_date TEXT NOT NULL,
+        condition TEXT NOT NULL,
+        price REAL,
+        price_text TEXT NOT NULL,
+        qty INTEGER NOT NULL,
+        seq INTEGER NOT NULL DEFAULT 0,
+        first_history_id INTEGER NOT NULL,
+        last_history_id INTEGER NOT NULL
+    )''')
+    conn.execute('''CREATE UNIQUE INDEX IF NOT EXISTS idx_sale_identity
+        ON sale(product_id, sold_at, condition, price_text, qty, seq)''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_sale_product_date ON sale(product_id, sale_date, price)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_sale_product_snapshot ON sale(product_id, last_history_id)')
+    # Lowest-priced active listings of each price_history row, in price order
+    conn.execute('''CREATE TABLE IF NOT EXISTS listing (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        history_id INTEGER NOT NULL,
+        product_id TEXT NOT NULL,
+        date TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        price REAL,
+        price_text TEXT NOT NULL,
+        qty INTEGER,
+        condition TEXT,
+        seller TEXT,
+        verified INTEGER NOT NULL DEFAULT 0,
+        direct INTEGER NOT NULL DEFAULT 0
+    )''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_listing_history ON listing(history_id, position)')
+    # The newest price_history row of each product, kept up to date by every insert
+    conn.execute('''CREATE TABLE IF NOT EXISTS latest_price (
+        product_id TEXT PRIMARY KEY,
+        history_id INTEGER NOT NULL
+    )''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_listing_product_date ON listing(product_id, date, price)')
+    # Add the typed numeric columns if upgrading from older schema
+    for _, _, column, sql_type in _NUMERIC_COLUMNS + ((None, None, 'lowest_ask', 'REAL'),):
+        try:
+            conn.execute(f'ALTER TABLE price_history ADD COLUMN {column} {sql_type}')
+        except sqlite3.OperationalError:
+            pass  # Column already exists
     conn.execute('''CREATE TABLE IF NOT EXISTS scrape_log (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         timestamp TEXT NOT NULL,
         product_id TEXT,
         status TEXT NOT NULL,
-        message TEXT
+        message TEXT,
+        proxy TEXT,
+        attempts INTEGER,
+        sales_source TEXT,
+        timings TEXT
     )''')
+    # get_timing_summary looks up the latest run starts
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_scrape_log_status ON scrape_log(status)')
+    scrape_runs.create_tables(conn)
+    priority.create_tables(conn)
+    # Add the per-product detail columns if upgrading from older schema
+    for column in ('proxy TEXT', 'attempts INTEGER', 'sales_source TEXT', 'timings TEXT'):
+        try:
+            conn.execute(f'ALTER TABLE scrape_log ADD COLUMN {column}')
+        except sqlite3.OperationalError:
+            pass  # Column already exists
     conn.commit()
-    conn.close()
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    for target, migrate in _MIGRATIONS:
+        if version < target:
+            with db.transaction(_db_path()) as conn:
+                migrate(conn)
+                conn.execute(f'PRAGMA user_version = {target}')
 
 
-def log_scrape(product_id, status, message=""):
-    """Log a scrape attempt to the scrape_log table."""
-    conn = sqlite3.connect(_db_path())
-    conn.execute(
-        'INSERT INTO scrape_log (timestamp, product_id, status, message) VALUES (?, ?, ?, ?)',
-        (datetime.now().isoformat(), str(product_id) if product_id else None, status, message)
-    )
-    conn.commit()
-    conn.close()
+def _blob_int(val):
+    """Older rows stored numpy int64 changes as 8-byte BLOBs; read them back as numbers."""
+    if isinstance(val, bytes):
+        return float(int.from_bytes(val, 'little', signed=True)) if len(val) == 8 else 0.0
+    return val
+
+
+def _backfill_numeric_columns(conn, chunk=5000):
+    """Fill the typed columns of rows written before they existed, chunk rows at a time."""
+    text_columns = ', '.join(text for _, text, _, _ in _NUMERIC_COLUMNS)
+    assignments = ', '.join(f'{num} = ?' for _, _, num, _ in _NUMERIC_COLUMNS)
+    update = (f'UPDATE price_history SET {assignments}, lowest_ask = ?, '
+              f'quantity_change = ?, daily_sales = ? WHERE id = ?')
+    last_id = updated = 0
+    while True:
+        rows = conn.execute(
+            f'SELECT id, {text_columns}, top_listings, quantity_change, daily_sales '
+            f'FROM price_history WHERE id > ? ORDER BY id LIMIT ?', (last_id, chunk)
+        ).fetchall()
+        if not rows:
+            break
+        params = []
+        for row in rows:
+            texts = {text: row[text] for _, text, _, _ in _NUMERIC_COLUMNS}
+            params.append((
+                *(_numeric_value(texts[text], sql_type == 'INTEGER') for _, text, _, sql_type in _NUMERIC_COLUMNS),
+                _lowest_listing_price(_decode_list(row['top_listings'])),
+                _blob_int(row['quantity_change']),
+                _blob_int(row['daily_sales']),
+                row['id'],
+            ))
+        conn.executemany(update, params)
+        updated += len(rows)
+        last_id = rows[-1]['id']
+    if updated:
+        print(f"  → Migrated {updated} price history rows to typed numeric columns")
+
+
+def _move_sales_and_listings(conn, chunk=2000):
+    """Move the Recent Sales / Top Listings JSON of existing rows into the sale and listing tables."""
+    last_id = moved = 0
+    while True:
+        rows = conn.execute(
+            'SELECT id, product_id, date, recent_sales, top_listings FROM price_history '
+            'WHERE id > ? ORDER BY id LIMIT ?', (last_id, chunk)
+        ).fetchall()
+        if not rows:
+            break
+        for row in rows:
+            _store_children(conn, row['id'], row['product_id'], row['date'],
+                            _decode_list(row['recent_sales']), _decode_list(row['top_listings']))
+        conn.execute('UPDATE price_history SET recent_sales = NULL, top_listings = NULL WHERE id > ? AND id <= ?',
+                     (last_id, rows[-1]['id']))
+        moved += len(rows)
+        last_id = rows[-1]['id']
+    if moved:
+        print(f"  → Moved sales and listings of {moved} price history rows into their own tables")
+
+
+def _rebuild_latest_price(conn):
+    """Refill latest_price from price_history."""
+    conn.execute('DELETE FROM latest_price')
+    conn.execute('''INSERT INTO latest_price (product_id, history_id)
+        SELECT product_id, MAX(id) FROM price_history GROUP BY product_id''')
+
+
+def rebuild_latest_price():
+    """Recompute latest_price, e.g. after price_history rows were edited or deleted by hand."""
+    with db.transaction(_db_path()) as conn:
+        _rebuild_latest_price(conn)
+        count = conn.execute('SELECT COUNT(*) FROM latest_price').fetchone()[0]
+    print(f"Rebuilt latest prices for {count} products.")
+    return count
+
+
+def _dedupe_daily_rows(conn):
+    """Keep only the last row scraped per product and day, then enforce that with a unique
+    (product_id, date) index. Sales and listings of the dropped rows move to or go with them."""
+    conn.execute('DROP TABLE IF EXISTS temp.dropped_history')
+    conn.execute('''CREATE TEMP TABLE dropped_history AS
+        SELECT h.id, k.keep_id FROM price_history h
+        INNER JOIN (SELECT product_id, date, MAX(id) AS keep_id FROM price_history
+                    GROUP BY product_id, date HAVING COUNT(*) > 1) k
+        ON h.product_id = k.product_id AND h.date = k.date AND h.id < k.keep_id''')
+    dropped = conn.execute('SELECT COUNT(*) FROM temp.dropped_history').fetchone()[0]
+    if dropped:
+        for column in ('first_history_id', 'last_history_id'):
+            conn.execute(f'''UPDATE sale SET {column} =
+                (SELECT keep_id FROM temp.dropped_history d WHERE d.id = sale.{column})
+                WHERE {column} IN (SELECT id FROM temp.dropped_history)''')
+        conn.execute('DELETE FROM listing WHERE history_id IN (SELECT id FROM temp.dropped_history)')
+        conn.execute('DELETE FROM price_history WHERE id IN (SELECT id FROM temp.dropped_history)')
+        # The kept rows' changes were computed against an earlier row of the same day
+        kept = conn.execute(
+            '''SELECT id, product_id, date, market_price, current_quantity, total_sold FROM price_history
+               WHERE id IN (SELECT keep_id FROM temp.dropped_history)''').fetchall()
+        for row in kept:
+            data = {'Market Price': row['market_price'], 'Current Quantity': row['current_quantity'],
+                    'Total Sold': row['total_sold']}
+            _apply_changes(data, conn.execute(_CHANGE_BASIS_SELECT, (row['product_id'], row['date'])).fetchone())
+            conn.execute('UPDATE price_history SET price_change = ?, quantity_change = ?, daily_sales = ? WHERE id = ?',
+                         (data['Price Change'], data['Quantity Change'], data['Daily Sales'], row['id']))
+        print(f"  → Removed {dropped} duplicate same-day price history rows")
+    conn.execute('DROP TABLE temp.dropped_history')
+    conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_history_product_date ON price_history(product_id, date)')
+
+
+# (PRAGMA user_version, migration) in order; init_db runs the ones a database hasn't had yet
+_MIGRATIONS = (
+    (1, _backfill_numeric_columns),
+    (2, _move_sales_and_listings),
+    (3, _rebuild_latest_price),
+    (4, _dedupe_daily_rows),
+)
+
+
+_LOG_INSERT = ('INSERT INTO scrape_log (timestamp, product_id, status, message, proxy, attempts, sales_source, timings) '
+               'VALUES (?, ?, ?, ?, ?, ?, ?, ?)')
+
+# Set by run_scrape while parallel or async workers queue their writes (see result_writer.py)
+_result_writer = None
+
+# The current run's checkpoint (see scrape_runs.py); log_scrape keeps its item states up to date
+_run_checkpoint = None
+
+
+def log_scrape(product_id, status, message="", proxy=None, attempts=None, sales_source=None, stage_times=None):
+    """Log a scrape attempt to the scrape_log table.
+
+    proxy: label of the proxy the product was fetched through
+    attempts: page loads it took, including retries
+    sales_source: how recent sales were obtained (capture, js, popup, fast_path)
+    stage_times: {stage: seconds} from the product's StageTimer
+    """
+    row = (datetime.now().isoformat(), str(product_id) if product_id else None, status, message, proxy, attempts,
+           sales_source, json.dumps({k: round(v, 4) for k, v in stage_times.items()}) if stage_times else None)
+    item = _run_checkpoint.item_update(product_id, status, attempts, message) if _run_checkpoint else None
+    if _result_writer is not None:
+        _result_writer.put('log', *row)
+        if item:
+            _result_writer.put('run_item', *item)
+        return
+    with db.transaction(_db_path()) as conn:
+        conn.execute(_LOG_INSERT, row)
+        if item:
+            conn.execute(scrape_runs.ITEM_UPDATE, item)
+
+
+def _mark_in_flight(product_id):
+    """Record in the run checkpoint that a product is being scraped."""
+    if _run_checkpoint is None:
+        return
+    item = _run_checkpoint.in_flight(product_id)
+    if _result_writer is not None:
+        _result_writer.put('run_item', *item)
+        return
+    with db.transaction(_db_path()) as conn:
+        conn.execute(scrape_runs.ITEM_UPDATE, item)
+
+
+def _retries_left(product_id, retry_attempts):
+    """Retries a product may take in this run, less any it used before the run was resumed."""
+    if _run_checkpoint is None:
+        return retry_attempts
+    return _run_checkpoint.retries_left(product_id, retry_attempts)
+
+
+_SCRAPE_LOGS_SELECT = 'SELECT * FROM scrape_log ORDER BY id DESC LIMIT ?'
+_RUN_STARTS_SELECT = "SELECT id FROM scrape_log WHERE status = 'start' ORDER BY id DESC LIMIT ?"
+_RUN_LOGS_SELECT = (
+    'SELECT id, timestamp, status, proxy, attempts, sales_source, timings FROM scrape_log '
+    'WHERE id >= ? AND product_id IS NOT NULL')
 
 
 def get_scrape_logs(limit=200):
     """Return recent scrape log entries."""
-    conn = sqlite3.connect(_db_path())
-    conn.row_factory = sqlite3.Row
-    rows = conn.execute(
-        'SELECT * FROM scrape_log ORDER BY id DESC LIMIT ?', (limit,)
-    ).fetchall()
-    conn.close()
-    return [dict(r) for r in rows]
+    conn = db.connect(_db_path())
+    rows = conn.execute(_SCRAPE_LOGS_SELECT, (limit,)).fetchall()
+    logs = [dict(r) for r in rows]
+    for log in logs:
+        log['timings'] = json.loads(log['timings']) if log.get('timings') else None
+    return logs
+
+
+def _summarize_log_rows(rows):
+    """Stage percentiles, retries and sales sources for a set of scrape_log rows, overall and per proxy."""
+    overall = timings.RunTimings()
+    by_proxy = {}
+    sales_sources = {}
+    failed = retries = 0
+    for row in rows:
+        proxy = row['proxy'] or 'unknown'
+        entry = by_proxy.setdefault(proxy, {'timings': timings.RunTimings(), 'failed': 0, 'retries': 0})
+        if row['status'] == 'retry':
+            retries += 1
+            entry['retries'] += 1
+        elif row['status'] == 'failed':
+            failed += 1
+            entry['failed'] += 1
+        elif row['status'] == 'success':
+            extra = max(0, (row['attempts'] or 1) - 1)
+            retries += extra
+            entry['retries'] += extra
+            if row['sales_source']:
+                sales_sources[row['sales_source']] = sales_sources.get(row['sales_source'], 0) + 1
+            if row['timings']:
+                stage_times = json.loads(row['timings'])
+                stage_times['total'] = sum(stage_times.values())
+                overall.add_product(stage_times)
+                entry['timings'].add_product(stage_times)
+    return {
+        'products': overall.products,
+        'failed': failed,
+        'retries': retries,
+        'sales_sources': sales_sources,
+        'stages': overall.stats(),
+        'by_proxy': {
+            proxy: {'products': e['timings'].products, 'failed': e['failed'], 'retries': e['retries'],
+                    'stages': e['timings'].stats()}
+            for proxy, e in sorted(by_proxy.items())
+        },
+    }
+
+
+def get_scrape_runs(limit=20):
+    """The latest scrape runs with their item counts per state (see scrape_runs.py)."""
+    return scrape_runs.get_runs(_db_path(), limit=limit)
+
+
+def get_scrape_run(run_id):
+    """One scrape run with the state of every product in it, or None."""
+    return scrape_runs.get_run(_db_path(), run_id)
+
+
+def get_timing_summary(baseline_runs=7):
+    """Aggregate the per-product timings of the latest scrape run, next to the same
+    aggregates over the baseline_runs runs before it, to spot which stage regressed."""
+    conn = db.connect(_db_path())
+    # 'start' log ids of the latest run and up to baseline_runs before it, newest first
+    starts = [r['id'] for r in conn.execute(_RUN_STARTS_SELECT, (baseline_runs + 1,))]
+    if not starts:
+        return {'latest': None, 'baseline': None, 'baseline_runs': 0}
+
+    latest_start, baseline_count = starts[0], len(starts) - 1
+    rows = conn.execute(_RUN_LOGS_SELECT, (starts[-1],)).fetchall()
+    latest = _summarize_log_rows([r for r in rows if r['id'] > latest_start])
+    latest['started'] = conn.execute('SELECT timestamp FROM scrape_log WHERE id = ?', (latest_start,)).fetchone()[0]
+    baseline = _summarize_log_rows([r for r in rows if r['id'] < latest_start]) if baseline_count else None
+    return {'latest': latest, 'baseline': baseline, 'baseline_runs': baseline_count}
+
+
+_HISTORY_INSERT_COLUMNS = (
+    'product_id', 'product_name', 'date', 'market_price', 'most_recent_sale', 'listed_median',
+    'current_quantity', 'current_sellers', 'sold_yesterday', 'total_sold',
+    'price_change', 'quantity_change', 'daily_sales',
+    'market_price_num', 'most_recent_sale_num', 'listed_median_num', 'current_quantity_num',
+    'current_sellers_num', 'sold_yesterday_num', 'total_sold_num', 'lowest_ask',
+)
+
+# One row per product and day: scraping a product again the same day replaces that day's row
+_HISTORY_INSERT = f'''INSERT INTO price_history ({', '.join(_HISTORY_INSERT_COLUMNS)})
+    VALUES ({', '.join('?' for _ in _HISTORY_INSERT_COLUMNS)})
+    ON CONFLICT (product_id, date) DO UPDATE SET
+    {', '.join(f'{c} = excluded.{c}' for c in _HISTORY_INSERT_COLUMNS[3:] + ('product_name',))}
+    RETURNING id'''
+
+# A sale already stored for the product is only marked as seen in the new snapshot
+_SALE_UPSERT = '''INSERT INTO sale
+    (product_id, sold_at, sale_date, condition, price, price_text, qty, seq, first_history_id, last_history_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (product_id, sold_at, condition, price_text, qty, seq)
+    DO UPDATE SET last_history_id = excluded.last_history_id'''
+
+# Before a same-day scrape replaces a snapshot: sales it held end at the product's previous
+# snapshot again, and the new snapshot's _SALE_UPSERT extends those it still lists. A sale seen
+# only in the replaced scrape is left in no snapshot (last_history_id < first_history_id), but
+# is kept for the by-date averages.
+_SALE_SNAPSHOT_RESET = '''UPDATE sale SET last_history_id =
+    (SELECT COALESCE(MAX(id), 0) FROM price_history WHERE product_id = ? AND id < ?)
+    WHERE product_id = ? AND last_history_id = ?'''
+
+_LISTING_INSERT = '''INSERT INTO listing
+    (history_id, product_id, date, position, price, price_text, qty, condition, seller, verified, direct)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'''
+_LISTING_DELETE = 'DELETE FROM listing WHERE history_id = ?'
+
+# Point the product's latest_price row at a newly inserted price_history row
+_LATEST_PRICE_UPSERT = '''INSERT INTO latest_price (product_id, history_id) VALUES (?, ?)
+    ON CONFLICT (product_id) DO UPDATE SET history_id = excluded.history_id
+    WHERE excluded.history_id > latest_price.history_id'''
+
+# The fields day-over-day changes are computed from, of the product's last row before a date
+_CHANGE_BASIS_SELECT = '''SELECT market_price_num, current_quantity_num, total_sold_num FROM price_history
+    WHERE product_id = ? AND date < ? ORDER BY date DESC LIMIT 1'''
+# (product_id, date, *basis) of every product's newest row
+_LATEST_CHANGE_BASIS_SELECT = '''SELECT l.product_id, p.date, p.market_price_num, p.current_quantity_num,
+    p.total_sold_num FROM latest_price l INNER JOIN price_history p ON p.id = l.history_id'''
+
+
+def _numeric_value(text, integer=False):
+    """'$1,234.56' or '1,234' as a float (or int), or None for 'N/A' and other non-numbers."""
+    value = price_value(text)
+    if value is None or value != value or value in (float('inf'), float('-inf')):
+        return None
+    return int(value) if integer else value
+
+
+def _decode_list(value):
+    """A Recent Sales / Top Listings value (JSON text or an already decoded list) as a list."""
+    if isinstance(value, list):
+        return value
+    try:
+        decoded = json.loads(value) if value else []
+    except (ValueError, TypeError):
+        return []
+    return decoded if isinstance(decoded, list) else []
+
+
+def _lowest_listing_price(listings):
+    """Price of the first parseable listing (they're sorted lowest first), or None."""
+    for listing in listings:
+        price = _numeric_value(listing.get('price', '')) if isinstance(listing, dict) else None
+        if price is not None:
+            return price
+    return None
+
+
+def _sale_day(sold_at):
+    """'YYYY-MM-DD' of an ISO timestamp or M/D/YY(YY) sale date, or None."""
+    if re.match(r'\d{4}-\d{2}-\d{2}', sold_at):
+        return sold_at[:10]
+    for fmt in ('%m/%d/%Y', '%m/%d/%y'):
+        try:
+            return datetime.strptime(sold_at, fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    return None
+
+
+def _store_children(conn, history_id, product_id, date, recent_sales, top_listings):
+    """Write the sales and listings of price_history row history_id."""
+    sales, seen = [], {}
+    for sale in recent_sales:
+        if not isinstance(sale, dict):
+            continue
+        sold_at = str(sale.get('date') or '').strip()
+        condition = str(sale.get('condition') or '')
+        price_text = str(sale.get('price') or '')
+        qty = _numeric_value(sale.get('qty'), integer=True)
+        qty = 1 if qty is None else qty
+        # Identical sales within one snapshot (same time, price and qty) are still separate sales
+        key = (sold_at, condition, price_text, qty)
+        seen[key] = seq = seen.get(key, -1) + 1
+        # Sales without a readable date are counted on the day they were first seen
+        sales.append((str(product_id), sold_at, _sale_day(sold_at) or date, condition,
+                      _numeric_value(price_text), price_text, qty, seq, history_id, history_id))
+    if sales:
+        conn.executemany(_SALE_UPSERT, sales)
+
+    listings = [
+        (history_id, str(product_id), date, position, _numeric_value(listing.get('price', '')),
+         str(listing.get('price', '')), _numeric_value(listing.get('qty'), integer=True),
+         listing.get('condition'), listing.get('seller'),
+         int(bool(listing.get('verified'))), int(bool(listing.get('direct'))))
+        for position, listing in enumerate(l for l in top_listings if isinstance(l, dict))
+    ]
+    if listings:
+        conn.executemany(_LISTING_INSERT, listings)
+
+
+def _numeric_fields(new_data):
+    """Typed values of new_data's scraped fields, in _NUMERIC_COLUMNS order."""
+    return tuple(_numeric_value(new_data.get(key), sql_type == 'INTEGER')
+                 for key, _, _, sql_type in _NUMERIC_COLUMNS)
+
+
+def _apply_changes(new_data, prev):
+    """Set Price Change, Quantity Change and Daily Sales on new_data from the previous
+    row's (market_price_num, current_quantity_num, total_sold_num), or zeros if there is none."""
+    new_data['Price Change'] = 0.0
+    new_data['Quantity Change'] = 0.0
+    new_data['Daily Sales'] = 0.0
+    if not prev:
+        return
+
+    last_price, last_qty, last_sold = prev
+    new_price = _numeric_value(new_data['Market Price'])
+    if last_price is not None and new_price is not None:
+        new_data['Price Change'] = float(new_price - last_price)
+
+    new_qty = _numeric_value(new_data['Current Quantity'], integer=True)
+    if last_qty is not None and new_qty is not None:
+        new_data['Quantity Change'] = float(new_qty - last_qty)
+
+    new_sold = _numeric_value(new_data.get('Total Sold', 0), integer=True)
+    if last_sold is not None and new_sold is not None and new_sold >= last_sold:
+        new_data['Daily Sales'] = float(new_sold - last_sold)
+
+
+def _history_row(product_id, product_name, new_data, listings=()):
+    """Parameters for _HISTORY_INSERT."""
+    return (
+        str(product_id),
+        product_name,
+        new_data['Date'],
+        new_data['Market Price'],
+        new_data['Most Recent Sale'],
+        new_data['Listed Median'],
+        new_data['Current Quantity'],
+        new_data['Current Sellers'],
+        new_data['Sold Yesterday'],
+        new_data['Total Sold'],
+        new_data['Price Change'],
+        new_data['Quantity Change'],
+        new_data['Daily Sales'],
+        *_numeric_fields(new_data),
+        _lowest_listing_price(listings),
+    )
+
+
+def _store_snapshot(conn, product_id, product_name, new_data):
+    """Insert one price_history row (changes already applied) with its sales and listings.
+    Returns the inserted _HISTORY_INSERT parameters."""
+    listings = _decode_list(new_data.get('Top Listings'))
+    row = _history_row(product_id, product_name, new_data, listings)
+    history_id = conn.execute(_HISTORY_INSERT, row).fetchone()[0]
+    conn.execute(_LATEST_PRICE_UPSERT, (str(product_id), history_id))
+    conn.execute(priority.SCHEDULE_TOUCH, (str(product_id), datetime.now().isoformat()))
+    # From an earlier scrape the same day
+    conn.execute(_SALE_SNAPSHOT_RESET, (str(product_id), history_id, str(product_id), history_id))
+    conn.execute(_LISTING_DELETE, (history_id,))
+    _store_children(conn, history_id, product_id, new_data['Date'],
+                    _decode_list(new_data.get('Recent Sales')), listings)
+    return row
 
 
 def update_data(product_id, product_name, new_data):
     """
     Append new data to the SQLite database and compute day-over-day changes.
-    Returns a DataFrame of the product's full history.
+    Only the previous row is read, so the cost doesn't grow with the product's history.
+    Returns True once stored.
     """
     if not new_data or not product_name:
         return None
 
-    new_data['Price Change'] = 0.0
-    new_data['Quantity Change'] = 0.0
-    new_data['Daily Sales'] = 0.0
+    with db.transaction(_db_path()) as conn:
+        prev = conn.execute(_CHANGE_BASIS_SELECT, (str(product_id), new_data['Date'])).fetchone()
+        _apply_changes(new_data, prev)
+        _store_snapshot(conn, product_id, product_name, new_data)
+    return True
+
+
+def _batch_writer():
+    """Return a write_batch function for ResultWriter. It stores queued ('product',
+    product_id, name, data), ('log', *columns) and ('run_item', *params) rows, computing day-over-day changes
+    from the latest row per product, which it loads once and then keeps in memory
+    (a product scraped twice the same day is looked up in the database instead)."""
+    previous = None
+
+    def write_batch(conn, items):
+        nonlocal previous
+        if previous is None:
+            previous = {r[0]: tuple(r[1:]) for r in conn.execute(_LATEST_CHANGE_BASIS_SELECT)}
+        logs = []
+        run_items = []
+        latest = {}
+        for kind, args in items:
+            if kind == 'product':
+                product_id, product_name, new_data = args
+                pid = str(product_id)
+                cached = latest.get(pid) or previous.get(pid)
+                if cached is None or cached[0] < new_data['Date']:
+                    prev = cached and cached[1:]
+                else:
+                    prev = conn.execute(_CHANGE_BASIS_SELECT, (pid, new_data['Date'])).fetchone()
+                _apply_changes(new_data, prev)
+                row = _store_snapshot(conn, product_id, product_name, new_data)
+                # date, market_price_num, current_quantity_num, total_sold_num
+                latest[pid] = (row[2], row[13], row[16], row[19])
+            elif kind == 'run_item':
+                run_items.append(args)
+            else:
+                logs.append(args)
+        if logs:
+            conn.executemany(_LOG_INSERT, logs)
+        if run_items:
+            conn.executemany(scrape_runs.ITEM_UPDATE, run_items)
+        # Only once the batch is in: a failed batch is retried row by row
+        previous.update(latest)
 
-    def to_num(val):
-        return pd.to_numeric(str(val).replace('$', '').replace(',', ''), errors='coerce')
-
-    conn = sqlite3.connect(_db_path())
-
-    # Get previous row for day-over-day calculations
-    prev = conn.execute(
-        'SELECT market_price, current_quantity, total_sold FROM price_history WHERE product_id = ? ORDER BY id DESC LIMIT 1',
-        (str(product_id),)
-    ).fetchone()
-
-    if prev:
-        last_price, new_price = to_num(prev[0]), to_num(new_data['Market Price'])
-        if pd.notna(last_price) and pd.notna(new_price):
-            new_data['Price Change'] = new_price - last_price
-
-        last_qty, new_qty = to_num(prev[1]), to_num(new_data['Current Quantity'])
-        if pd.notna(last_qty) and pd.notna(new_qty):
-            new_data['Quantity Change'] = new_qty - last_qty
-
-        last_sold, new_sold = to_num(prev[2]), to_num(new_data.get('Total Sold', 0))
-        if pd.notna(last_sold) and pd.notna(new_sold) and new_sold >= last_sold:
-            new_data['Daily Sales'] = new_sold - last_sold
-
-    conn.execute(
-        '''INSERT INTO price_history
-           (product_id, product_name, date, market_price, most_recent_sale, listed_median,
-            current_quantity, current_sellers, sold_yesterday, total_sold,
-            recent_sales, top_listings, price_change, quantity_change, daily_sales)
-           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-        (
-            str(product_id),
-            product_name,
-            new_data['Date'],
-            new_data['Market Price'],
-            new_data['Most Recent Sale'],
-            new_data['Listed Median'],
-            new_data['Current Quantity'],
-            new_data['Current Sellers'],
-            new_data['Sold Yesterday'],
-            new_data['Total Sold'],
-            new_data.get('Recent Sales', '[]'),
-            new_data.get('Top Listings', '[]'),
-            new_data['Price Change'],
-            new_data['Quantity Change'],
-            new_data['Daily Sales'],
-        )
-    )
-    conn.commit()
+    return write_batch
 
-    df = pd.read_sql_query(_HISTORY_SELECT, conn, params=(str(product_id),))
-    conn.close()
-    return df
+
+_LATEST_SELECT = '''SELECT p.product_id, p.product_name, p.date, p.market_price, p.most_recent_sale,
+    p.listed_median, p.current_quantity, p.current_sellers, p.total_sold,
+    p.lowest_ask, p.price_change, p.quantity_change, p.daily_sales,
+    p.market_price_num, p.most_recent_sale_num, p.listed_median_num,
+    p.current_quantity_num, p.current_sellers_num, p.total_sold_num
+FROM latest_price l
+INNER JOIN price_history p ON p.id = l.history_id
+ORDER BY p.product_name'''
 
 
 def get_all_latest_from_db():
     """Return a list of dicts with the latest row per product_id."""
-    conn = sqlite3.connect(_db_path())
-    conn.row_factory = sqlite3.Row
-    rows = conn.execute('''
-        SELECT p.product_id, p.product_name, p.date, p.market_price, p.most_recent_sale,
-               p.listed_median, p.current_quantity, p.current_sellers, p.total_sold,
-               p.top_listings, p.price_change, p.quantity_change, p.daily_sales
-        FROM price_history p
-        INNER JOIN (
-            SELECT product_id, MAX(id) as max_id
-            FROM price_history GROUP BY product_id
-        ) latest ON p.id = latest.max_id
-        ORDER BY p.product_name
-    ''').fetchall()
-    conn.close()
+    rows = db.connect(_db_path()).execute(_LATEST_SELECT).fetchall()
     return [dict(r) for r in rows]
 
 
 def get_product_history(product_id):
     """Return full history DataFrame for a single product."""
-    conn = sqlite3.connect(_db_path())
-    df = pd.read_sql_query(_HISTORY_SELECT, conn, params=(str(product_id),))
-    conn.close()
+    df = pd.read_sql_query(_HISTORY_SELECT, db.connect(_db_path()), params=(str(product_id),))
     return df
 
 
+_PRODUCT_DETAIL_SELECT = 'SELECT * FROM price_history WHERE product_id = ? ORDER BY id DESC LIMIT 1'
+_RECENT_SALES_SELECT = '''SELECT sold_at, condition, price_text, qty FROM sale
+    WHERE product_id = ? AND last_history_id >= ? AND first_history_id <= ?
+    ORDER BY sale_date DESC, sold_at DESC, id'''
+_LISTINGS_SELECT = '''SELECT price_text, qty, condition, seller, verified, direct FROM listing
+    WHERE history_id = ? ORDER BY position'''
+_AVG_SALE_SELECT = 'SELECT AVG(price) FROM sale WHERE product_id = ? AND sale_date >= ?'
+
+
 def get_product_detail(product_id):
-    """Return the latest row for a single product as a dict, or None."""
-    conn = sqlite3.connect(_db_path())
-    conn.row_factory = sqlite3.Row
-    row = conn.execute(
-        'SELECT * FROM price_history WHERE product_id = ? ORDER BY id DESC LIMIT 1',
-        (str(product_id),)
-    ).fetchone()
-    conn.close()
-    return dict(row) if row else None
+    """Return the latest row for a single product as a dict, or None.
+    recent_sales and top_listings hold that row's sales and listings as lists."""
+    row = db.connect(_db_path()).execute(_PRODUCT_DETAIL_SELECT, (str(product_id),)).fetchone()
+    if not row:
+        return None
+    detail = dict(row)
+    detail['recent_sales'] = get_recent_sales(product_id, detail['id'])
+    detail['top_listings'] = get_listings(detail['id'])
+    return detail
+
+
+def get_recent_sales(product_id, history_id):
+    """The recent sales shown on price_history row history_id, newest first."""
+    rows = db.connect(_db_path()).execute(
+        _RECENT_SALES_SELECT, (str(product_id), history_id, history_id)).fetchall()
+    return [{'date': r['sold_at'], 'condition': r['condition'], 'price': r['price_text'], 'qty': r['qty']}
+            for r in rows]
+
+
+def get_listings(history_id):
+    """The active listings stored with price_history row history_id, lowest price first."""
+    rows = db.connect(_db_path()).execute(_LISTINGS_SELECT, (history_id,)).fetchall()
+    return [{'price': r['price_text'], 'qty': r['qty'] if r['qty'] is not None else '',
+             'condition': r['condition'], 'seller': r['seller'],
+             'verified': bool(r['verified']), 'direct': bool(r['direct'])} for r in rows]
+
+
+def average_sale_price(product_id, days=30):
+    """Average price of the product's sales in the last days days, or None if there were none."""
+    since = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+    row = db.connect(_db_path()).execute(_AVG_SALE_SELECT, (str(product_id), since)).fetchone()
+    return row[0]
+
+
+def pdf_products(product_ids=None):
+    """Report entries for create_combo_pdf_report: the latest row of each product
+    (or of product_ids only), sorted by name. History isn't included; each detail
+    page loads its product's history when it is drawn."""
+    rows = db.connect(_db_path()).execute(_LATEST_ROWS_SELECT).fetchall()
+    if product_ids is not None:
+        wanted = {str(pid) for pid in product_ids}
+        rows = [r for r in rows if str(r['product_id']) in wanted]
+    products = []
+    for row in rows:
+        latest = dict(row)
+        product_id = latest.pop('product_id')
+        products.append({
+            'product_id': product_id,
+            'name': _sanitize_for_pdf(latest.pop('product_name')),
+            'latest': latest,
+        })
+    return products
+
+
+def _query_plan_checks(product_id, history_id):
+    """(name, sql, params) of the queries the scraper and web app run, with sample parameters."""
+    today = datetime.now().strftime('%Y-%m-%d')
+    return [
+        ('get_all_latest_from_db', _LATEST_SELECT, ()),
+        ('pdf_products', _LATEST_ROWS_SELECT, ()),
+        ('get_product_history', _HISTORY_SELECT, (product_id,)),
+        ('get_product_detail', _PRODUCT_DETAIL_SELECT, (product_id,)),
+        ('get_recent_sales', _RECENT_SALES_SELECT, (product_id, history_id, history_id)),
+        ('get_listings', _LISTINGS_SELECT, (history_id,)),
+        ('average_sale_price', _AVG_SALE_SELECT, (product_id, today)),
+        ('_already_scraped_today', _SCRAPED_TODAY_SELECT, (product_id, today)),
+        ('scraped_today_ids', _SCRAPED_ON_SELECT, (today,)),
+        ('update_data: change basis', _CHANGE_BASIS_SELECT, (product_id, today)),
+        ('batch writer: change basis', _LATEST_CHANGE_BASIS_SELECT, ()),
+        ('store: reset sale snapshots', _SALE_SNAPSHOT_RESET, (product_id, history_id, product_id, history_id)),
+        ('store: replace listings', _LISTING_DELETE, (history_id,)),
+        ('get_scrape_logs', _SCRAPE_LOGS_SELECT, (200,)),
+        ('get_timing_summary: run starts', _RUN_STARTS_SELECT, (8,)),
+        ('get_timing_summary: run rows', _RUN_LOGS_SELECT, (0,)),
+        ('priority.plan: product stats', priority.PRODUCT_STATS_SELECT, (today,)),
+        ('priority.page_loads_today', priority.PAGE_LOADS_SINCE_SELECT, (today, today)),
+    ]
+
+
+def explain_query_plans():
+    """Print SQLite's EXPLAIN QUERY PLAN for every query the app issues. A SCAN of
+    price_history, sale or listing means a query isn't using an index."""
+    import catalog
+
+    conn = db.connect(_db_path())
+    sample = conn.execute('SELECT product_id, history_id FROM latest_price LIMIT 1').fetchone()
+    product_id, history_id = (sample['product_id'], sample['history_id']) if sample else ('0', 0)
+    for name, sql, params in _query_plan_checks(product_id, history_id) + catalog.example_queries():
+        print(name)
+        depth = {0: 0}
+        for node_id, parent, _, detail in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params).fetchall():
+            depth[node_id] = depth.get(parent, 0) + 1
+            print(f"{'  ' * depth[node_id]}→ {detail}")
 
 
 def generate_pdf_from_db(output_path=None):
     """Generate the PDF report from existing DB data without scraping."""
-    conn = sqlite3.connect(_db_path())
-    conn.row_factory = sqlite3.Row
-
     # Filter to tracked products from products.txt
     tracked_ids = set()
     for entry in load_products():
@@ -840,41 +1748,13 @@ def generate_pdf_from_db(output_path=None):
         if pid:
             tracked_ids.add(str(pid))
 
-    rows = conn.execute('''
-        SELECT p.product_id, p.product_name FROM price_history p
-        INNER JOIN (
-            SELECT product_id, MAX(id) as max_id
-            FROM price_history GROUP BY product_id
-        ) latest ON p.id = latest.max_id
-        ORDER BY p.product_name
-    ''').fetchall()
-
-    if tracked_ids:
-        rows = [r for r in rows if str(r['product_id']) in tracked_ids]
-
-    if not rows:
-        conn.close()
+    products = pdf_products(tracked_ids or None)
+    if not products:
         print("No data in database.")
         return None
 
-    # Load all history in one connection
-    all_products_data = []
-    for row in rows:
-        pid = row['product_id']
-        name = _sanitize_for_pdf(row['product_name'])
-        df = pd.read_sql_query(_HISTORY_SELECT, conn, params=(str(pid),))
-        if df is not None and not df.empty:
-            all_products_data.append({
-                'name': name,
-                'latest': df.iloc[-1].to_dict(),
-                'history': df
-            })
-    conn.close()
-
-    if all_products_data:
-        create_combo_pdf_report(all_products_data, output_path=output_path)
-        return True
-    return None
+    create_combo_pdf_report(products, output_path=output_path)
+    return True
 
 
 def _safe_num(val, default=0):
@@ -887,29 +1767,14 @@ def _safe_num(val, default=0):
         return default
 
 
-def _compute_avg_recent_sale(recent_sales_json):
-    """Parse recent sales JSON and return average price as float, or None."""
-    try:
-        sales = json.loads(recent_sales_json) if isinstance(recent_sales_json, str) else recent_sales_json
-        if not sales:
-            return None
-        prices = []
-        for s in sales:
-            p = s.get('price', '')
-            p_num = pd.to_numeric(str(p).replace('$', '').replace(',', ''), errors='coerce')
-            if pd.notna(p_num):
-                prices.append(p_num)
-        return sum(prices) / len(prices) if prices else None
-    except Exception:
-        return None
-
-
 def create_combo_pdf_report(all_products_data, output_path=None):
-    """Generate the combined PDF report."""
+    """Generate the combined PDF report.
+    Entries without a 'history' DataFrame (see pdf_products) have it loaded one page at a time."""
     if not all_products_data:
         print("No data collected.")
         return
 
+    started = time.perf_counter()
     pdf = PDF()
 
     # --- Summary page ---
@@ -920,21 +1785,6 @@ def create_combo_pdf_report(all_products_data, output_path=None):
     pdf.cell(0, 10, f'Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}', new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
     pdf.ln(10)
 
-    def parse_listings_json(raw):
-        try:
-            return json.loads(raw) if isinstance(raw, str) else (raw or [])
-        except Exception:
-            return []
-
-    def lowest_listing_price(listings):
-        """Return the lowest listed price as a float, or None."""
-        for l in listings:
-            try:
-                return float(str(l.get('price', '')).replace('$', '').replace(',', ''))
-            except Exception:
-                continue
-        return None
-
     # Table header
     cols = [
         (62, 'Product Name'),
@@ -975,39 +1825,30 @@ def create_combo_pdf_report(all_products_data, output_path=None):
         ds = int(_safe_num(latest.get('Daily Sales', 0)))
         pdf.cell(16, 8, str(ds), 1, align='R', new_x=XPos.RIGHT, new_y=YPos.TOP)
 
-        avg = _compute_avg_recent_sale(latest.get('Recent Sales', '[]'))
+        avg = latest.get('Avg Recent Sale')
         avg_str = f"${avg:.2f}" if avg is not None else 'N/A'
         pdf.cell(20, 8, avg_str, 1, align='R', new_x=XPos.RIGHT, new_y=YPos.TOP)
 
-        listings = parse_listings_json(latest.get('Top Listings', '[]'))
-        low_ask = lowest_listing_price(listings)
+        low_ask = latest.get('Lowest Ask')
         low_ask_str = f"${low_ask:.2f}" if low_ask is not None else 'N/A'
         pdf.cell(20, 8, low_ask_str, 1, align='R', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
 
     # --- Per-product detail pages ---
     for prod in all_products_data:
-        df = prod['history'].copy()
+        df = prod['history'].copy() if 'history' in prod else get_product_history(prod['product_id'])
+        if df.empty:
+            continue
         df['Date'] = pd.to_datetime(df['Date'])
         df.sort_values('Date', inplace=True)
 
-        def to_num_col(col):
-            if col in df.columns:
-                df[col] = pd.to_numeric(
-                    df[col].astype(str).str.replace('$', '', regex=False).str.replace(',', '', regex=False),
-                    errors='coerce'
-                )
-
-        for col in ['Market Price', 'Most Recent Sale', 'Listed Median',
-                    'Current Quantity', 'Current Sellers', 'Total Sold', 'Daily Sales']:
-            to_num_col(col)
+        # Chart the typed columns in place of the display text
+        for key, _, column, _ in _NUMERIC_COLUMNS:
+            df[key] = pd.to_numeric(df.pop(column), errors='coerce')
+        df['Daily Sales'] = pd.to_numeric(df['Daily Sales'], errors='coerce')
 
         df['7-Day Avg'] = df['Market Price'].rolling(window=7, min_periods=1).mean()
 
-        # Compute avg recent sale for each row
-        if 'Recent Sales' in df.columns:
-            df['Avg Recent Sale'] = df['Recent Sales'].apply(_compute_avg_recent_sale)
-        else:
-            df['Avg Recent Sale'] = None
+        df['Avg Recent Sale'] = pd.to_numeric(df['Avg Recent Sale'], errors='coerce')
 
         # Chart
         plt.style.use('seaborn-v0_8-whitegrid')
@@ -1063,7 +1904,7 @@ def create_combo_pdf_report(all_products_data, output_path=None):
             ('Daily Sales (calc)', int(_safe_num(latest.get('Daily Sales', 0)))),
         ]
 
-        avg = _compute_avg_recent_sale(latest.get('Recent Sales', '[]'))
+        avg = latest.get('Avg Recent Sale')
         if avg is not None:
             display_fields.append((f'Avg of Last {RECENT_SALES_COUNT} Sales', f'${avg:.2f}'))
 
@@ -1072,13 +1913,7 @@ def create_combo_pdf_report(all_products_data, output_path=None):
             pdf.cell(0, 7, str(val), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
 
         # Recent individual sales table
-        recent_sales = []
-        try:
-            rs_raw = latest.get('Recent Sales', '[]')
-            recent_sales = json.loads(rs_raw) if isinstance(rs_raw, str) else rs_raw
-        except Exception:
-            pass
-
+        recent_sales = get_recent_sales(prod['product_id'], latest['history_id'])
         if recent_sales:
             pdf.ln(3)
             pdf.set_font('Helvetica', 'B', 10)
@@ -1096,13 +1931,7 @@ def create_combo_pdf_report(all_products_data, output_path=None):
                 pdf.cell(40, 6, str(sale.get('qty', '')), 1, align='R', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
 
         # Active listings table
-        top_listings = []
-        try:
-            tl_raw = latest.get('Top Listings', '[]')
-            top_listings = json.loads(tl_raw) if isinstance(tl_raw, str) else (tl_raw or [])
-        except Exception:
-            pass
-
+        top_listings = get_listings(latest['history_id'])
         if top_listings:
             pdf.ln(3)
             pdf.set_font('Helvetica', 'B', 10)
@@ -1141,6 +1970,7 @@ def create_combo_pdf_report(all_products_data, output_path=None):
 
     out = output_path or DEFAULT_PDF_OUTPUT
     pdf.output(out)
+    metrics.pdf_seconds.observe(time.perf_counter() - started)
     print(f"Report generated: {out}")
 
 
@@ -1208,16 +2038,26 @@ def _create_proxy_auth_extension(proxy):
     return ext_dir
 
 
+_SCRAPED_TODAY_SELECT = 'SELECT COUNT(*) FROM price_history WHERE product_id = ? AND date = ?'
+_SCRAPED_ON_SELECT = '''SELECT l.product_id FROM latest_price l
+    INNER JOIN price_history p ON p.id = l.history_id WHERE p.date = ?'''
+
+# Product IDs scraped today, loaded once by a resuming run_scrape and added to as products are stored
+_scraped_today = None
+
+
+def scraped_today_ids():
+    """Set of the product IDs that already have a row for today."""
+    today = datetime.now().strftime('%Y-%m-%d')
+    return {r[0] for r in db.connect(_db_path()).execute(_SCRAPED_ON_SELECT, (today,))}
+
+
 def _already_scraped_today(product_id):
     """Check if a product has already been scraped today."""
+    if _scraped_today is not None:
+        return str(product_id) in _scraped_today
     today = datetime.now().strftime('%Y-%m-%d')
-    db_path = os.path.join(_BASE_DIR, DB_FILE)
-    conn = sqlite3.connect(db_path)
-    count = conn.execute(
-        'SELECT COUNT(*) FROM price_history WHERE product_id = ? AND date = ?',
-        (str(product_id), today)
-    ).fetchone()[0]
-    conn.close()
+    count = db.connect(_db_path()).execute(_SCRAPED_TODAY_SELECT, (str(product_id), today)).fetchone()[0]
     return count > 0
 
 
@@ -1257,12 +2097,8 @@ def _find_chrome_binary():
     return None
 
 
-def create_driver(proxy=None, user_agent=None):
-    """Create and return a fresh Chrome driver with CDP network tracking.
-
-    proxy: optional dict with host, port, user, pass keys
-    user_agent: optional UA string override
-    """
+def _start_chrome(settings, proxy, user_agent, perf_log_enabled):
+    """Start one Chrome session. perf_log_enabled turns on the performance log."""
     options = webdriver.ChromeOptions()
 
     # Set Chrome binary path if not in default location
@@ -1279,7 +2115,8 @@ def create_driver(proxy=None, user_agent=None):
     ua = user_agent or DEFAULT_USER_AGENT
     options.add_argument(f"user-agent={ua}")
     options.add_argument('--window-size=1920,1080')
-    options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    if perf_log_enabled:
+        options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
 
     _proxy_ext_dir = None
     if proxy:
@@ -1292,38 +2129,225 @@ def create_driver(proxy=None, user_agent=None):
         else:
             options.add_argument(f'--proxy-server=http://{proxy["host"]}:{proxy["port"]}')
 
-    driver = webdriver.Chrome(service=ChromeService(ChromeDriverManager().install()), options=options)
-    driver.set_page_load_timeout(60)
-    driver.execute_cdp_cmd('Network.enable', {})
+    driver = driver_resolver.new_chrome_driver(options, chrome_binary=chrome_path)
     # Store ext dir ref for cleanup
     driver._proxy_ext_dir = _proxy_ext_dir
+    driver._perf_log_enabled = perf_log_enabled
+    driver._capture = None
+    driver.set_page_load_timeout(60)
+    driver.execute_cdp_cmd('Network.enable', {})
+    if settings.get('block_resources_enabled'):
+        _apply_request_blocking(driver, settings.get('blocked_url_patterns', []))
+    return driver
+
+
+def create_driver(proxy=None, user_agent=None):
+    """Create and return a fresh Chrome driver with CDP network tracking.
+
+    proxy: optional dict with host, port, user, pass keys
+    user_agent: optional UA string override
+    """
+    import settings as app_settings
+    s = app_settings.load_settings()
+    started = time.perf_counter()
+
+    # The performance log buffers every network event until read, so it's only turned
+    # on when streaming capture isn't available. It can't be enabled on a running
+    # session, so if the capture fails to attach Chrome is started again with it.
+    if cdp_capture.available():
+        driver = _start_chrome(s, proxy, user_agent, perf_log_enabled=False)
+        try:
+            driver._capture = cdp_capture.NetworkCapture.attach(driver)
+        except Exception as e:
+            print(f"  → Streaming network capture unavailable, restarting Chrome with the performance log: {e}")
+            _cleanup_driver(driver)
+            driver = None
+    else:
+        driver = None
+    if driver is None:
+        driver = _start_chrome(s, proxy, user_agent, perf_log_enabled=True)
+    metrics.driver_create_seconds.observe(time.perf_counter() - started)
     return driver
 
 
 def _cleanup_driver(driver):
     """Quit driver and clean up any proxy auth extension temp dir."""
     ext_dir = getattr(driver, '_proxy_ext_dir', None)
+    capture = getattr(driver, '_capture', None)
+    if capture is not None:
+        capture.close()
     driver.quit()
     if ext_dir and os.path.isdir(ext_dir):
         shutil.rmtree(ext_dir, ignore_errors=True)
 
 
-def scrape_with_retry(product_id, url, driver, retry_attempts=None):
-    """Attempt to scrape a product, retrying with backoff on failure."""
+def _readiness_note(data):
+    """Format the readiness timing recorded by scrape_product_data for the scrape log."""
+    meta = data.get('_meta') or {}
+    if 'ready_wait' not in meta:
+        return ''
+    return f" (ready in {meta['ready_wait']:.2f}s, saved {meta['ready_saved']:.2f}s)"
+
+
+def _store_success(product_id, name, data, message, proxy=None, attempts=None):
+    """Write a scraped product and its success log entry, adding the product's stage
+    timings (plus db_write and log) to stage_timings. With a ResultWriter running
+    for the run, the rows are queued for it instead of written here."""
+    meta = data.get('_meta') or {}
+    product_times = dict(meta.get('timings') or {})
+    start = time.perf_counter()
+    if _result_writer is not None:
+        _result_writer.put('product', product_id, name, data)
+        product_times['db_queue'] = time.perf_counter() - start
+    else:
+        update_data(product_id, name, data)
+        product_times['db_write'] = time.perf_counter() - start
+        metrics.db_write_seconds.observe(product_times['db_write'])
+    if _scraped_today is not None:
+        _scraped_today.add(str(product_id))
+    metrics.products_scraped.inc()
+    start = time.perf_counter()
+    log_scrape(product_id, "success", message, proxy=rate_limiter.proxy_label(proxy),
+               attempts=attempts or meta.get('attempts', 1), sales_source=meta.get('sales_source'),
+               stage_times=product_times)
+    product_times['log'] = time.perf_counter() - start
+    stage_timings.add_product(product_times)
+
+
+def _fail_dropped_products(writer, products):
+    """Mark the products whose rows the ResultWriter had to drop as failed. Returns their entries.
+
+    They were counted and logged as scraped when they were queued; the failed log
+    entry leaves their run items failed, so a resumed run scrapes them again.
+    """
+    dropped = list(dict.fromkeys(str(args[0]) for kind, args in writer.dropped if kind == 'product'))
+    entries = {}
+    for entry in products:
+        entries.setdefault(str(normalize_product(entry)[0]), entry)
+    for product_id in dropped:
+        metrics.products_failed.inc(reason='store_error')
+        log_scrape(product_id, "failed", "Scraped, but the result could not be stored")
+    return [entries.get(product_id, product_id) for product_id in dropped]
+
+
+def _failure_reason(name=None, failure=None):
+    """Label for tcg_products_failed_total: the page failure class, or why no data came back."""
+    if failure:
+        return failure
+    return 'unknown_product' if name == "Unknown Product" else 'no_data'
+
+
+def _acquire_driver(driver_pool, proxy=None, user_agent=None):
+    """Lease a driver from the shared pool, or create a fresh one when running without a pool."""
+    start = time.perf_counter()
+    if driver_pool is not None:
+        driver = driver_pool.lease(proxy)
+    else:
+        driver = create_driver(proxy=proxy, user_agent=user_agent)
+    stage_timings.add('driver_acquire', time.perf_counter() - start)
+    return driver
+
+
+def _release_driver(driver_pool, driver):
+    """Return a driver to the shared pool, or quit it when running without a pool."""
+    if driver_pool is not None:
+        driver_pool.release(driver)
+    else:
+        _cleanup_driver(driver)
+
+
+def _rotation_due(driver_pool, driver, count, rotate_every):
+    """Whether the session should be rotated after `count` products.
+    Pooled drivers track their own request count and age."""
+    if driver_pool is not None:
+        return driver_pool.record_request(driver)
+    return count % rotate_every == 0
+
+
+def _create_api_client(driver, proxy=None):
+    """Warm the browser session once and return an ApiClient sharing its cookies, or None."""
+    try:
+        return ApiClient.from_driver(driver, proxy=proxy, site_base=SITE_BASE,
+                                     sales_base=SALES_API_BASE, search_base=SEARCH_API_BASE)
+    except Exception as e:
+        print(f"  → HTTP fast path unavailable, using page loads: {e}")
+        return None
+
+
+def _page_outcome(name, data, failure=None):
+    """Map a page-load result (and the driver's _last_failure) to a rate limiter outcome."""
+    if data and name and name != "Unknown Product":
+        return rate_limiter.OK
+    if name == "Unknown Product" or failure in ('blocked', 'timeout'):
+        return rate_limiter.THROTTLED
+    return rate_limiter.FAILED
+
+
+def _try_fast_path(product_id, api, limiter=None, key=None):
+    """One paced fast-path attempt, reported to the limiter. Returns (name, data) or (None, None)."""
+    if limiter is not None:
+        limiter.wait(key)
+    started = time.monotonic()
+    name, data = scrape_product_fast(product_id, api)
+    elapsed = time.monotonic() - started
+    metrics.fetch_seconds.observe(elapsed, proxy=key or 'direct')
+    if limiter is not None:
+        if data and name:
+            outcome = rate_limiter.OK
+        elif api.last_status in (403, 429):
+            outcome = rate_limiter.THROTTLED
+        else:
+            outcome = rate_limiter.FAILED
+        limiter.record(key, outcome, elapsed)
+    return name, data
+
+
+def scrape_with_retry(product_id, url, driver, retry_attempts=None, api=None, idle_window=READY_IDLE_WINDOW,
+                      limiter=None, proxy=None):
+    """Attempt to scrape a product, retrying with backoff on failure.
+
+    api: optional ApiClient — when given, the direct HTTP fast path is tried first
+    and the full page load is only used if it fails.
+    idle_window: network idle time that counts as page readiness (see wait_for_readiness).
+    limiter: optional AdaptiveRateLimiter that paces every attempt for this proxy
+    and is told how each one went.
+    """
     retries = retry_attempts if retry_attempts is not None else RETRY_ATTEMPTS
+    key = rate_limiter.proxy_label(proxy)
+    if api is not None:
+        name, data = _try_fast_path(product_id, api, limiter, key)
+        if data and name:
+            return name, data
+        print("  → Falling back to full page load")
+    first_started = time.monotonic()
     for attempt in range(1 + retries):
-        name, data = scrape_product_data(product_id, url, driver)
-        if data and name and name != "Unknown Product":
+        if limiter is not None:
+            limiter.wait(key)
+        started = time.monotonic()
+        name, data = scrape_product_data(product_id, url, driver, idle_window=idle_window)
+        outcome = _page_outcome(name, data, driver._last_failure)
+        elapsed = time.monotonic() - started
+        metrics.fetch_seconds.observe(elapsed, proxy=key)
+        if limiter is not None:
+            limiter.record(key, outcome, elapsed)
+        if outcome == rate_limiter.OK:
+            data['_meta']['attempts'] = attempt + 1
+            if attempt:
+                # Failed attempts and their backoff before the one that succeeded
+                data['_meta']['timings']['retries'] = started - first_started
             return name, data
         if attempt < retries:
+            metrics.retries.inc()
             wait = RETRY_BACKOFF * (2 ** attempt)
             print(f"  Retry {attempt + 1}/{retries} in {wait}s...")
             time.sleep(wait)
     return None, None
 
 
-def _scrape_sequential(products, settings, proxies, progress_callback=None, generate_pdf=True):
-    """Run scrape sequentially with a single driver. Returns (succeeded_count, failed_list)."""
+def _scrape_sequential(products, settings, proxies, progress_callback=None, generate_pdf=True, driver_pool=None,
+                       limiter=None):
+    """Run scrape sequentially with a single driver. Returns (succeeded_count, failed_list).
+    With a limiter, pacing is adaptive and the fixed delay between requests is skipped."""
     total = len(products)
     delay_range = tuple(settings.get('delay_between_requests', DELAY_BETWEEN_REQUESTS))
     retry_attempts = settings.get('retry_attempts', RETRY_ATTEMPTS)
@@ -1331,18 +2355,21 @@ def _scrape_sequential(products, settings, proxies, progress_callback=None, gene
     resume = settings.get('resume_enabled', False)
     use_ua_rotation = settings.get('ua_rotation_enabled', False)
     use_proxies = settings.get('proxies_enabled', False) and proxies
+    use_fast_path = settings.get('http_fast_path_enabled', False)
+    idle_window = settings.get('readiness_idle_window', READY_IDLE_WINDOW)
 
     proxy_idx = 0
     proxy = proxies[0] if use_proxies else None
     ua = _random_ua() if use_ua_rotation else None
     try:
-        driver = create_driver(proxy=proxy, user_agent=ua)
+        driver = _acquire_driver(driver_pool, proxy=proxy, user_agent=ua)
     except Exception as e:
         log_scrape(None, "error", f"Failed to create Chrome driver: {e}")
         print(f"ERROR: Failed to create Chrome driver: {e}")
         return 0, [str(entry) for entry in products]
+    api = _create_api_client(driver, proxy) if use_fast_path else None
 
-    all_products_data = []
+    succeeded = []
     failed = []
 
     try:
@@ -1365,146 +2392,325 @@ def _scrape_sequential(products, settings, proxies, progress_callback=None, gene
             print(f"\n[{i}/{total}] Scraping: {url}")
             if progress_callback:
                 progress_callback(i, total, f"Scraping {product_id}...")
-            name, data = scrape_with_retry(product_id, url, driver, retry_attempts=retry_attempts)
+            _mark_in_flight(product_id)
+            retries = _retries_left(product_id, retry_attempts)
+            name, data = scrape_with_retry(product_id, url, driver, retry_attempts=retries, api=api,
+                                           idle_window=idle_window, limiter=limiter, proxy=proxy)
 
             if data and name:
-                df = update_data(product_id, name, data)
-                if df is not None and not df.empty:
-                    all_products_data.append({
-                        'name': _sanitize_for_pdf(name),
-                        'latest': df.iloc[-1].to_dict(),
-                        'history': df
-                    })
-                log_scrape(product_id, "success", name)
+                _store_success(product_id, name, data, name + _readiness_note(data), proxy=proxy)
+                succeeded.append(product_id)
                 if progress_callback:
                     progress_callback(i, total, name)
             else:
                 print(f"  Failed: {url}")
-                log_scrape(product_id, "failed", f"No data returned for {url}")
+                metrics.products_failed.inc(reason=_failure_reason(name, driver._last_failure))
+                log_scrape(product_id, "failed", f"No data returned for {url}", proxy=rate_limiter.proxy_label(proxy),
+                           attempts=1 + retries)
                 failed.append(entry)
                 if progress_callback:
                     progress_callback(i, total, f"Failed: {product_id}")
             print("-" * 40)
 
             # Session rotation
-            if i % rotate_every == 0 and i < total:
+            if _rotation_due(driver_pool, driver, i, rotate_every) and i < total:
                 print(f"\n--- Rotating Chrome session (after {i} products) ---")
-                _cleanup_driver(driver)
-                time.sleep(3)
+                metrics.driver_restarts.inc()
+                _release_driver(driver_pool, driver)
+                if driver_pool is None:
+                    time.sleep(3)
                 if use_proxies:
                     proxy_idx = (proxy_idx + 1) % len(proxies)
                     proxy = proxies[proxy_idx]
                 ua = _random_ua() if use_ua_rotation else None
-                driver = create_driver(proxy=proxy, user_agent=ua)
+                driver = _acquire_driver(driver_pool, proxy=proxy, user_agent=ua)
+                if api is not None:
+                    api.close()
+                    api = _create_api_client(driver, proxy)
 
             # Delay between requests
-            if i < total:
+            if limiter is None and i < total:
                 delay = random.uniform(*delay_range)
                 time.sleep(delay)
 
-        if generate_pdf and all_products_data:
-            create_combo_pdf_report(all_products_data)
+        if generate_pdf and succeeded:
+            create_combo_pdf_report(pdf_products(succeeded))
 
-        print(f"\nDone: {len(all_products_data)} succeeded, {len(failed)} failed")
+        print(f"\nDone: {len(succeeded)} succeeded, {len(failed)} failed")
         if failed:
             print(f"Failed products: {failed}")
 
-        return len(all_products_data), failed
+        return len(succeeded), failed
 
     finally:
-        _cleanup_driver(driver)
+        if api is not None:
+            api.close()
+        _release_driver(driver_pool, driver)
+
 
+class _WorkQueue:
+    """Shared product queue for parallel workers.
 
-def _scrape_worker(worker_id, chunk, proxy, settings, counter, lock, total, progress_callback):
-    """Worker function for parallel scraping. Scrapes a chunk of products with one driver."""
+    Workers pull one product at a time instead of owning a fixed chunk. A failed
+    product goes back on the queue after a backoff delay and is handed to a
+    different worker when one is alive, and a worker that dies leaves its
+    remaining products for the others.
+
+    max_attempts: retries allowed per product; retries_left(entry), when given, sets
+    each product's own limit instead (e.g. what a resumed run has left of it).
+    """
+
+    def __init__(self, entries, worker_ids, max_attempts, retries_left=None):
+        self._cond = threading.Condition()
+        self._items = [{'entry': e, 'attempts': 0, 'avoid': None, 'ready_at': 0.0,
+                        'max_attempts': retries_left(e) if retries_left else max_attempts} for e in entries]
+        self._live = set(worker_ids)
+        self._outstanding = len(self._items)
+        self.max_attempts = max_attempts
+
+    def get(self, worker_id):
+        """Block for the next product this worker may take. Returns None when all work is resolved."""
+        with self._cond:
+            while self._outstanding:
+                now = time.monotonic()
+                others_alive = bool(self._live - {worker_id})
+                timeout = 1.0
+                for i, item in enumerate(self._items):
+                    if item['avoid'] == worker_id and others_alive:
+                        continue
+                    if item['ready_at'] > now:
+                        timeout = min(timeout, item['ready_at'] - now)
+                        continue
+                    return self._items.pop(i)
+                self._cond.wait(timeout)
+            return None
+
+    def done(self, item):
+        """Mark a product as finished (succeeded or skipped)."""
+        with self._cond:
+            self._outstanding -= 1
+            self._cond.notify_all()
+
+    def retry(self, item, worker_id):
+        """Put a failed product back for another worker. Returns False once its attempts are used up."""
+        with self._cond:
+            item['attempts'] += 1
+            if item['attempts'] > item['max_attempts']:
+                self._outstanding -= 1
+                self._cond.notify_all()
+                return False
+            item['avoid'] = worker_id
+            item['ready_at'] = time.monotonic() + RETRY_BACKOFF * (2 ** (item['attempts'] - 1))
+            self._items.append(item)
+            self._cond.notify_all()
+            return True
+
+    def requeue(self, item):
+        """Return a product a dying worker took but never finished, without using an attempt."""
+        with self._cond:
+            self._items.insert(0, item)
+            self._cond.notify_all()
+
+    def worker_exit(self, worker_id):
+        with self._cond:
+            self._live.discard(worker_id)
+            self._cond.notify_all()
+
+    def pending(self):
+        with self._cond:
+            return bool(self._outstanding)
+
+    def drain(self):
+        """Remove and return every product still queued (used once no workers are left)."""
+        with self._cond:
+            items, self._items = self._items, []
+            self._outstanding -= len(items)
+            return [item['entry'] for item in items]
+
+
+def _scrape_worker(worker_id, work, proxy, settings, counter, lock, total, progress_callback, driver_pool=None,
+                   limiter=None, pipeline=None):
+    """Worker function for parallel scraping. Pulls products from the shared queue with one driver.
+
+    pipeline: optional ParsePipeline — the worker then only fetches pages, and parsing
+    and storing the results happen in its parser processes and writer thread.
+    """
     use_ua_rotation = settings.get('ua_rotation_enabled', False)
     delay_range = tuple(settings.get('delay_between_requests', DELAY_BETWEEN_REQUESTS))
-    retry_attempts = settings.get('retry_attempts', RETRY_ATTEMPTS)
     rotate_every = settings.get('session_rotate_every', SESSION_ROTATE_EVERY)
     resume = settings.get('resume_enabled', False)
+    use_fast_path = settings.get('http_fast_path_enabled', False)
+    idle_window = settings.get('readiness_idle_window', READY_IDLE_WINDOW)
+
+    def progress(message, finished=True):
+        with lock:
+            if finished:
+                counter[0] += 1
+            if progress_callback:
+                progress_callback(counter[0], total, message)
+
+    def record(item, product_id, url, name, data, reason=None):
+        """Store a result, or requeue / fail the product. On the writer thread when pipelined.
+        reason: failure label for the metrics when no data came back.
+
+        A result that can't be stored uses an attempt like a page that returned no
+        data, so a product that always breaks the write fails instead of stopping workers.
+        """
+        entry = item['entry']
+        problem = f"No data returned for {url}"
+        if data and name and name != "Unknown Product":
+            try:
+                _store_success(product_id, name, data, f"[W{worker_id}] {name}{_readiness_note(data)}",
+                               proxy=proxy, attempts=item['attempts'] + 1)
+            except Exception as e:
+                problem, reason = f"Could not store {url}: {e}", 'store_error'
+            else:
+                succeeded.append(entry)
+                work.done(item)
+                progress(name)
+                return
+        if work.retry(item, worker_id):
+            metrics.retries.inc()
+            log_scrape(product_id, "retry", f"[W{worker_id}] {problem}; "
+                                            f"requeued (attempt {item['attempts']}/{item['max_attempts']})",
+                       proxy=rate_limiter.proxy_label(proxy), attempts=item['attempts'])
+        else:
+            failed.append(entry)
+            metrics.products_failed.inc(reason=_failure_reason(name, reason))
+            log_scrape(product_id, "failed", f"[W{worker_id}] {problem}",
+                       proxy=rate_limiter.proxy_label(proxy), attempts=item['attempts'])
+            progress(f"Failed: {product_id}")
+
+    def on_parsed(item, product_id, url, elapsed, result, error):
+        if error is not None:
+            print(f"  ✗ Parse error for {url}: {error}")
+        name, data = result if result else (None, None)
+        try:
+            if elapsed is not None:  # fast-path results were recorded already
+                metrics.fetch_seconds.observe(elapsed, proxy=key)
+                if limiter is not None:
+                    limiter.record(key, _page_outcome(name, data), elapsed)
+        finally:
+            # Always settle the product with the queue, or the workers wait for it forever
+            record(item, product_id, url, name, data, 'parse_error' if error is not None else None)
+
+    key = rate_limiter.proxy_label(proxy)
+    succeeded = []
+    failed = []
 
     ua = _random_ua() if use_ua_rotation else None
     try:
-        driver = create_driver(proxy=proxy, user_agent=ua)
+        driver = _acquire_driver(driver_pool, proxy=proxy, user_agent=ua)
     except Exception as e:
         log_scrape(None, "error", f"[W{worker_id}] Failed to create Chrome driver: {e}")
-        return [], [str(entry) for entry in chunk]
+        work.worker_exit(worker_id)
+        return [], []
+    api = _create_api_client(driver, proxy) if use_fast_path else None
 
-    succeeded = []
-    failed = []
+    item = None
+    scraped = 0
 
     try:
-        for local_i, entry in enumerate(chunk, 1):
+        while True:
+            item = work.get(worker_id)
+            if item is None:
+                break
+            entry = item['entry']
             product_id, url = normalize_product(entry)
             if product_id is None:
                 log_scrape(None, "skipped", f"[W{worker_id}] Could not parse: {entry}")
-                with lock:
-                    counter[0] += 1
-                    if progress_callback:
-                        progress_callback(counter[0], total, f"Skipped: {entry}")
+                work.done(item)
+                item = None
+                progress(f"Skipped: {entry}")
                 continue
 
             if resume and _already_scraped_today(product_id):
                 log_scrape(product_id, "skipped", f"[W{worker_id}] Already scraped today")
-                with lock:
-                    counter[0] += 1
-                    if progress_callback:
-                        progress_callback(counter[0], total, f"Skipped (already scraped): {product_id}")
+                work.done(item)
+                item = None
+                progress(f"Skipped (already scraped): {product_id}")
                 continue
 
-            with lock:
-                if progress_callback:
-                    progress_callback(counter[0], total, f"[W{worker_id}] Scraping {product_id}...")
-
-            name, data = scrape_with_retry(product_id, url, driver, retry_attempts=retry_attempts)
+            progress(f"[W{worker_id}] Scraping {product_id}...", finished=False)
+            _mark_in_flight(product_id)
 
-            if data and name:
-                update_data(product_id, name, data)
-                succeeded.append(entry)
-                log_scrape(product_id, "success", f"[W{worker_id}] {name}")
-                with lock:
-                    counter[0] += 1
-                    if progress_callback:
-                        progress_callback(counter[0], total, name)
+            # Retries go back through the queue so they can land on another proxy
+            if pipeline is None:
+                name, data = scrape_with_retry(product_id, url, driver, retry_attempts=0, api=api,
+                                               idle_window=idle_window, limiter=limiter, proxy=proxy)
+                # record() settles the product with the queue; from here it is no longer ours to requeue
+                taken, item = item, None
+                record(taken, product_id, url, name, data, driver._last_failure)
             else:
-                failed.append(entry)
-                log_scrape(product_id, "failed", f"[W{worker_id}] No data returned for {url}")
-                with lock:
-                    counter[0] += 1
-                    if progress_callback:
-                        progress_callback(counter[0], total, f"Failed: {product_id}")
+                name, data = _try_fast_path(product_id, api, limiter, key) if api is not None else (None, None)
+                if data and name:
+                    pipeline.submit_parsed((name, data), functools.partial(on_parsed, item, product_id, url, None))
+                else:
+                    if limiter is not None:
+                        limiter.wait(key)
+                    started = time.monotonic()
+                    raw = fetch_product_raw(product_id, url, driver, idle_window=idle_window)
+                    elapsed = time.monotonic() - started
+                    if raw is None:
+                        metrics.fetch_seconds.observe(elapsed, proxy=key)
+                        if limiter is not None:
+                            limiter.record(key, _page_outcome(None, None, driver._last_failure), elapsed)
+                        taken, item = item, None
+                        record(taken, product_id, url, None, None, driver._last_failure)
+                    else:
+                        pipeline.submit(raw, functools.partial(on_parsed, item, product_id, url, elapsed))
+            item = None
+            scraped += 1
 
             # Session rotation within worker
-            if local_i % rotate_every == 0 and local_i < len(chunk):
-                _cleanup_driver(driver)
-                time.sleep(3)
+            if _rotation_due(driver_pool, driver, scraped, rotate_every) and work.pending():
+                metrics.driver_restarts.inc()
+                _release_driver(driver_pool, driver)
+                driver = None
+                if driver_pool is None:
+                    time.sleep(3)
                 ua = _random_ua() if use_ua_rotation else None
-                driver = create_driver(proxy=proxy, user_agent=ua)
+                driver = _acquire_driver(driver_pool, proxy=proxy, user_agent=ua)
+                if api is not None:
+                    api.close()
+                    api = _create_api_client(driver, proxy)
 
-            if local_i < len(chunk):
+            if limiter is None and work.pending():
                 delay = random.uniform(*delay_range)
                 time.sleep(delay)
 
+    except Exception as e:
+        log_scrape(None, "error", f"[W{worker_id}] Worker stopped, remaining products go to other workers: {e}")
+
     finally:
-        _cleanup_driver(driver)
+        if item is not None:
+            work.requeue(item)
+        work.worker_exit(worker_id)
+        if api is not None:
+            api.close()
+        if driver is not None:
+            _release_driver(driver_pool, driver)
 
     return succeeded, failed
 
 
-def _run_parallel_scrape(products, proxies, settings, progress_callback=None, generate_pdf=True):
+def _run_parallel_scrape(products, proxies, settings, progress_callback=None, generate_pdf=True, driver_pool=None,
+                         limiter=None):
     """Run scrape in parallel with multiple Chrome instances. Returns (succeeded_count, failed_list)."""
     max_workers = settings.get('parallel_max_workers', 3)
     num_workers = min(max_workers, len(proxies), len(products))
     if num_workers < 2:
-        return _scrape_sequential(products, settings, proxies, progress_callback, generate_pdf)
+        return _scrape_sequential(products, settings, proxies, progress_callback, generate_pdf, driver_pool, limiter)
 
     total = len(products)
     print(f"Parallel scrape: {num_workers} workers, {total} products")
 
-    # Round-robin distribute products to workers
-    chunks = [[] for _ in range(num_workers)]
-    for i, product in enumerate(products):
-        chunks[i % num_workers].append(product)
+    retry_attempts = settings.get('retry_attempts', RETRY_ATTEMPTS)
+
+    def retries_left(entry):
+        return _retries_left(normalize_product(entry)[0], retry_attempts)
+
+    work = _WorkQueue(products, range(num_workers), retry_attempts, retries_left)
 
     # Assign proxies to workers (cycle if fewer proxies than workers)
     worker_proxies = [proxies[i % len(proxies)] for i in range(num_workers)]
@@ -1515,36 +2721,46 @@ def _run_parallel_scrape(products, proxies, settings, progress_callback=None, ge
     all_succeeded = []
     all_failed = []
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=num_workers) as executor:
-        futures = []
-        for worker_id in range(num_workers):
-            f = executor.submit(
-                _scrape_worker, worker_id, chunks[worker_id],
-                worker_proxies[worker_id], settings, counter, lock,
-                total, progress_callback
-            )
-            futures.append(f)
-
-        for f in concurrent.futures.as_completed(futures):
-            succeeded, failed = f.result()
-            all_succeeded.extend(succeeded)
-            all_failed.extend(failed)
+    pipeline = None
+    if settings.get('parse_pipeline_enabled'):
+        pipeline = ParsePipeline(parse_product_raw, processes=settings.get('parse_processes') or None)
+        print(f"Parsing in {pipeline.processes} processes")
+
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=num_workers) as executor:
+            futures = []
+            for worker_id in range(num_workers):
+                f = executor.submit(
+                    _scrape_worker, worker_id, work,
+                    worker_proxies[worker_id], settings, counter, lock,
+                    total, progress_callback, driver_pool, limiter, pipeline
+                )
+                futures.append(f)
+
+            results = [f.result() for f in concurrent.futures.as_completed(futures)]
+    finally:
+        if pipeline is not None:
+            pipeline.close()
+
+    # Read only now: with a pipeline, the writer thread keeps adding to each worker's
+    # lists until close() has written the last parsed page
+    for succeeded, failed in results:
+        all_succeeded.extend(succeeded)
+        all_failed.extend(failed)
+
+    # Only left over if every worker died
+    stranded = work.drain()
+    if stranded:
+        log_scrape(None, "error", f"No workers left; {len(stranded)} products not scraped")
+        metrics.products_failed.inc(len(stranded), reason='no_worker')
+        all_failed.extend(stranded)
+
+    if _result_writer is not None:
+        _result_writer.flush()
 
     if generate_pdf:
-        # Regenerate PDF from DB since parallel workers stored data directly
-        all_data = get_all_latest_from_db()
-        if all_data:
-            pdf_data = []
-            for p in all_data:
-                history = get_product_history(p['product_id'])
-                if history is not None and not history.empty:
-                    pdf_data.append({
-                        'name': _sanitize_for_pdf(p['product_name']),
-                        'latest': history.iloc[-1].to_dict(),
-                        'history': history
-                    })
-            if pdf_data:
-                create_combo_pdf_report(pdf_data)
+        # Build the PDF from the DB since parallel workers stored data directly
+        create_combo_pdf_report(pdf_products())
 
     print(f"\nDone: {len(all_succeeded)} succeeded, {len(all_failed)} failed")
     if all_failed:
@@ -1553,37 +2769,212 @@ def _run_parallel_scrape(products, proxies, settings, progress_callback=None, ge
     return len(all_succeeded), all_failed
 
 
-def run_scrape(progress_callback=None, generate_pdf=True):
+def _begin_run(products, settings, resume_run=None, resumable=True):
+    """Open the run checkpoint. Returns (checkpoint, entries to scrape).
+
+    resume_run: id of a run to resume. Otherwise, when resumable (the products come from
+    products.txt) and checkpoint resume is enabled, an unfinished run started today is
+    resumed; anything else starts a new run with a snapshot of products, or with priority
+    scheduling, of the products that are due (see priority.py).
+    """
+    max_attempts = 1 + settings.get('retry_attempts', RETRY_ATTEMPTS)
+    if resume_run is None and resumable and settings.get('checkpoint_resume_enabled', True):
+        run = scrape_runs.unfinished_run(_db_path(), datetime.now().strftime('%Y-%m-%d'))
+        resume_run = run['id'] if run is not None else None
+    resumed = scrape_runs.resume_run(_db_path(), resume_run, max_attempts) if resume_run is not None else None
+    if resumed is None:
+        entries = [(e, normalize_product(e)[0]) for e in products]
+        if resumable and settings.get('priority_scheduling_enabled'):
+            products = _due_products(entries, settings)
+            entries = [(e, normalize_product(e)[0]) for e in products]
+        return scrape_runs.start_run(_db_path(), entries), products
+    checkpoint, entries, exhausted = resumed
+    print(f"Resuming run {checkpoint.run_id}: {len(entries)} products left"
+          + (f", {exhausted} out of retries" if exhausted else ""))
+    return checkpoint, entries
+
+
+def _priority_plan_args(settings):
+    return (settings.get('scrape_budget_per_day', 0), settings.get('priority_min_interval_hours', 4),
+            settings.get('priority_max_interval_hours', 168))
+
+
+def _due_products(entries, settings):
+    """The products.txt entries priority scheduling says to scrape now."""
+    due, rows = priority.due_products(_db_path(), entries, *_priority_plan_args(settings))
+    spent = priority.page_loads_today(_db_path())
+    unparsed = sum(1 for _, pid in entries if pid is None)
+    print(f"Priority scheduling: {len(due) - unparsed} of {len(rows)} products due "
+          f"({spent} of {settings.get('scrape_budget_per_day') or len(rows)} page loads used today)")
+    return due
+
+
+def print_priorities():
+    """Print every tracked product's priority score, refresh interval and next due time."""
+    import settings as app_settings
+
+    s = app_settings.load_settings()
+    ids = [pid for pid in (normalize_product(e)[0] for e in load_products()) if pid]
+    rows = priority.plan(_db_path(), ids, *_priority_plan_args(s))
+    names = {p['product_id']: p['product_name'] for p in get_all_latest_from_db()}
+    print(f"{'product':<10} {'score':>7} {'every':>8} {'last scraped':<20} {'next due':<20} name")
+    for r in rows:
+        score = f"{r['score']:.2f}" if r['score'] is not None else 'new'
+        print(f"{r['product_id']:<10} {score:>7} {r['interval_hours']:>7.1f}h {(r['last_scraped_at'] or '-')[:19]:<20} "
+              f"{r['next_due_at'][:19]:<20} {names.get(r['product_id'], '')}")
+    per_day = sum(24 / r['interval_hours'] for r in rows)
+    print(f"\n{len(rows)} products, about {per_day:.0f} scrapes a day")
+
+
+def _chrome_count(settings, proxies, total):
+    """Chrome drivers the chosen engine runs at once: one per async browser or parallel worker."""
+    if settings.get('async_engine_enabled'):
+        tabs_per_proxy = max(1, int(settings.get('async_tabs_per_proxy', 4)))
+        browsers = len(proxies) if settings.get('proxies_enabled') and proxies else 1
+        return max(1, min(browsers, -(-total // tabs_per_proxy)))
+    if settings.get('parallel_enabled') and proxies and total > 1:
+        return max(1, min(settings.get('parallel_max_workers', 3), len(proxies), total))
+    return 1
+
+
+def _end_run(status):
+    """Close the current run checkpoint, if any."""
+    global _run_checkpoint
+    if _run_checkpoint is not None:
+        checkpoint, _run_checkpoint = _run_checkpoint, None
+        status = checkpoint.finish(status)
+        print(f"Run {checkpoint.run_id} {status}")
+
+
+def run_scrape(progress_callback=None, generate_pdf=True, driver_pool=None, limiter=None,
+               products=None, proxies=None, settings_overrides=None, resume_run=None):
     """Run the full scrape pipeline. Returns (succeeded_count, failed_list).
 
     progress_callback: optional callable(current, total, product_name) for live status updates.
     generate_pdf: if True, generate the PDF report after scraping.
+    driver_pool: optional DriverPool to lease Chrome drivers from instead of booting new ones.
+    limiter: optional AdaptiveRateLimiter to pace requests with (one is created for the run if
+    adaptive pacing is enabled and none is given).
+    products / proxies: use these instead of products.txt / proxies.txt.
+    settings_overrides: settings to apply on top of settings.json for this run only.
+    resume_run: id of an unfinished run (see scrape_runs.py) to finish instead of starting a new one.
     """
     import settings as app_settings
 
+    global _run_checkpoint
     init_db()
     if not check_chrome_installed():
         return 0, []
-    products = load_products()
+    s = app_settings.load_settings()
+    s.update(settings_overrides or {})
+    resumable = products is None
+    if products is None:
+        products = load_products()
+    _run_checkpoint, products = _begin_run(products, s, resume_run, resumable)
+    if resumable and s.get('priority_scheduling_enabled'):
+        # Due products are meant to be scraped again even if they were scraped earlier today
+        s['resume_enabled'] = False
     total = len(products)
     print(f"Loaded {total} products")
-    log_scrape(None, "start", f"Scrape started: {total} products")
+    log_scrape(None, "start", f"Scrape started: {total} products (run {_run_checkpoint.run_id})")
+    metrics.scrape_runs.inc()
+    network_stats.reset()
+    stage_timings.reset()
 
     if total == 0:
         print("No products to scrape.")
+        _end_run(scrape_runs.FINISHED)
         log_scrape(None, "end", "No products to scrape")
         return 0, []
 
-    s = app_settings.load_settings()
-    proxies = app_settings.load_proxies() if s.get('proxies_enabled') else []
+    if proxies is None:
+        proxies = app_settings.load_proxies() if s.get('proxies_enabled') else []
+    configure_endpoints(s.get('site_base_url'), s.get('search_api_base_url'), s.get('sales_api_base_url'))
+    global RECORD_DIR
+    RECORD_DIR = s.get('record_dir') or None
+
+    if driver_pool is not None:
+        driver_pool.configure(
+            max_requests=s.get('session_rotate_every', SESSION_ROTATE_EVERY),
+            max_age=s.get('driver_max_age_minutes', 30) * 60,
+            spares=s.get('driver_pool_spares', 1),
+            user_agent_fn=_random_ua if s.get('ua_rotation_enabled') else None,
+            max_drivers=_chrome_count(s, proxies, total) + s.get('driver_pool_spares', 1),
+        )
 
-    # Use parallel if enabled and we have proxies
-    if s.get('parallel_enabled') and proxies and total > 1:
-        succeeded, failed = _run_parallel_scrape(products, proxies, s, progress_callback, generate_pdf)
+    if s.get('adaptive_rate_enabled'):
+        limiter = limiter or rate_limiter.AdaptiveRateLimiter()
+        limiter.configure(
+            max_rate=s.get('rate_max_per_proxy_per_min', 30) / 60,
+            global_max_rate=s.get('rate_max_global_per_min', 180) / 60,
+            initial_delay=sum(s.get('delay_between_requests', DELAY_BETWEEN_REQUESTS)) / 2,
+        )
     else:
-        succeeded, failed = _scrape_sequential(products, s, proxies, progress_callback, generate_pdf)
-
-    log_scrape(None, "end", f"Scrape finished: {succeeded} succeeded, {len(failed)} failed")
+        limiter = None
+
+    # Drop products already scraped today up front, so totals and progress count only the remaining work
+    global _scraped_today
+    _scraped_today = scraped_today_ids() if s.get('resume_enabled', False) else None
+    if _scraped_today:
+        ids = [normalize_product(e)[0] for e in products]
+        done = [pid for pid in ids if pid in _scraped_today]
+        products = [e for e, pid in zip(products, ids) if pid not in _scraped_today]
+        skipped, total = total - len(products), len(products)
+        if skipped:
+            print(f"Resuming: {skipped} products already scraped today, {total} left")
+            log_scrape(None, "skipped", f"Resume: {skipped} products already scraped today")
+            _run_checkpoint.mark_skipped(done, "Already scraped today")
+        if total == 0:
+            _scraped_today = None
+            _end_run(scrape_runs.FINISHED)
+            log_scrape(None, "end", "All products already scraped today")
+            return 0, []
+
+    use_async = s.get('async_engine_enabled')
+    use_parallel = s.get('parallel_enabled') and proxies and total > 1
+    global _result_writer
+    if s.get('batched_writes_enabled') and (use_async or use_parallel):
+        _result_writer = ResultWriter(_db_path(), _batch_writer(), batch_size=s.get('write_batch_size', 50),
+                                      flush_seconds=s.get('write_flush_seconds', 1.0))
+    completed = False
+    lost = []
+    try:
+        if use_async:
+            import async_engine
+            succeeded, failed = async_engine.run_async_scrape(products, proxies, s, progress_callback, driver_pool,
+                                                              limiter)
+            if _result_writer is not None:
+                _result_writer.flush()
+            if generate_pdf:
+                generate_pdf_from_db()
+        # Use parallel if enabled and we have proxies
+        elif use_parallel:
+            succeeded, failed = _run_parallel_scrape(products, proxies, s, progress_callback, generate_pdf,
+                                                     driver_pool, limiter)
+        else:
+            succeeded, failed = _scrape_sequential(products, s, proxies, progress_callback, generate_pdf,
+                                                   driver_pool, limiter)
+        completed = True
+    finally:
+        if _result_writer is not None:
+            writer, _result_writer = _result_writer, None
+            writer.close()
+            print(f"Writer: {writer.rows_written} rows in {writer.batches} batches"
+                  + (f", {len(writer.dropped)} dropped" if writer.dropped else ""))
+            lost = _fail_dropped_products(writer, products)
+        _scraped_today = None
+        # After the writer has committed every queued item update
+        _end_run(scrape_runs.FINISHED if completed else scrape_runs.INTERRUPTED)
+
+    if lost:
+        print(f"{len(lost)} scraped products could not be stored: {lost}")
+        succeeded -= len(lost)
+        failed = failed + lost
+    report = network_stats.summary()
+    print(f"Network: {report}")
+    if stage_timings.products:
+        print(f"Stage timings ({stage_timings.products} products):\n{stage_timings.table()}")
+    log_scrape(None, "end", f"Scrape finished: {succeeded} succeeded, {len(failed)} failed; network: {report}")
     return succeeded, failed
 
 
@@ -1592,6 +2983,12 @@ if __name__ == '__main__':
     parser.add_argument('--serve', action='store_true', help='Start the web interface')
     parser.add_argument('--port', type=int, default=5000, help='Port for the web interface (default: 5000)')
     parser.add_argument('--pdf', action='store_true', help='Generate PDF from existing DB data without scraping')
+    parser.add_argument('--rebuild-latest', action='store_true',
+                        help='Recompute the latest-price table from the full price history')
+    parser.add_argument('--explain', action='store_true',
+                        help='Print the SQLite query plan of every query the app runs')
+    parser.add_argument('--priorities', action='store_true',
+                        help="Print each product's priority score and refresh interval")
     args = parser.parse_args()
 
     init_db()
@@ -1604,5 +3001,13 @@ if __name__ == '__main__':
         result = generate_pdf_from_db()
         if not result:
             print("No data in database. Run a scrape first.")
+    elif args.rebuild_latest:
+        rebuild_latest_price()
+    elif args.explain:
+        import catalog
+        catalog.init_catalog_db()
+        explain_query_plans()
+    elif args.priorities:
+        print_priorities()
     else:
         run_scrape()
@@ -4,6 +4,7 @@ import os
 _base_dir = os.path.dirname(os.path.abspath(__file__))
 SETTINGS_FILE = 'settings.json'
 PROXIES_FILE = 'proxies.txt'
+DRIVER_CACHE_FILE = 'chromedriver_cache.json'
 
 DEFAULTS = {
     "proxies_enabled": False,
@@ -11,10 +12,50 @@ DEFAULTS = {
     "parallel_max_workers": 3,
     "ua_rotation_enabled": True,
     "resume_enabled": True,
+    "checkpoint_resume_enabled": True,
+    "priority_scheduling_enabled": False,
+    # Page loads a day shared out by priority scheduling; 0 means one per tracked product
+    "scrape_budget_per_day": 0,
+    "priority_min_interval_hours": 4,
+    "priority_max_interval_hours": 168,
     "delay_between_requests": [2, 4],
     "retry_attempts": 2,
     "session_rotate_every": 50,
     "chrome_binary_path": "",
+    "http_fast_path_enabled": False,
+    "driver_pool_spares": 1,
+    "driver_max_age_minutes": 30,
+    "readiness_idle_window": 0.5,
+    "adaptive_rate_enabled": False,
+    "rate_max_per_proxy_per_min": 30,
+    "rate_max_global_per_min": 180,
+    "parse_pipeline_enabled": False,
+    "parse_processes": 0,
+    "batched_writes_enabled": False,
+    "write_batch_size": 50,
+    "write_flush_seconds": 1.0,
+    # Empty means the live site; set to a replay server URL to scrape offline (see replay.py)
+    "site_base_url": "",
+    "search_api_base_url": "",
+    "sales_api_base_url": "",
+    "record_dir": "",
+    "async_engine_enabled": False,
+    "async_tabs_per_proxy": 4,
+    "async_global_concurrency": 20,
+    "block_resources_enabled": False,
+    "blocked_url_patterns": [
+        # Images, fonts and media — only the price-guide HTML and two XHRs are used
+        "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico",
+        "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+        "*.mp4", "*.webm", "*.mp3", "*.m4a",
+        # Third-party analytics, ads and session recording
+        "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+        "*googlesyndication.com*", "*facebook.net*", "*facebook.com/tr*",
+        "*hotjar.com*", "*clarity.ms*", "*segment.com*", "*segment.io*",
+        "*bat.bing.com*", "*analytics.tiktok.com*", "*ct.pinterest.com*",
+        "*nr-data.net*", "*js-agent.newrelic.com*", "*adsrvr.org*", "*criteo.com*",
+        "*scorecardresearch.com*", "*quantserve.com*",
+    ],
 }
 
 
@@ -26,6 +67,10 @@ def _proxies_path():
     return os.path.join(_base_dir, PROXIES_FILE)
 
 
+def _driver_cache_path():
+    return os.path.join(_base_dir, DRIVER_CACHE_FILE)
+
+
 def load_settings():
     """Load settings from settings.json, merged with defaults for missing keys."""
     settings = dict(DEFAULTS)
@@ -97,3 +142,22 @@ def load_proxies_raw():
         return ""
     with open(path, 'r') as f:
         return f.read()
+
+
+def load_driver_cache():
+    """Load the resolved chromedriver paths, keyed by Chrome version."""
+    path = _driver_cache_path()
+    if not os.path.isfile(path):
+        return {}
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (json.JSONDecodeError, IOError):
+        return {}
+
+
+def save_driver_cache(data):
+    """Save the chromedriver path cache to chromedriver_cache.json."""
+    path = _driver_cache_path()
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
@@ -0,0 +1,10 @@
+import pytest
+
+import scraperpdf
+
+
+@pytest.fixture
+def scraper_db(tmp_path, monkeypatch):
+    """Point scraperpdf at a fresh database file in tmp_path. Returns its path."""
+    monkeypatch.setattr(scraperpdf, '_BASE_DIR', str(tmp_path))
+    return scraperpdf._db_path()
@@ -0,0 +1,152 @@
+"""init_db upgrading a database created by the original schema (PRAGMA user_version 0)."""
+
+import json
+import sqlite3
+
+import pytest
+
+import db
+import scraperpdf
+
+BASELINE_SCHEMA = '''
+CREATE TABLE price_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    product_id TEXT NOT NULL,
+    product_name TEXT NOT NULL,
+    date TEXT NOT NULL,
+    market_price TEXT,
+    most_recent_sale TEXT,
+    listed_median TEXT,
+    current_quantity TEXT,
+    current_sellers TEXT,
+    sold_yesterday TEXT,
+    total_sold TEXT,
+    recent_sales TEXT,
+    top_listings TEXT,
+    price_change REAL DEFAULT 0.0,
+    quantity_change REAL DEFAULT 0.0,
+    daily_sales REAL DEFAULT 0.0
+);
+CREATE INDEX idx_product_id ON price_history(product_id);
+CREATE TABLE scrape_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    product_id TEXT,
+    status TEXT NOT NULL,
+    message TEXT
+);
+'''
+
+
+def sale(sold_at, price):
+    return {'date': sold_at, 'condition': 'Near Mint', 'price': f'${price:.2f}', 'qty': 1}
+
+
+def listing(price):
+    return {'price': f'${price:.2f}', 'qty': 2, 'condition': 'Near Mint', 'seller': 'S', 'verified': True,
+            'direct': False}
+
+
+# (product_id, date, market_price, current_quantity, total_sold, recent_sales, top_listings, daily_sales)
+BASELINE_ROWS = [
+    ('1', '2026-10-01', '$10.00', '5', '100', [sale('2026-09-30T10:00:00', 9)], [listing(11)], 0.0),
+    ('1', '2026-10-02', '$11.00', '4', '101', [sale('2026-09-30T10:00:00', 9), sale('2026-10-02T08:00:00', 12)],
+     [listing(12)], 1.0),
+    # Scraped again the same day: the migration keeps this row
+    ('1', '2026-10-02', '$12.00', '3', '102',
+     [sale('2026-09-30T10:00:00', 9), sale('2026-10-02T08:00:00', 12), sale('2026-10-02T09:00:00', 13)],
+     [listing(13), listing(14)], 2.0),
+    # Older versions stored numpy int64 changes as 8-byte blobs
+    ('2', '2026-10-01', 'N/A', '7', '5', [], [], (3).to_bytes(8, 'little', signed=True)),
+]
+
+
+@pytest.fixture
+def migrated(scraper_db):
+    conn = sqlite3.connect(scraper_db)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.executemany(
+        '''INSERT INTO price_history (product_id, product_name, date, market_price, most_recent_sale, listed_median,
+               current_quantity, current_sellers, sold_yesterday, total_sold, recent_sales, top_listings,
+               daily_sales)
+           VALUES (?, 'Box', ?, ?, '$1.00', '$1.00', ?, '2', '1', ?, ?, ?, ?)''',
+        [(pid, date, price, qty, sold, json.dumps(sales), json.dumps(listings), daily)
+         for pid, date, price, qty, sold, sales, listings, daily in BASELINE_ROWS])
+    conn.execute("INSERT INTO scrape_log (timestamp, status, message) VALUES ('2026-10-01T00:00:00', 'start', '')")
+    conn.commit()
+    conn.close()
+    scraperpdf.init_db()
+    return db.connect(scraper_db)
+
+
+def history(conn):
+    return {r['id']: dict(r) for r in conn.execute('SELECT * FROM price_history ORDER BY id')}
+
+
+def test_all_migrations_run(migrated):
+    assert migrated.execute('PRAGMA user_version').fetchone()[0] == scraperpdf._MIGRATIONS[-1][0]
+
+
+def test_numeric_columns_are_backfilled(migrated):
+    rows = history(migrated)
+    assert rows[3]['market_price_num'] == 12.0
+    assert rows[3]['current_quantity_num'] == 3
+    assert rows[3]['total_sold_num'] == 102
+    assert rows[4]['market_price_num'] is None
+    assert rows[4]['daily_sales'] == 3.0
+
+
+def test_sales_and_listings_move_to_their_tables(migrated):
+    rows = history(migrated)
+    assert all(r['recent_sales'] is None and r['top_listings'] is None for r in rows.values())
+    sales = {r['price']: (r['first_history_id'], r['last_history_id'])
+             for r in migrated.execute("SELECT * FROM sale WHERE product_id = '1'")}
+    # The sale first seen in the dropped same-day row now starts at the kept row
+    assert sales == {9.0: (1, 3), 12.0: (3, 3), 13.0: (3, 3)}
+    listings = [(r['history_id'], r['price']) for r in
+                migrated.execute('SELECT history_id, price FROM listing ORDER BY history_id, position')]
+    assert listings == [(1, 11.0), (3, 13.0), (3, 14.0)]
+    assert rows[3]['lowest_ask'] == 13.0
+
+
+def test_same_day_rows_are_deduped_and_changes_recomputed(migrated):
+    rows = history(migrated)
+    assert sorted(rows) == [1, 3, 4]
+    assert (rows[3]['price_change'], rows[3]['quantity_change'], rows[3]['daily_sales']) == (2.0, -2.0, 2.0)
+
+
+def test_latest_price_points_at_the_kept_rows(migrated):
+    latest = dict(migrated.execute('SELECT product_id, history_id FROM latest_price').fetchall())
+    assert latest == {'1': 3, '2': 4}
+
+
+def test_scrape_log_gains_the_detail_columns(migrated):
+    columns = {r['name'] for r in migrated.execute('PRAGMA table_info(scrape_log)')}
+    assert {'proxy', 'attempts', 'sales_source', 'timings'} <= columns
+
+
+def test_init_db_again_changes_nothing(migrated):
+    before = history(migrated)
+    scraperpdf.init_db()
+    assert history(migrated) == before
+
+
+def test_same_day_scrape_replaces_the_days_row(migrated):
+    data = {'Date': '2026-10-02', 'Market Price': '$15.00', 'Most Recent Sale': '$15.00', 'Listed Median': '$16.00',
+            'Current Quantity': '2', 'Current Sellers': '2', 'Sold Yesterday': '1', 'Total Sold': '104',
+            'Recent Sales': json.dumps([sale('2026-10-02T09:00:00', 13)]), 'Top Listings': '[]'}
+    assert scraperpdf.update_data('1', 'Box', data)
+    rows = history(migrated)
+    assert sorted(rows) == [1, 3, 4]
+    # Changes are still measured against the previous day
+    assert (rows[3]['market_price_num'], rows[3]['price_change'], rows[3]['daily_sales']) == (15.0, 5.0, 4.0)
+    listings = migrated.execute('SELECT COUNT(*) FROM listing WHERE history_id = 3').fetchone()[0]
+    assert listings == 0
+    recent = migrated.execute(scraperpdf._RECENT_SALES_SELECT, ('1', 3, 3)).fetchall()
+    assert [r['price_text'] for r in recent] == ['$13.00']
+
+
+def test_unique_product_date_index_is_enforced(migrated):
+    with pytest.raises(sqlite3.IntegrityError):
+        migrated.execute("INSERT INTO price_history (product_id, product_name, date) VALUES ('1', 'Box', '2026-10-01')")
+    migrated.rollback()
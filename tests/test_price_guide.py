@@ -0,0 +1,29 @@
+import glob
+import os
+
+import pytest
+
+import price_guide
+
+FIXTURE_PAGES = sorted(glob.glob(os.path.join(os.path.dirname(__file__), '..', 'fixtures', 'replay', '*', 'page.html')))
+
+
+@pytest.fixture(params=FIXTURE_PAGES, ids=lambda path: os.path.basename(os.path.dirname(path)))
+def page(request):
+    with open(request.param, encoding='utf-8') as f:
+        return f.read()
+
+
+def test_fixtures_are_present():
+    assert FIXTURE_PAGES
+
+
+def test_targeted_parse_matches_full_parse(page):
+    name, fields = price_guide.parse_html(page)
+    assert name
+    assert fields['Market Price'] != 'N/A'
+    assert price_guide.parse_targeted(page) == (name, fields)
+
+
+def test_fragments_parse_like_the_page_they_came_from(page):
+    assert price_guide.parse_fragments(price_guide.extract_fragments(page)) == price_guide.parse_html(page)
@@ -0,0 +1,60 @@
+import pytest
+
+import db
+import priority
+import scraperpdf
+
+
+def daily_rates(intervals):
+    return {pid: 24 / hours for pid, hours in intervals.items()}
+
+
+def test_budget_is_shared_in_proportion_to_score():
+    intervals = priority.allocate_intervals({'a': 1, 'b': 3}, budget_per_day=4, min_hours=1, max_hours=1000)
+    assert intervals == pytest.approx({'a': 24, 'b': 8})
+    assert sum(daily_rates(intervals).values()) == pytest.approx(4)
+
+
+def test_products_held_at_the_shortest_interval_give_back_their_share():
+    intervals = priority.allocate_intervals({'a': 100, 'b': 1, 'c': 1}, budget_per_day=10, min_hours=4,
+                                            max_hours=1000)
+    assert intervals == pytest.approx({'a': 4, 'b': 12, 'c': 12})
+    assert sum(daily_rates(intervals).values()) == pytest.approx(10)
+
+
+def test_products_held_at_the_longest_interval_take_their_share_first():
+    intervals = priority.allocate_intervals({'a': 1, 'b': 1000}, budget_per_day=10, min_hours=1, max_hours=48)
+    assert intervals == pytest.approx({'a': 48, 'b': 24 / 9.5})
+    assert sum(daily_rates(intervals).values()) == pytest.approx(10)
+
+
+def test_a_budget_larger_than_every_product_can_use_is_left_over():
+    intervals = priority.allocate_intervals({'a': 1, 'b': 2}, budget_per_day=100, min_hours=4, max_hours=168)
+    assert intervals == pytest.approx({'a': 4, 'b': 4})
+
+
+def test_equal_zero_scores_split_the_budget_evenly():
+    intervals = priority.allocate_intervals({'a': 0, 'b': 0}, budget_per_day=4, min_hours=1, max_hours=1000)
+    assert intervals == pytest.approx({'a': 12, 'b': 12})
+
+
+def test_score_needs_a_price_and_grows_with_activity():
+    assert priority.product_score(None, 5, 1, 1) is None
+    quiet = priority.product_score(50, 10, 0, 0)
+    assert priority.product_score(50, 10, 2, 0) > quiet
+    assert priority.product_score(50, 10, 0, 3) > quiet
+    assert priority.product_score(500, 10, 0, 0) > quiet
+
+
+def test_plan_does_not_write_and_due_products_does(scraper_db):
+    scraperpdf.init_db()
+    scraperpdf.update_data('1', 'Box', {'Date': '2026-10-01', 'Market Price': '$10.00', 'Most Recent Sale': '$10.00',
+                                        'Listed Median': '$10.00', 'Current Quantity': '4', 'Current Sellers': '2',
+                                        'Sold Yesterday': '1', 'Total Sold': '10'})
+    conn = db.connect(scraper_db)
+    rows = priority.plan(scraper_db, ['1', '2'])
+    assert [r['product_id'] for r in rows] == ['2', '1']  # new products are due first
+    assert conn.execute('SELECT COUNT(*) FROM product_schedule WHERE score IS NOT NULL').fetchone()[0] == 0
+    due, _ = priority.due_products(scraper_db, [('1', '1'), ('2', '2')])
+    assert '2' in due
+    assert conn.execute('SELECT COUNT(*) FROM product_schedule WHERE score IS NOT NULL').fetchone()[0] == 1
@@ -0,0 +1,72 @@
+import time
+
+import pytest
+
+import rate_limiter
+from rate_limiter import AdaptiveRateLimiter
+
+
+@pytest.fixture(autouse=True)
+def no_jitter(monkeypatch):
+    monkeypatch.setattr(rate_limiter, 'JITTER', (1.0, 1.0))
+
+
+def rate(limiter, key):
+    return limiter.stats()['proxies'][key]['per_min'] / 60
+
+
+def test_starts_at_the_initial_delay_within_the_ceiling():
+    assert AdaptiveRateLimiter(max_rate=1.0, initial_delay=4).initial_rate == 0.25
+    assert AdaptiveRateLimiter(max_rate=0.1, initial_delay=1).initial_rate == 0.1
+
+
+def test_quick_successes_raise_the_rate_up_to_the_ceiling():
+    limiter = AdaptiveRateLimiter(max_rate=0.3, initial_delay=4, increase=0.02)
+    limiter.record('p', rate_limiter.OK, elapsed=1)
+    assert rate(limiter, 'p') == pytest.approx(0.27)
+    for _ in range(10):
+        limiter.record('p', rate_limiter.OK, elapsed=1)
+    assert rate(limiter, 'p') == pytest.approx(0.3)
+
+
+def test_slow_successes_and_failures_leave_the_rate_alone():
+    limiter = AdaptiveRateLimiter(max_rate=1.0, initial_delay=4, slow_seconds=20)
+    limiter.record('p', rate_limiter.OK, elapsed=25)
+    limiter.record('p', rate_limiter.FAILED, elapsed=1)
+    assert rate(limiter, 'p') == pytest.approx(0.25)
+
+
+def test_throttling_halves_proxy_and_global_rates_down_to_the_floor():
+    limiter = AdaptiveRateLimiter(max_rate=1.0, global_max_rate=2.0, min_rate=0.1, initial_delay=2)
+    limiter.record('p', rate_limiter.THROTTLED)
+    stats = limiter.stats()
+    assert stats['proxies']['p']['per_min'] == pytest.approx(15)
+    assert stats['proxies']['p']['throttled'] == 1
+    assert stats['global_per_min'] == pytest.approx(60)
+    for _ in range(5):
+        limiter.record('p', rate_limiter.THROTTLED)
+    assert rate(limiter, 'p') == pytest.approx(0.1)
+
+
+def test_throttling_holds_the_proxy_off_for_an_interval():
+    limiter = AdaptiveRateLimiter(max_rate=1.0, initial_delay=1)
+    limiter.record('p', rate_limiter.THROTTLED)
+    assert limiter.reserve('p') == pytest.approx(2.0, abs=0.05)
+
+
+def test_requests_are_spaced_per_proxy_and_overall():
+    limiter = AdaptiveRateLimiter(max_rate=1.0, global_max_rate=4.0, initial_delay=2)
+    assert limiter.reserve('a') == pytest.approx(0, abs=0.05)
+    # Another proxy only waits for the global bucket, the same proxy for its own
+    assert limiter.reserve('b') == pytest.approx(0.25, abs=0.05)
+    assert limiter.reserve('a') == pytest.approx(2.0, abs=0.05)
+
+
+def test_configure_resets_the_buckets():
+    limiter = AdaptiveRateLimiter(max_rate=1.0, initial_delay=2)
+    limiter.record('p', rate_limiter.THROTTLED)
+    limiter.configure(max_rate=1.0, global_max_rate=3.0, initial_delay=2)
+    started = time.monotonic()
+    assert limiter.reserve('p') == pytest.approx(0, abs=0.05)
+    assert rate(limiter, 'p') == pytest.approx(0.5)
+    assert time.monotonic() - started < 1
@@ -0,0 +1,62 @@
+import pytest
+
+import db
+import metrics
+from result_writer import ResultWriter
+
+
+def write_batch(conn, items):
+    for kind, args in items:
+        if args[0] == 'bad':
+            raise ValueError('bad row')
+        conn.execute('INSERT INTO t (kind, value) VALUES (?, ?)', (kind, args[0]))
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'writer.db')
+    with db.transaction(path) as conn:
+        conn.execute('CREATE TABLE t (kind TEXT, value TEXT)')
+    return path
+
+
+def stored(path):
+    return [tuple(r) for r in db.connect(path).execute('SELECT kind, value FROM t ORDER BY rowid')]
+
+
+def test_commits_full_batches(db_path):
+    writer = ResultWriter(db_path, write_batch, batch_size=2, flush_seconds=60)
+    for value in 'abcd':
+        writer.put('log', value)
+    writer.flush()
+    assert stored(db_path) == [('log', 'a'), ('log', 'b'), ('log', 'c'), ('log', 'd')]
+    writer.close()
+    assert (writer.rows_written, writer.batches) == (4, 2)
+
+
+def test_commits_a_partial_batch_after_flush_seconds(db_path):
+    writer = ResultWriter(db_path, write_batch, batch_size=50, flush_seconds=0.05)
+    writer.put('log', 'a')
+    writer.flush()
+    assert stored(db_path) == [('log', 'a')]
+    writer.close()
+
+
+def test_close_commits_what_is_queued(db_path):
+    writer = ResultWriter(db_path, write_batch, batch_size=50, flush_seconds=60)
+    writer.put('log', 'a')
+    writer.close()
+    assert stored(db_path) == [('log', 'a')]
+
+
+def test_failed_batch_falls_back_to_rows_and_reports_the_dropped_one(db_path):
+    before = metrics.db_rows_dropped._values.get(('product',), 0)
+    writer = ResultWriter(db_path, write_batch, batch_size=3, flush_seconds=60)
+    writer.put('product', 'a')
+    writer.put('product', 'bad')
+    writer.put('log', 'c')
+    writer.close()
+    assert stored(db_path) == [('product', 'a'), ('log', 'c')]
+    assert writer.dropped == [('product', ('bad',))]
+    assert writer.rows_written == 2
+    assert metrics.db_rows_dropped._values.get(('product',), 0) == before + 1
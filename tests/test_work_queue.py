@@ -0,0 +1,75 @@
+import threading
+
+import pytest
+
+import scraperpdf
+from scraperpdf import _WorkQueue
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(scraperpdf, 'RETRY_BACKOFF', 0)
+
+
+def test_done_resolves_each_product():
+    work = _WorkQueue(['a', 'b'], [0], max_attempts=1)
+    a, b = work.get(0), work.get(0)
+    assert [a['entry'], b['entry']] == ['a', 'b']
+    work.done(a)
+    assert work.pending()
+    work.done(b)
+    assert not work.pending()
+    assert work.get(0) is None
+
+
+def test_retry_until_attempts_are_used_up():
+    work = _WorkQueue(['a'], [0], max_attempts=2)
+    assert work.retry(work.get(0), 0)
+    assert work.retry(work.get(0), 0)  # the only worker may take back its own retry
+    item = work.get(0)
+    assert item['attempts'] == 2
+    assert not work.retry(item, 0)
+    assert not work.pending()
+    assert work.get(0) is None
+
+
+def test_retry_goes_to_another_worker():
+    work = _WorkQueue(['a'], [0, 1], max_attempts=2)
+    work.retry(work.get(0), 0)
+    assert work.get(1)['entry'] == 'a'
+
+
+def test_retry_is_kept_from_the_failing_worker_while_another_is_alive():
+    work = _WorkQueue(['a'], [0, 1], max_attempts=2)
+    work.retry(work.get(0), 0)
+    taken = []
+    waiter = threading.Thread(target=lambda: taken.append(work.get(0)), daemon=True)
+    waiter.start()
+    waiter.join(0.3)
+    assert waiter.is_alive()
+    work.worker_exit(1)
+    waiter.join(2)
+    assert taken[0]['entry'] == 'a'
+
+
+def test_requeue_keeps_the_attempt_and_goes_first():
+    work = _WorkQueue(['a', 'b'], [0, 1], max_attempts=1)
+    work.requeue(work.get(0))
+    item = work.get(1)
+    assert item['entry'] == 'a'
+    assert item['attempts'] == 0
+    assert work.pending()
+
+
+def test_retries_left_sets_each_products_limit():
+    work = _WorkQueue(['a', 'b'], [0], max_attempts=3, retries_left=lambda entry: 0 if entry == 'a' else 3)
+    assert not work.retry(work.get(0), 0)
+    assert work.retry(work.get(0), 0)
+    assert work.pending()
+
+
+def test_drain_returns_queued_products_and_resolves_them():
+    work = _WorkQueue(['a', 'b', 'c'], [0], max_attempts=1)
+    work.done(work.get(0))
+    assert work.drain() == ['b', 'c']
+    assert not work.pending()
@@ -0,0 +1,90 @@
+"""Per-product stage timings and per-run percentile summaries.
+
+A StageTimer is created for each product fetch and times its stages (page
+load, readiness wait, sales and listings calls, parse, DB write, ...). The
+finished timings travel with the product's data under _meta['timings'] and
+are added to a RunTimings, which reports count / p50 / p95 per stage.
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class StageTimer:
+    """Accumulates seconds per named stage for one product."""
+
+    def __init__(self):
+        self.timings = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def rounded(self):
+        return {name: round(seconds, 4) for name, seconds in self.timings.items()}
+
+
+class RunTimings:
+    """Thread-safe collection of stage timings across one scrape run."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._samples = {}
+            self.products = 0
+
+    def add(self, name, seconds):
+        """Record one run-level event (e.g. driver creation) outside any product."""
+        with self._lock:
+            self._samples.setdefault(name, []).append(seconds)
+
+    def add_product(self, timings):
+        """Record the stage timings of one finished product."""
+        with self._lock:
+            self.products += 1
+            for name, seconds in timings.items():
+                self._samples.setdefault(name, []).append(seconds)
+
+    def stats(self):
+        """Return {stage: {count, p50, p95, mean, total}} in seconds."""
+        with self._lock:
+            samples = {name: sorted(values) for name, values in self._samples.items()}
+        return {
+            name: {
+                "count": len(values),
+                "p50": round(percentile(values, 50), 4),
+                "p95": round(percentile(values, 95), 4),
+                "mean": round(sum(values) / len(values), 4),
+                "total": round(sum(values), 3),
+            }
+            for name, values in samples.items() if values
+        }
+
+    def table(self):
+        """Format stats() as a fixed-width text table, slowest stages first."""
+        stats = self.stats()
+        lines = [f"{'stage':<18} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'mean ms':>9}"]
+        for name, st in sorted(stats.items(), key=lambda kv: -kv[1]["total"]):
+            lines.append(f"{name:<18} {st['count']:>6} {st['p50'] * 1000:>9.1f} "
+                         f"{st['p95'] * 1000:>9.1f} {st['mean'] * 1000:>9.1f}")
+        return "\n".join(lines)
@@ -1,30 +1,23 @@
-import json
+import atexit
 import os
 import threading
+import time
 import uuid
 from datetime import datetime
-from flask import Flask, render_template, request, jsonify, send_file, redirect, url_for
+from flask import Flask, Response, g, render_template, request, jsonify, send_file, redirect, url_for
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 
 import scraperpdf
 import catalog
+import metrics
+import scrape_runs
 import settings as app_settings
+from driver_pool import DriverPool
+from rate_limiter import AdaptiveRateLimiter
 
 
-def _lowest_ask(top_listings_json):
-    """Extract lowest listing price from top_listings JSON string."""
-    try:
-        listings = json.loads(top_listings_json) if isinstance(top_listings_json, str) else (top_listings_json or [])
-        if not listings:
-            return None
-        price = listings[0].get('price', '')
-        price_str = str(price).replace('$', '').replace(',', '')
-        return float(price_str)
-    except Exception:
-        return None
-
 def _make_status(extra_fields=None):
     """Create a fresh status dict for background tasks."""
     status = {"running": False, "current": 0, "total": 0}
@@ -44,6 +37,14 @@ def _make_progress_callback(status, name_key):
 
 scrape_status = _make_status({"last_product": "", "failed": [], "succeeded": 0})
 catalog_status = _make_status({"last_group": ""})
+metrics.scrape_running.set_function(lambda: int(scrape_status["running"]))
+metrics.scrape_progress.set_function(lambda: scrape_status["current"])
+
+# Long-lived Chrome drivers shared by every scrape run in this process (set in create_app)
+driver_pool = None
+
+# Adaptive request pacing; kept across runs so its current rates show on the status API
+limiter = AdaptiveRateLimiter()
 
 # Track last scheduled run results
 schedule_last_run = {
@@ -78,12 +79,15 @@ JOB_FUNCTIONS = {
 }
 
 
-def _run_scrape_thread():
+def _run_scrape_thread(resume_run=None):
     scrape_status.update({"running": True, "current": 0, "total": 0, "last_product": "", "failed": [], "succeeded": 0})
     try:
         succeeded, failed = scraperpdf.run_scrape(
             progress_callback=_make_progress_callback(scrape_status, "last_product"),
-            generate_pdf=False
+            generate_pdf=False,
+            driver_pool=driver_pool,
+            limiter=limiter,
+            resume_run=resume_run,
         )
         scrape_status["succeeded"] = succeeded
         scrape_status["failed"] = failed
@@ -96,10 +100,12 @@ def _run_scrape_thread():
 
 def _run_catalog_refresh_thread():
     catalog_status.update({"running": True, "current": 0, "total": 0, "last_group": ""})
+    started = time.perf_counter()
     try:
         count = catalog.refresh_catalog(
             progress_callback=_make_progress_callback(catalog_status, "last_group")
         )
+        metrics.catalog_refresh_seconds.observe(time.perf_counter() - started)
         catalog_status["last_group"] = f"Done: {count} products"
     except Exception as e:
         catalog_status["last_group"] = f"Error: {e}"
@@ -107,7 +113,28 @@ def _run_catalog_refresh_thread():
         catalog_status["running"] = False
 
 
+def _create_driver_pool():
+    """Create the process-wide driver pool and start warming spares for the first scrape."""
+    s = app_settings.load_settings()
+    pool = DriverPool(
+        create_fn=scraperpdf.create_driver,
+        cleanup_fn=scraperpdf._cleanup_driver,
+        max_requests=s.get("session_rotate_every", scraperpdf.SESSION_ROTATE_EVERY),
+        max_age=s.get("driver_max_age_minutes", 30) * 60,
+        spares=s.get("driver_pool_spares", 1),
+    )
+    atexit.register(pool.shutdown)
+    if pool.spares > 0 and scraperpdf.check_chrome_installed():
+        proxies = app_settings.load_proxies() if s.get("proxies_enabled") else []
+        if proxies and s.get("parallel_enabled"):
+            pool.warm(proxies[:s.get("parallel_max_workers", 3)])
+        else:
+            pool.warm(proxies[:1] or [None])
+    return pool
+
+
 def create_app():
+    global driver_pool
     app = Flask(__name__)
 
     # Initialize scheduler with SQLite persistence
@@ -117,6 +144,8 @@ def create_app():
     )
     scheduler.start()
 
+    driver_pool = _create_driver_pool()
+
     # First-run: ensure catalog is populated
     scraperpdf.init_db()
     catalog.init_catalog_db()
@@ -133,11 +162,27 @@ def create_app():
             )
             print(f"Product catalog loaded: {count} products")
 
+    @app.before_request
+    def _start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def _observe_request(response):
+        started = g.pop("request_started", None)
+        if started is not None:
+            # Label by route pattern, not path, so product IDs don't explode the label set
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            metrics.http_request_seconds.observe(time.perf_counter() - started, route=route,
+                                                 method=request.method, status=response.status_code)
+        return response
+
+    @app.route("/metrics")
+    def metrics_endpoint():
+        return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
     @app.route("/")
     def dashboard():
         products = scraperpdf.get_all_latest_from_db()
-        for p in products:
-            p['lowest_ask'] = _lowest_ask(p.get('top_listings'))
         q = request.args.get("q", "").strip().lower()
         if q:
             products = [p for p in products if q in p["product_name"].lower() or q in str(p["product_id"])]
@@ -159,9 +204,12 @@ def create_app():
         for k, v in detail.items():
             if isinstance(v, bytes):
                 detail[k] = 0.0
+        detail['avg_sale_30d'] = scraperpdf.average_sale_price(product_id, days=30)
         history = scraperpdf.get_product_history(product_id)
         history_data = []
         if history is not None and not history.empty:
+            # Missing numeric values come back as NaN, which isn't valid JSON
+            history = history.astype(object).where(history.notna(), None)
             for _, row in history.iterrows():
                 d = row.to_dict()
                 for k, v in d.items():
@@ -195,18 +243,13 @@ def create_app():
     def api_dashboard():
         products = scraperpdf.get_all_latest_from_db()
         for p in products:
-            p['lowest_ask'] = _lowest_ask(p.get('top_listings'))
             # Sell-through rate: daily sales / current listings quantity
             daily = p.get('daily_sales') or 0
-            qty = p.get('current_quantity') or 0
+            qty = p.get('current_quantity_num') or 0
             try:
-                daily, qty = float(daily), float(qty)
-                p['sell_through_rate'] = round((daily / qty) * 100, 1) if qty > 0 else 0.0
+                p['sell_through_rate'] = round((float(daily) / qty) * 100, 1) if qty > 0 else 0.0
             except (ValueError, TypeError):
                 p['sell_through_rate'] = 0.0
-            # Drop bulky JSON fields not needed for the table
-            p.pop('top_listings', None)
-            p.pop('recent_sales', None)
             # Sanitize any non-JSON-serializable values (e.g. bytes from corrupted DB rows)
             for k, v in p.items():
                 if isinstance(v, bytes):
@@ -234,7 +277,7 @@ def create_app():
 
     @app.route("/api/scrape/status")
     def api_scrape_status():
-        return jsonify(scrape_status)
+        return jsonify({**scrape_status, "driver_pool": driver_pool.stats(), "rate": limiter.stats()})
 
     @app.route("/api/pdf")
     def api_pdf():
@@ -249,10 +292,6 @@ def create_app():
         products = scraperpdf.get_all_latest_from_db()
         if not products:
             return jsonify({"error": "No data in database"}), 404
-        for p in products:
-            p['lowest_ask'] = _lowest_ask(p.get('top_listings'))
-            p.pop('top_listings', None)
-            p.pop('recent_sales', None)
         import csv
         import io
         output = io.StringIO()
@@ -333,6 +372,38 @@ def create_app():
         logs = scraperpdf.get_scrape_logs(limit=limit)
         return jsonify(logs)
 
+    @app.route("/api/logs/summary")
+    def api_logs_summary():
+        baseline = request.args.get("baseline", 7, type=int)
+        return jsonify(scraperpdf.get_timing_summary(baseline_runs=baseline))
+
+    # --- Scrape Runs ---
+
+    @app.route("/api/runs")
+    def api_runs():
+        limit = request.args.get("limit", 20, type=int)
+        return jsonify(scraperpdf.get_scrape_runs(limit=limit))
+
+    @app.route("/api/runs/<int:run_id>")
+    def api_run(run_id):
+        run = scraperpdf.get_scrape_run(run_id)
+        if run is None:
+            return jsonify({"error": "Run not found"}), 404
+        return jsonify(run)
+
+    @app.route("/api/runs/<int:run_id>/resume", methods=["POST"])
+    def api_run_resume(run_id):
+        if scrape_status["running"]:
+            return jsonify({"error": "Scrape already running"}), 409
+        run = scraperpdf.get_scrape_run(run_id)
+        if run is None:
+            return jsonify({"error": "Run not found"}), 404
+        if run["status"] == scrape_runs.FINISHED:
+            return jsonify({"error": "Run already finished"}), 409
+        thread = threading.Thread(target=_run_scrape_thread, args=(run_id,), daemon=True)
+        thread.start()
+        return jsonify({"status": "started"})
+
     # --- Schedules ---
 
     @app.route("/schedules")